@@ -1,57 +1,164 @@
 """Storage and management for agent configurations with user scoping."""
 
+import copy
 import json
+import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import uuid
 
-from .config import get_user_agents_file, get_user_data_dir
+from . import json_utils
+from .config import AGENTS_JSON_PRETTY, get_user_agents_file, get_user_data_dir
+from .file_utils import FileSignature, KeyedLocks, file_signature, write_file_atomic
 from .storage import validate_id
 
+# Parsed agents data plus an agent id -> list position index and the active agents
+AgentsEntry = Tuple[Dict[str, Any], Dict[str, int], Tuple[Dict[str, Any], ...]]
+
+# Cached agents per user: user_id -> (agents file path, file signature, entry).
+# The signature is (st_ino, st_mtime_ns, st_size), so edits made outside this
+# process are picked up on the next read. Cached data is shared between callers and
+# must be treated as read-only; mutate a copy from load_agents() and save it.
+_AGENTS_CACHE: Dict[str, Tuple[Path, FileSignature, AgentsEntry]] = {}
+
+# Per-user locks serializing load-modify-save sequences
+_user_lock = KeyedLocks()
+
+
+@dataclass(slots=True, frozen=True)
+class Agent:
+    """Read-only view of the agent fields a council run needs."""
+    id: Optional[str]
+    title: str
+    model: str
+    emoji: str = "🤖"
+    stage1_template: Optional[str] = None
+    stage2_template: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, agent: Dict[str, Any]) -> "Agent":
+        """
+        Build a council view from a stored agent configuration.
+
+        Args:
+            agent: Agent configuration dict
+
+        Returns:
+            Agent with its title defaulting to the model and its custom
+            stage 1/2 prompts resolved (None when the agent has none)
+        """
+        prompts = agent.get("prompts") or {}
+        return cls(
+            id=agent.get("id"),
+            title=agent.get("title", agent["model"]),
+            model=agent["model"],
+            emoji=agent.get("emoji", "🤖"),
+            stage1_template=prompts.get("stage1"),
+            stage2_template=prompts.get("stage2")
+        )
+
+
+def _index_agents(agents_data: Dict[str, Any]) -> AgentsEntry:
+    """Pair agents data with a map from agent id to its position in the list and its active agents."""
+    agents = agents_data["agents"]
+    return (
+        agents_data,
+        {agent["id"]: i for i, agent in enumerate(agents)},
+        tuple(agent for agent in agents if agent.get("active", True))
+    )
+
 
 def ensure_user_directory(user_id: str):
     """Ensure the user's data directory exists."""
-    Path(get_user_data_dir(user_id)).mkdir(parents=True, exist_ok=True)
+    get_user_data_dir(user_id).mkdir(parents=True, exist_ok=True)
 
 
-def load_agents(user_id: str) -> Dict[str, Any]:
+def _load_agents_entry(user_id: str) -> AgentsEntry:
     """
-    Load agent configurations from storage for a user.
+    Load agent configurations for a user, reusing the parsed file when unchanged.
+
+    The returned data and index are shared with the cache and must not be mutated.
 
     Args:
         user_id: The user's identifier
 
     Returns:
-        Dict with 'agents' list and 'chairman' id
+        Tuple of (dict with 'agents' list and 'chairman' id, agent id -> index map)
     """
-    ensure_user_directory(user_id)
-    agents_file = Path(get_user_agents_file(user_id))
+    # Reads never create the user directory; a missing file means defaults
+    agents_file = get_user_agents_file(user_id)
 
-    if not agents_file.exists():
+    try:
+        signature = file_signature(agents_file)
+    except FileNotFoundError:
         # Initialize with defaults for new users
-        return initialize_default_agents_data()
+        _AGENTS_CACHE.pop(user_id, None)
+        return _index_agents(initialize_default_agents_data())
+
+    cached = _AGENTS_CACHE.get(user_id)
+    if cached is not None and cached[0] == agents_file and cached[1] == signature:
+        return cached[2]
 
     try:
-        with open(agents_file, 'r') as f:
-            return json.load(f)
+        with open(agents_file, 'rb') as f:
+            data = json_utils.loads(f.read())
     except json.JSONDecodeError:
-        return initialize_default_agents_data()
+        return _index_agents(initialize_default_agents_data())
+
+    entry = _index_agents(data)
+    _AGENTS_CACHE[user_id] = (agents_file, signature, entry)
+    return entry
+
+
+def _load_agents_cached(user_id: str) -> Dict[str, Any]:
+    """Load a user's agents data from the cache (shared, must not be mutated)."""
+    return _load_agents_entry(user_id)[0]
+
+
+def load_agents(user_id: str) -> Dict[str, Any]:
+    """
+    Load agent configurations from storage for a user.
+
+    Args:
+        user_id: The user's identifier
+
+    Returns:
+        Dict with 'agents' list and 'chairman' id (a private copy that is safe to modify)
+    """
+    return copy.deepcopy(_load_agents_cached(user_id))
 
 
 def save_agents(user_id: str, agents_data: Dict[str, Any]) -> None:
     """
     Save agent configurations to storage for a user.
 
+    The data is copied, so the caller may keep modifying its dict.
+
     Args:
         user_id: The user's identifier
         agents_data: Dict with 'agents' list and 'chairman' id
     """
-    ensure_user_directory(user_id)
-    agents_file = Path(get_user_agents_file(user_id))
+    _store_agents(user_id, copy.deepcopy(agents_data))
+
+
+def _store_agents(user_id: str, agents_data: Dict[str, Any]) -> None:
+    """Save agents data that the cache takes ownership of (the caller must not modify it afterwards)."""
+    with _user_lock(user_id):
+        _write_agents_file(user_id, _index_agents(agents_data))
+
+
+def _write_agents_file(user_id: str, entry: AgentsEntry) -> None:
+    """
+    Write agents data to disk and refresh the cache entry.
 
-    with open(agents_file, 'w') as f:
-        json.dump(agents_data, f, indent=2)
+    The file is replaced atomically (see write_file_atomic()), so readers never
+    observe a partially written file.
+    """
+    agents_file = get_user_agents_file(user_id)
+    write_file_atomic(agents_file, json_utils.dumps(entry[0], indent=AGENTS_JSON_PRETTY))
+    _AGENTS_CACHE[user_id] = (agents_file, file_signature(agents_file), entry)
 
 
 def get_all_agents(user_id: str) -> List[Dict[str, Any]]:
@@ -62,10 +169,9 @@ def get_all_agents(user_id: str) -> List[Dict[str, Any]]:
         user_id: The user's identifier
 
     Returns:
-        List of agent configurations
+        List of agent configurations (copies that are safe to modify)
     """
-    data = load_agents(user_id)
-    return data["agents"]
+    return copy.deepcopy(_load_agents_cached(user_id)["agents"])
 
 
 def get_active_agents(user_id: str) -> List[Dict[str, Any]]:
@@ -76,10 +182,10 @@ def get_active_agents(user_id: str) -> List[Dict[str, Any]]:
         user_id: The user's identifier
 
     Returns:
-        List of active agent configurations
+        List of active agent configurations (copies that are safe to modify)
     """
-    agents = get_all_agents(user_id)
-    return [agent for agent in agents if agent.get("active", True)]
+    # Filtered once per load or save, not on every read
+    return copy.deepcopy(list(_load_agents_entry(user_id)[2]))
 
 
 def get_agent_by_id(user_id: str, agent_id: str) -> Optional[Dict[str, Any]]:
@@ -91,14 +197,12 @@ def get_agent_by_id(user_id: str, agent_id: str) -> Optional[Dict[str, Any]]:
         agent_id: The agent's unique identifier
 
     Returns:
-        Agent configuration or None if not found
+        Agent configuration (a copy that is safe to modify) or None if not found
     """
     validate_id(agent_id, "agent_id")
-    agents = get_all_agents(user_id)
-    for agent in agents:
-        if agent["id"] == agent_id:
-            return agent
-    return None
+    data, id_index, _ = _load_agents_entry(user_id)
+    i = id_index.get(agent_id)
+    return copy.deepcopy(data["agents"][i]) if i is not None else None
 
 
 def create_agent(
@@ -125,8 +229,7 @@ def create_agent(
     Returns:
         The created agent configuration
     """
-    data = load_agents(user_id)
-
+    now = datetime.utcnow().isoformat()
     agent = {
         "id": str(uuid.uuid4()),
         "title": title,
@@ -135,14 +238,16 @@ def create_agent(
         "prompts": prompts or {},
         "active": active,
         "emoji": emoji,
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat()
+        "created_at": now,
+        "updated_at": now
     }
 
-    data["agents"].append(agent)
-    save_agents(user_id, data)
+    with _user_lock(user_id):
+        data = load_agents(user_id)
+        data["agents"].append(agent)
+        _store_agents(user_id, data)
 
-    return agent
+    return copy.deepcopy(agent)
 
 
 def update_agent(user_id: str, agent_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -158,21 +263,30 @@ def update_agent(user_id: str, agent_id: str, updates: Dict[str, Any]) -> Option
         Updated agent configuration or None if not found
     """
     validate_id(agent_id, "agent_id")
-    data = load_agents(user_id)
 
-    for i, agent in enumerate(data["agents"]):
-        if agent["id"] == agent_id:
-            # Update fields
-            for key, value in updates.items():
-                if key != "id" and key != "created_at":  # Don't allow changing these
-                    agent[key] = value
+    with _user_lock(user_id):
+        cached, id_index, _ = _load_agents_entry(user_id)
+        i = id_index.get(agent_id)
+        if i is None:
+            return None
 
-            agent["updated_at"] = datetime.utcnow().isoformat()
-            data["agents"][i] = agent
-            save_agents(user_id, data)
-            return agent
+        # Don't allow changing id or created_at
+        changes = {
+            key: value for key, value in updates.items()
+            if key != "id" and key != "created_at"
+        }
+        current = cached["agents"][i]
+        if all(key in current and current[key] == value for key, value in changes.items()):
+            # No-op update: leave the file and updated_at untouched
+            return copy.deepcopy(current)
 
-    return None
+        data = copy.deepcopy(cached)
+        agent = data["agents"][i]
+        agent.update(changes)
+
+        agent["updated_at"] = datetime.utcnow().isoformat()
+        _store_agents(user_id, data)
+        return copy.deepcopy(agent)
 
 
 def delete_agent(user_id: str, agent_id: str) -> bool:
@@ -187,17 +301,18 @@ def delete_agent(user_id: str, agent_id: str) -> bool:
         True if deleted, False if not found
     """
     validate_id(agent_id, "agent_id")
-    data = load_agents(user_id)
 
-    original_length = len(data["agents"])
-    data["agents"] = [agent for agent in data["agents"] if agent["id"] != agent_id]
+    with _user_lock(user_id):
+        cached, id_index, _ = _load_agents_entry(user_id)
+        i = id_index.get(agent_id)
+        if i is None:
+            return False
 
-    if len(data["agents"]) < original_length:
-        save_agents(user_id, data)
+        data = copy.deepcopy(cached)
+        data["agents"].pop(i)
+        _store_agents(user_id, data)
         return True
 
-    return False
-
 
 def set_chairman(user_id: str, agent_id: Optional[str]) -> bool:
     """
@@ -210,16 +325,19 @@ def set_chairman(user_id: str, agent_id: Optional[str]) -> bool:
     Returns:
         True if successful
     """
-    data = load_agents(user_id)
-
-    # Validate agent exists if not None
     if agent_id is not None:
-        agent = get_agent_by_id(user_id, agent_id)
-        if not agent:
+        validate_id(agent_id, "agent_id")
+
+    with _user_lock(user_id):
+        cached, id_index, _ = _load_agents_entry(user_id)
+
+        # Validate agent exists if not None
+        if agent_id is not None and agent_id not in id_index:
             return False
 
-    data["chairman"] = agent_id
-    save_agents(user_id, data)
+        if cached.get("chairman") != agent_id:
+            # Only the chairman changes, so the (read-only) agent list is shared, not copied
+            _store_agents(user_id, {**cached, "chairman": agent_id})
     return True
 
 
@@ -233,7 +351,7 @@ def get_chairman(user_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Chairman agent configuration or None if using default
     """
-    data = load_agents(user_id)
+    data = _load_agents_cached(user_id)
     chairman_id = data.get("chairman")
 
     if chairman_id:
@@ -242,6 +360,47 @@ def get_chairman(user_id: str) -> Optional[Dict[str, Any]]:
     return None
 
 
+# Static fields of the default agents; ids and timestamps are filled in per user.
+_DEFAULT_AGENT_TEMPLATES: Tuple[Dict[str, Any], ...] = (
+    {
+        "title": "Ethics & Values Advisor",
+        "role": "Provides ethical guidance and helps evaluate decisions through a moral lens, considering values, principles, and long-term consequences.",
+        "model": "anthropic/claude-sonnet-4.5",
+        "prompts": {
+            "stage1": "You are the Ethics & Values Advisor on a personal board of directors. Evaluate the following question from an ethical perspective, considering moral principles, values, and long-term consequences:\n\n{user_query}"
+        },
+        "emoji": "⚖️"
+    },
+    {
+        "title": "Technology & Innovation Expert",
+        "role": "Offers technical insights, evaluates technological feasibility, and provides guidance on innovation and digital transformation.",
+        "model": "openai/gpt-5.1",
+        "prompts": {
+            "stage1": "You are the Technology & Innovation Expert on a personal board of directors. Analyze the following question from a technical and innovation perspective:\n\n{user_query}"
+        },
+        "emoji": "💻"
+    },
+    {
+        "title": "Leadership & Strategy Coach",
+        "role": "Provides strategic guidance, leadership development advice, and helps with long-term planning and decision-making.",
+        "model": "google/gemini-3-pro-preview",
+        "prompts": {
+            "stage1": "You are the Leadership & Strategy Coach on a personal board of directors. Provide strategic and leadership-focused guidance on:\n\n{user_query}"
+        },
+        "emoji": "🎯"
+    },
+    {
+        "title": "Financial & Business Advisor",
+        "role": "Offers financial insights, business strategy, and helps evaluate economic implications of decisions.",
+        "model": "x-ai/grok-4",
+        "prompts": {
+            "stage1": "You are the Financial & Business Advisor on a personal board of directors. Analyze the following from a financial and business perspective:\n\n{user_query}"
+        },
+        "emoji": "💰"
+    }
+)
+
+
 def initialize_default_agents_data() -> Dict[str, Any]:
     """
     Create the default agents data structure.
@@ -249,59 +408,17 @@ def initialize_default_agents_data() -> Dict[str, Any]:
     Returns:
         Dict with default agents and chairman
     """
+    now = datetime.utcnow().isoformat()
     default_agents = [
         {
             "id": str(uuid.uuid4()),
-            "title": "Ethics & Values Advisor",
-            "role": "Provides ethical guidance and helps evaluate decisions through a moral lens, considering values, principles, and long-term consequences.",
-            "model": "anthropic/claude-sonnet-4.5",
-            "prompts": {
-                "stage1": "You are the Ethics & Values Advisor on a personal board of directors. Evaluate the following question from an ethical perspective, considering moral principles, values, and long-term consequences:\n\n{user_query}"
-            },
-            "active": True,
-            "emoji": "⚖️",
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Technology & Innovation Expert",
-            "role": "Offers technical insights, evaluates technological feasibility, and provides guidance on innovation and digital transformation.",
-            "model": "openai/gpt-5.1",
-            "prompts": {
-                "stage1": "You are the Technology & Innovation Expert on a personal board of directors. Analyze the following question from a technical and innovation perspective:\n\n{user_query}"
-            },
+            **template,
+            "prompts": dict(template["prompts"]),
             "active": True,
-            "emoji": "💻",
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Leadership & Strategy Coach",
-            "role": "Provides strategic guidance, leadership development advice, and helps with long-term planning and decision-making.",
-            "model": "google/gemini-3-pro-preview",
-            "prompts": {
-                "stage1": "You are the Leadership & Strategy Coach on a personal board of directors. Provide strategic and leadership-focused guidance on:\n\n{user_query}"
-            },
-            "active": True,
-            "emoji": "🎯",
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Financial & Business Advisor",
-            "role": "Offers financial insights, business strategy, and helps evaluate economic implications of decisions.",
-            "model": "x-ai/grok-4",
-            "prompts": {
-                "stage1": "You are the Financial & Business Advisor on a personal board of directors. Analyze the following from a financial and business perspective:\n\n{user_query}"
-            },
-            "active": True,
-            "emoji": "💰",
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "created_at": now,
+            "updated_at": now
         }
+        for template in _DEFAULT_AGENT_TEMPLATES
     ]
 
     return {"agents": default_agents, "chairman": None}
@@ -317,12 +434,17 @@ def initialize_default_agents(user_id: str) -> List[Dict[str, Any]]:
     Returns:
         List of created default agents
     """
-    existing = get_all_agents(user_id)
-    if existing:
-        return existing
-
-    # Create default agents
-    data = initialize_default_agents_data()
-    save_agents(user_id, data)
-
-    return data["agents"]
+    with _user_lock(user_id):
+        # Without a file, reads return fresh (unsaved) defaults, so only a
+        # saved, non-empty agent list counts as initialized
+        if os.path.exists(get_user_agents_file(user_id)):
+            existing = get_all_agents(user_id)
+            if existing:
+                # Already initialized: a cached read, no write
+                return existing
+
+        # Create default agents, saved so their ids stay stable across calls
+        data = initialize_default_agents_data()
+        _store_agents(user_id, data)
+
+    return copy.deepcopy(data["agents"])
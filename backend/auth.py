@@ -1,16 +1,29 @@
 """Clerk JWT verification for FastAPI."""
 
-import os
 import logging
-import jwt
-import httpx
 from functools import lru_cache
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from .config import CLERK_JWKS_URL
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
+# jwt (and the cryptography backend it loads) and httpx are imported on first
+# use, so importing this module stays cheap for tests and scripts.
+
+
+@lru_cache(maxsize=1)
+def _get_jwks_client():
+    """
+    Return the shared JWKS HTTP client.
+    JWKS refetches (cold start, key rotation) reuse a kept-alive connection
+    instead of a fresh TCP + TLS handshake.
+    """
+    import httpx
+
+    return httpx.Client(timeout=10, limits=httpx.Limits(max_connections=4))
+
 
 @lru_cache(maxsize=1)
 def get_clerk_jwks() -> dict:
@@ -18,18 +31,11 @@ def get_clerk_jwks() -> dict:
     Fetch Clerk's JWKS for JWT verification.
     Cached to avoid repeated network calls.
     """
-    # Use instance-specific JWKS URL from CLERK_ISSUER
-    clerk_issuer = os.getenv("CLERK_ISSUER", "").rstrip("/")
-    if clerk_issuer:
-        jwks_url = f"{clerk_issuer}/.well-known/jwks.json"
-    else:
-        # Fallback to global Clerk JWKS
-        jwks_url = "https://api.clerk.com/v1/jwks"
-
+    jwks_url = CLERK_JWKS_URL
     logger.info(f"Fetching JWKS from: {jwks_url}")
 
     try:
-        response = httpx.get(jwks_url, timeout=10)
+        response = _get_jwks_client().get(jwks_url)
         response.raise_for_status()
         jwks = response.json()
         logger.info(f"Successfully fetched JWKS with {len(jwks.get('keys', []))} keys")
@@ -39,24 +45,43 @@ def get_clerk_jwks() -> dict:
         raise ValueError(f"Failed to fetch JWKS from {jwks_url}: {e}")
 
 
+@lru_cache(maxsize=1)
+def _get_signing_keys() -> dict:
+    """
+    Parse the cached JWKS into signing keys indexed by key ID.
+    Keys are built once per JWKS fetch using PyJWT's PyJWKSet, which also
+    skips keys with unsupported types or algorithms.
+    """
+    import jwt
+
+    try:
+        jwk_set = jwt.PyJWKSet.from_dict(get_clerk_jwks())
+    except jwt.PyJWKSetError as e:
+        raise ValueError(f"No usable keys in JWKS: {e}")
+    return {jwk.key_id: jwk.key for jwk in jwk_set.keys if jwk.key_id}
+
+
 def verify_clerk_token(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
     """
     Verify Clerk JWT token and return decoded claims.
 
+    A sync dependency on purpose: FastAPI runs it in the threadpool, keeping
+    the RS256 signature check and any JWKS refetch off the event loop.
+
     Returns dict with:
     - sub: Clerk user ID (e.g., "user_2abc123...")
     - email: User's email (if available)
     - other standard JWT claims
     """
+    import jwt
+    import httpx
+
     token = credentials.credentials
     logger.info(f"Verifying token (first 50 chars): {token[:50]}...")
 
     try:
-        # Get JWKS for verification
-        jwks = get_clerk_jwks()
-
         # Decode token header to get key ID (kid)
         unverified_header = jwt.get_unverified_header(token)
         kid = unverified_header.get("kid")
@@ -69,32 +94,21 @@ def verify_clerk_token(
                 detail="Token missing key ID"
             )
 
-        # Find matching key in JWKS
-        key = None
-        available_kids = [jwk.get("kid") for jwk in jwks.get("keys", [])]
-        logger.info(f"Available JWKS kids: {available_kids}")
-
-        for jwk in jwks.get("keys", []):
-            if jwk.get("kid") == kid:
-                key = jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
-                break
-
-        if not key:
-            # Clear cache and retry once (key rotation scenario)
+        try:
+            key = _get_signing_keys()[kid]
+        except KeyError:
+            # Clear caches and retry once (key rotation scenario)
             logger.info("Key not found, clearing cache and retrying...")
+            _get_signing_keys.cache_clear()
             get_clerk_jwks.cache_clear()
-            jwks = get_clerk_jwks()
-            for jwk in jwks.get("keys", []):
-                if jwk.get("kid") == kid:
-                    key = jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
-                    break
-
-        if not key:
-            logger.error(f"Token key {kid} not found in JWKS")
-            raise HTTPException(
-                status_code=401,
-                detail="Token key not found in JWKS"
-            )
+            try:
+                key = _get_signing_keys()[kid]
+            except KeyError:
+                logger.error(f"Token key {kid} not found in JWKS")
+                raise HTTPException(
+                    status_code=401,
+                    detail="Token key not found in JWKS"
+                )
 
         # Verify and decode token
         payload = jwt.decode(
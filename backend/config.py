@@ -1,6 +1,8 @@
 """Configuration for the LLM Council."""
 
 import os
+from functools import lru_cache
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,28 +21,70 @@ COUNCIL_MODELS = [
 # Chairman model - synthesizes final response
 CHAIRMAN_MODEL = "google/gemini-3-pro-preview"
 
+# Council pipelining: start the next stage once this many agents have
+# responded, cancelling the stragglers (0 = wait for every agent)
+STAGE1_QUORUM = int(os.getenv("COUNCIL_STAGE1_QUORUM", "0"))
+STAGE2_QUORUM = int(os.getenv("COUNCIL_STAGE2_QUORUM", "0"))
+
+# Give up on agents that have not answered this many seconds into a stage
+# (0 = no deadline beyond the per-request timeout)
+STAGE_DEADLINE_SECONDS = float(os.getenv("COUNCIL_STAGE_DEADLINE_SECONDS", "0"))
+
+# Stage 1 hedging: when a model runs past its usual (p95) latency, send the
+# same prompt to this model too and keep whichever answers first ("" = off).
+# Until a model has latency history, hedge after STAGE1_HEDGE_AFTER_SECONDS.
+STAGE1_HEDGE_MODEL = os.getenv("COUNCIL_STAGE1_HEDGE_MODEL", "")
+STAGE1_HEDGE_AFTER_SECONDS = float(os.getenv("COUNCIL_STAGE1_HEDGE_AFTER_SECONDS", "30"))
+
+# Serve a repeated question (same user, council setup and normalized text)
+# from the last council result for this many seconds (0 = off)
+RESPONSE_CACHE_SECONDS = float(os.getenv("COUNCIL_RESPONSE_CACHE_SECONDS", "0"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("COUNCIL_RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Cap on concurrent OpenRouter requests across the whole process, to stay
+# under the API key's rate limits (0 = no cap beyond the connection pool)
+MAX_PARALLEL_QUERIES = int(os.getenv("COUNCIL_MAX_PARALLEL", "0"))
+
 # OpenRouter API endpoint
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 
+# Clerk JWKS endpoint: instance-specific when CLERK_ISSUER is set,
+# otherwise the global Clerk JWKS
+CLERK_ISSUER = os.getenv("CLERK_ISSUER", "").rstrip("/")
+CLERK_JWKS_URL = (
+    f"{CLERK_ISSUER}/.well-known/jwks.json" if CLERK_ISSUER
+    else "https://api.clerk.com/v1/jwks"
+)
+
 # Base data directory
 DATA_BASE_DIR = "data"
 
+# Pretty-print agents.json (for debugging); compact JSON is written by default
+AGENTS_JSON_PRETTY = os.getenv("AGENTS_JSON_PRETTY") == "1"
+
+
+@lru_cache(maxsize=4096)
+def _user_path(base_dir: str, user_id: str, name: str) -> Path:
+    """Build a path under a user's data directory (cached; Path objects are immutable)."""
+    user_dir = Path(base_dir) / "users" / user_id
+    return user_dir / name if name else user_dir
+
 
-def get_user_data_dir(user_id: str) -> str:
+def get_user_data_dir(user_id: str) -> Path:
     """Get the data directory for a specific user."""
-    return f"{DATA_BASE_DIR}/users/{user_id}"
+    return _user_path(DATA_BASE_DIR, user_id, "")
 
 
-def get_user_conversations_dir(user_id: str) -> str:
+def get_user_conversations_dir(user_id: str) -> Path:
     """Get the conversations directory for a specific user."""
-    return f"{get_user_data_dir(user_id)}/conversations"
+    return _user_path(DATA_BASE_DIR, user_id, "conversations")
 
 
-def get_user_agents_file(user_id: str) -> str:
+def get_user_agents_file(user_id: str) -> Path:
     """Get the agents file path for a specific user."""
-    return f"{get_user_data_dir(user_id)}/agents.json"
+    return _user_path(DATA_BASE_DIR, user_id, "agents.json")
 
 
-def get_user_prompts_file(user_id: str) -> str:
+def get_user_prompts_file(user_id: str) -> Path:
     """Get the prompts file path for a specific user."""
-    return f"{get_user_data_dir(user_id)}/prompts.json"
+    return _user_path(DATA_BASE_DIR, user_id, "prompts.json")
@@ -1,89 +1,367 @@
 """3-stage LLM Council orchestration."""
 
 import asyncio
+import dataclasses
+import logging
+import math
 import re
-from collections import defaultdict
-from typing import List, Dict, Any, Tuple
-
-from .openrouter import query_models_parallel, query_model, OpenRouterCreditsExhaustedError
-from .config import COUNCIL_MODELS, CHAIRMAN_MODEL
-from .prompt_storage import get_prompt_for_model
+from contextlib import aclosing
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple, Union
+
+from .openrouter import query_models_parallel, query_model, stream_model, OpenRouterCreditsExhaustedError
+from .config import (
+    COUNCIL_MODELS, CHAIRMAN_MODEL, STAGE1_QUORUM, STAGE2_QUORUM, STAGE_DEADLINE_SECONDS,
+    STAGE1_HEDGE_MODEL, STAGE1_HEDGE_AFTER_SECONDS
+)
+from .prompt_storage import PromptTable, get_prompt_for_model, resolve_prompts
+from .prompts import render_prompt
 from . import agent_storage
+from .agent_storage import Agent
+
+logger = logging.getLogger(__name__)
+
+# Stage functions accept stored agent dicts or prebuilt Agent views
+AgentLike = Union[Dict[str, Any], Agent]
+
+# Anonymized stage 2 labels: "Response A", "Response B", ...
+_RESPONSE_LABELS = tuple(f"Response {chr(65 + i)}" for i in range(26))
+
+# Stage 3 response when the chairman fails to answer
+_STAGE3_FAILED = "Error: Unable to generate final synthesis."
+
+# Stage 1 latency per model: model -> (sample count, EWMA mean, EWMA variance)
+_MODEL_LATENCY: Dict[str, Tuple[int, float, float]] = {}
+_LATENCY_ALPHA = 0.2
+# Samples needed before a model's own latency sets its hedge delay
+_LATENCY_MIN_SAMPLES = 5
+
+
+def _record_latency(model: str, seconds: float):
+    """Fold one stage 1 response time into the model's moving latency estimate."""
+    count, mean, variance = _MODEL_LATENCY.get(model, (0, seconds, 0.0))
+    diff = seconds - mean
+    increment = _LATENCY_ALPHA * diff
+    _MODEL_LATENCY[model] = (
+        count + 1,
+        mean + increment,
+        (1 - _LATENCY_ALPHA) * (variance + diff * increment)
+    )
+
 
+def _hedge_delay(model: str) -> float:
+    """Seconds to wait on a model before hedging: its estimated p95 latency."""
+    count, mean, variance = _MODEL_LATENCY.get(model, (0, 0.0, 0.0))
+    if count < _LATENCY_MIN_SAMPLES:
+        return STAGE1_HEDGE_AFTER_SECONDS
+    return mean + 1.645 * math.sqrt(variance)
 
-async def stage1_collect_responses(user_id: str, user_query: str) -> List[Dict[str, Any]]:
+
+async def _hedged_query(model: str, messages: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]]]:
     """
-    Stage 1: Collect individual responses from all council agents.
-    Each agent uses their custom prompt, or falls back to model/default prompts.
+    Query a model, hedging with STAGE1_HEDGE_MODEL if it runs past its usual latency.
+
+    Args:
+        model: OpenRouter model identifier
+        messages: Messages to send
+
+    Returns:
+        (model that answered, response dict or None if both failed)
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    primary = asyncio.create_task(query_model(model, messages))
+    models = {primary: model}
+    pending = {primary}
+
+    try:
+        if STAGE1_HEDGE_MODEL and STAGE1_HEDGE_MODEL != model:
+            done, _ = await asyncio.wait({primary}, timeout=_hedge_delay(model))
+            if not done:
+                logger.info(f"Hedging slow stage 1 query to {model} with {STAGE1_HEDGE_MODEL}")
+                backup = asyncio.create_task(query_model(STAGE1_HEDGE_MODEL, messages))
+                models[backup] = STAGE1_HEDGE_MODEL
+                pending.add(backup)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Prefer the agent's own model when both finish together
+            for task in sorted(done, key=lambda task: task is not primary):
+                response = task.result()
+                if response is None:
+                    continue
+                if task is primary or primary in pending:
+                    # A primary that lost to the hedge took at least this long.
+                    # Nothing is recorded when the query is cancelled from
+                    # outside (quorum or deadline), which would understate it.
+                    _record_latency(model, loop.time() - started)
+                return models[task], response
+        return model, None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _iter_until_quorum(
+    coros: List,
+    quorum: int = 0,
+    deadline: Optional[float] = None
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Run agent queries concurrently, yielding each one as it finishes until a quorum succeeded.
+
+    A query succeeds when it returns an (agent, response, prompt) tuple with a
+    non-None response. Queries still running once the quorum is reached or the
+    deadline passes are cancelled, and failures are logged as they happen.
+
+    Args:
+        coros: Coroutines returning (agent, response, prompt) tuples
+        quorum: Successful queries to wait for (0 waits for all)
+        deadline: Seconds before giving up on the rest (default STAGE_DEADLINE_SECONDS, 0 = none)
+
+    Yields:
+        (position in coros, result or raised exception) in completion order
+    """
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    positions = {task: i for i, task in enumerate(tasks)}
+    target = quorum if 0 < quorum < len(tasks) else len(tasks)
+
+    deadline = STAGE_DEADLINE_SECONDS if deadline is None else deadline
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline if deadline > 0 else None
+
+    pending = set(tasks)
+    successes = 0
+    try:
+        while pending and successes < target:
+            timeout = None if give_up_at is None else max(give_up_at - loop.time(), 0)
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                logger.warning(
+                    f"Cancelling {len(pending)} council queries still running after {deadline}s"
+                )
+                break
+            for task in sorted(done, key=positions.get):
+                error = task.exception()
+                if isinstance(error, OpenRouterCreditsExhaustedError):
+                    # No point waiting for the rest; the caller re-raises this
+                    successes = target
+                elif error is not None:
+                    logger.warning(f"Council query failed: {error!r}")
+                elif task.result()[1] is not None:
+                    successes += 1
+                yield positions[task], error or task.result()
+
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _gather_until_quorum(coros: List, quorum: int = 0) -> List[Any]:
+    """
+    Run agent queries concurrently, returning once a quorum has succeeded.
+
+    Args:
+        coros: Coroutines returning (agent, response, prompt) tuples
+        quorum: Successful queries to wait for (0 waits for all)
+
+    Returns:
+        Results (or raised exceptions) of the finished queries, in submission order
+    """
+    finished = {}
+    async with aclosing(_iter_until_quorum(coros, quorum)) as results:
+        async for position, result in results:
+            finished[position] = result
+    return [finished[position] for position in sorted(finished)]
+
+
+async def _load_active_agents(user_id: str) -> List[Agent]:
+    """Load the user's active agents without blocking the event loop on disk reads."""
+    return _as_agents(await asyncio.to_thread(agent_storage.get_active_agents, user_id))
+
+
+async def load_council_prompts(user_id: str, agents: List[AgentLike]) -> PromptTable:
+    """
+    Resolve the model-level prompts for a council run from one read of the user's prompts.
 
     Args:
         user_id: The user's identifier
-        user_query: The user's question
+        agents: The run's active agents
 
     Returns:
-        List of dicts with 'agent', 'model', and 'response' keys
+        Prompt table covering every agent's model and the default chairman model
+    """
+    models = [agent.model for agent in _as_agents(_stage1_agents(agents))]
+    return await asyncio.to_thread(resolve_prompts, user_id, models + [CHAIRMAN_MODEL])
+
+
+async def _model_template(prompts: Optional[PromptTable], user_id: str, model: str, stage: str) -> str:
+    """Look up a model-level prompt template, reading storage only for models outside the table."""
+    prompt = prompts.get((model, stage)) if prompts else None
+    if prompt is None:
+        prompt = await asyncio.to_thread(get_prompt_for_model, user_id, model, stage)
+    return prompt['template']
+
+
+def _labelled_text(entries: Iterable[Tuple[str, str]], separator: str) -> str:
+    """
+    Join (label, text) pairs into "label<separator>text" blocks separated by blank lines.
+
+    Builds the result with a single join, without first formatting each
+    block into its own string (the texts are whole model responses).
     """
+    pieces = []
+    for label, text in entries:
+        if pieces:
+            pieces.append("\n\n")
+        pieces += (label, separator, text)
+    return "".join(pieces)
+
+
+def _as_agents(agents: List[AgentLike]) -> List[Agent]:
+    """Convert agent dicts to Agent views once, before the per-agent queries."""
+    return [agent if isinstance(agent, Agent) else Agent.from_dict(agent) for agent in agents]
 
-    # Load active agents for this user, or fall back to config models
-    agents = agent_storage.get_active_agents(user_id)
 
+def _stage1_agents(agents: List[AgentLike]) -> List[AgentLike]:
+    """Use the given agents, or fall back to the configured models when there are none."""
     # If no agents configured, use legacy model list
     if not agents:
         agents = [
             {"id": f"legacy-{i}", "title": model, "model": model, "prompts": {}}
             for i, model in enumerate(COUNCIL_MODELS)
         ]
+    return agents
+
+
+async def stage1_stream(
+    user_id: str,
+    user_query: str,
+    quorum: Optional[int] = None,
+    agents: Optional[List[AgentLike]] = None,
+    prompts: Optional[PromptTable] = None
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Stage 1, streamed: yield each agent's response as soon as it arrives.
+    Each agent uses their custom prompt, or falls back to model/default prompts.
+
+    Args:
+        user_id: The user's identifier
+        user_query: The user's question
+        quorum: Stop once this many agents responded (default STAGE1_QUORUM, 0 = all)
+        agents: Active agents, if already loaded for this council run
+        prompts: Model-level prompts, if already resolved for this council run
+
+    Yields:
+        (agent position, result dict with 'agent', 'model', and 'response' keys)
+        in arrival order; sort by position to restore council order
+    """
+    if agents is None:
+        agents = await _load_active_agents(user_id)
+    agents = _as_agents(_stage1_agents(agents))
+
+    # Model-level prompts for agents without their own template, resolved once
+    if prompts is None and any(agent.stage1_template is None for agent in agents):
+        prompts = await asyncio.to_thread(resolve_prompts, user_id, [agent.model for agent in agents])
+
+    # Agents with the same model and prompt share a single query
+    shared_queries: Dict[Tuple[str, str], asyncio.Task] = {}
 
     # Create tasks for each agent with their specific prompts
-    async def query_with_agent_prompt(agent: Dict[str, Any]) -> tuple[Dict[str, Any], Dict[str, Any], str]:
-        model = agent["model"]
+    async def query_with_agent_prompt(agent: Agent) -> tuple[Agent, Dict[str, Any], str]:
+        model = agent.model
 
         # Priority: agent-specific prompt > model-specific prompt > default prompt
-        if "stage1" in agent.get("prompts", {}):
-            stage1_template = agent["prompts"]["stage1"]
-        else:
-            stage1_prompt = get_prompt_for_model(user_id, model, 'stage1')
-            stage1_template = stage1_prompt['template']
+        stage1_template = agent.stage1_template
+        if stage1_template is None:
+            stage1_template = await _model_template(prompts, user_id, model, 'stage1')
 
         # Format the prompt
-        prompt = stage1_template.format(user_query=user_query)
-        messages = [{"role": "user", "content": prompt}]
-
-        # Query the model
-        response = await query_model(model, messages)
+        prompt = render_prompt(stage1_template, user_query=user_query)
+
+        # Query the model, unless an identical query is already in flight
+        query = shared_queries.get((model, prompt))
+        if query is None:
+            messages = [{"role": "user", "content": prompt}]
+            query = asyncio.create_task(_hedged_query(model, messages))
+            shared_queries[(model, prompt)] = query
+        # Shielded so cancelling one agent doesn't cancel the query for the others
+        answered_by, response = await asyncio.shield(query)
+        if answered_by != model:
+            # A hedge answered; report the model that actually wrote the response
+            agent = dataclasses.replace(agent, model=answered_by)
         return agent, response, prompt
 
     # Query all agents in parallel with their individual prompts
     tasks = [query_with_agent_prompt(agent) for agent in agents]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    quorum = STAGE1_QUORUM if quorum is None else quorum
+
+    try:
+        async with aclosing(_iter_until_quorum(tasks, quorum)) as results:
+            async for position, result in results:
+                if isinstance(result, Exception):
+                    # Propagate credits exhausted error immediately
+                    if isinstance(result, OpenRouterCreditsExhaustedError):
+                        raise result
+                    # Skip other failed queries (graceful degradation)
+                    continue
+                agent, response, prompt = result
+                if response is not None:  # Only include successful responses
+                    yield position, {
+                        "agent_id": agent.id,
+                        "agent_title": agent.title,
+                        "model": agent.model,
+                        "emoji": agent.emoji,
+                        "response": response.get('content', ''),
+                        "prompt": prompt
+                    }
+    finally:
+        # Stop shared queries whose agents were all dropped
+        for query in shared_queries.values():
+            query.cancel()
+
+
+async def stage1_collect_responses(
+    user_id: str,
+    user_query: str,
+    quorum: Optional[int] = None,
+    agents: Optional[List[AgentLike]] = None,
+    prompts: Optional[PromptTable] = None
+) -> List[Dict[str, Any]]:
+    """
+    Stage 1: Collect individual responses from all council agents.
+    Each agent uses their custom prompt, or falls back to model/default prompts.
 
-    # Format results
-    stage1_results = []
-    for result in results:
-        if isinstance(result, Exception):
-            # Propagate credits exhausted error immediately
-            if isinstance(result, OpenRouterCreditsExhaustedError):
-                raise result
-            # Skip other failed queries (graceful degradation)
-            continue
-        agent, response, prompt = result
-        if response is not None:  # Only include successful responses
-            stage1_results.append({
-                "agent_id": agent["id"],
-                "agent_title": agent.get("title", agent["model"]),
-                "model": agent["model"],
-                "emoji": agent.get("emoji", "🤖"),
-                "response": response.get('content', ''),
-                "prompt": prompt
-            })
+    Args:
+        user_id: The user's identifier
+        user_query: The user's question
+        quorum: Return once this many agents responded (default STAGE1_QUORUM, 0 = all)
+        agents: Active agents, if already loaded for this council run
+        prompts: Model-level prompts, if already resolved for this council run
+
+    Returns:
+        List of dicts with 'agent', 'model', and 'response' keys
+    """
+    collected = []
+    async with aclosing(stage1_stream(user_id, user_query, quorum, agents, prompts)) as results:
+        async for position, result in results:
+            collected.append((position, result))
 
-    return stage1_results
+    collected.sort(key=lambda item: item[0])
+    return [result for _, result in collected]
 
 
 async def stage2_collect_rankings(
     user_id: str,
     user_query: str,
-    stage1_results: List[Dict[str, Any]]
+    stage1_results: List[Dict[str, Any]],
+    quorum: Optional[int] = None,
+    agents: Optional[List[AgentLike]] = None,
+    prompts: Optional[PromptTable] = None
 ) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
     """
     Stage 2: Each model ranks the anonymized responses.
@@ -92,31 +370,35 @@ async def stage2_collect_rankings(
         user_id: The user's identifier
         user_query: The original user query
         stage1_results: Results from Stage 1
+        quorum: Return once this many rankings arrived (default STAGE2_QUORUM, 0 = all)
+        agents: Active agents, if already loaded for this council run
+        prompts: Model-level prompts, if already resolved for this council run
 
     Returns:
         Tuple of (rankings list, label_to_model mapping)
     """
-    # Create anonymized labels for responses (Response A, Response B, etc.)
-    labels = [chr(65 + i) for i in range(len(stage1_results))]  # A, B, C, ...
-
-    # Create mapping from label to agent title (for de-anonymization in UI)
-    label_to_model = {
-        f"Response {label}": {
+    # Nothing to rank with a single response; skip the round-trip
+    if len(stage1_results) <= 1:
+        return [], {}
+
+    # In one pass, label each response anonymously (Response A, Response B, etc.),
+    # map labels to agent titles (for de-anonymization in UI), and build the
+    # responses text shared by all agents
+    label_to_model = {}
+    labelled_responses = []
+    for i, result in enumerate(stage1_results):
+        label = _RESPONSE_LABELS[i] if i < len(_RESPONSE_LABELS) else f"Response {chr(65 + i)}"
+        label_to_model[label] = {
             "agent_title": result['agent_title'],
             "model": result['model'],
             "emoji": result.get('emoji', '🤖')
         }
-        for label, result in zip(labels, stage1_results)
-    }
-
-    # Build the anonymized responses text (same for all agents)
-    responses_text = "\n\n".join([
-        f"Response {label}:\n{result['response']}"
-        for label, result in zip(labels, stage1_results)
-    ])
+        labelled_responses.append((label, result['response']))
+    responses_text = _labelled_text(labelled_responses, ":\n")
 
     # Load active agents for ranking
-    agents = agent_storage.get_active_agents(user_id)
+    if agents is None:
+        agents = await _load_active_agents(user_id)
 
     # If no agents configured, use legacy model list
     if not agents:
@@ -124,23 +406,34 @@ async def stage2_collect_rankings(
             {"id": f"legacy-{i}", "model": result["model"], "prompts": {}}
             for i, result in enumerate(stage1_results)
         ]
+    agents = _as_agents(agents)
+
+    # Model-level prompts for agents without their own template, resolved once
+    if prompts is None and any(agent.stage2_template is None for agent in agents):
+        prompts = await asyncio.to_thread(resolve_prompts, user_id, [agent.model for agent in agents])
+
+    # Rendered prompts by template: agents sharing a template share one copy
+    # of the (potentially large) prompt instead of each rebuilding it
+    rendered_prompts: Dict[str, str] = {}
 
     # Create tasks for each agent with their specific prompts
-    async def query_ranking_with_agent_prompt(agent: Dict[str, Any]) -> tuple[Dict[str, Any], Dict[str, Any], str]:
-        model = agent["model"]
+    async def query_ranking_with_agent_prompt(agent: Agent) -> tuple[Agent, Dict[str, Any], str]:
+        model = agent.model
 
         # Priority: agent-specific prompt > model-specific prompt > default prompt
-        if "stage2" in agent.get("prompts", {}):
-            stage2_template = agent["prompts"]["stage2"]
-        else:
-            stage2_prompt = get_prompt_for_model(user_id, model, 'stage2')
-            stage2_template = stage2_prompt['template']
+        stage2_template = agent.stage2_template
+        if stage2_template is None:
+            stage2_template = await _model_template(prompts, user_id, model, 'stage2')
 
         # Format the prompt template
-        ranking_prompt = stage2_template.format(
-            user_query=user_query,
-            responses_text=responses_text
-        )
+        ranking_prompt = rendered_prompts.get(stage2_template)
+        if ranking_prompt is None:
+            ranking_prompt = render_prompt(
+                stage2_template,
+                user_query=user_query,
+                responses_text=responses_text
+            )
+            rendered_prompts[stage2_template] = ranking_prompt
 
         messages = [{"role": "user", "content": ranking_prompt}]
 
@@ -150,7 +443,7 @@ async def stage2_collect_rankings(
 
     # Query all agents in parallel with their individual prompts
     tasks = [query_ranking_with_agent_prompt(agent) for agent in agents]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    results = await _gather_until_quorum(tasks, STAGE2_QUORUM if quorum is None else quorum)
 
     # Format results
     stage2_results = []
@@ -166,10 +459,10 @@ async def stage2_collect_rankings(
             full_text = response.get('content', '')
             parsed = parse_ranking_from_text(full_text)
             stage2_results.append({
-                "agent_id": agent.get("id"),
-                "agent_title": agent.get("title", agent["model"]),
-                "model": agent["model"],
-                "emoji": agent.get("emoji", "🤖"),
+                "agent_id": agent.id,
+                "agent_title": agent.title,
+                "model": agent.model,
+                "emoji": agent.emoji,
                 "ranking": full_text,
                 "parsed_ranking": parsed,
                 "prompt": prompt
@@ -182,7 +475,8 @@ async def stage3_synthesize_final(
     user_id: str,
     user_query: str,
     stage1_results: List[Dict[str, Any]],
-    stage2_results: List[Dict[str, Any]]
+    stage2_results: List[Dict[str, Any]],
+    prompts: Optional[PromptTable] = None
 ) -> Dict[str, Any]:
     """
     Stage 3: Chairman synthesizes final response.
@@ -192,65 +486,142 @@ async def stage3_synthesize_final(
         user_query: The original user query
         stage1_results: Individual model responses from Stage 1
         stage2_results: Rankings from Stage 2
+        prompts: Model-level prompts, if already resolved for this council run
 
     Returns:
         Dict with 'model' and 'response' keys
     """
+    # A single response needs no synthesis; return it without the chairman call
+    if len(stage1_results) == 1:
+        return _single_response_result(stage1_results[0])
+
+    chairman, messages = await _chairman_request(
+        user_id, user_query, stage1_results, stage2_results, prompts
+    )
+
+    # Query the chairman model
+    response = await query_model(chairman["model"], messages)
+
+    if response is None:
+        # Fallback if chairman fails
+        return {**chairman, "response": _STAGE3_FAILED}
+
+    return {**chairman, "response": response.get('content', '')}
+
+
+async def stage3_stream(
+    user_id: str,
+    user_query: str,
+    stage1_results: List[Dict[str, Any]],
+    stage2_results: List[Dict[str, Any]],
+    prompts: Optional[PromptTable] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stage 3, streamed: yield the chairman's response as it is generated.
+
+    Args:
+        user_id: The user's identifier
+        user_query: The original user query
+        stage1_results: Individual model responses from Stage 1
+        stage2_results: Rankings from Stage 2
+        prompts: Model-level prompts, if already resolved for this council run
+
+    Yields:
+        ('delta', text) for each chunk of the response as it arrives, then
+        ('complete', result dict as returned by stage3_synthesize_final())
+    """
+    # A single response needs no synthesis; return it without the chairman call
+    if len(stage1_results) == 1:
+        yield 'complete', _single_response_result(stage1_results[0])
+        return
+
+    chairman, messages = await _chairman_request(
+        user_id, user_query, stage1_results, stage2_results, prompts
+    )
+
+    parts = []
+    try:
+        async with aclosing(stream_model(chairman["model"], messages)) as deltas:
+            async for delta in deltas:
+                parts.append(delta)
+                yield 'delta', delta
+    except OpenRouterCreditsExhaustedError:
+        raise
+    except Exception as e:
+        # Same fallback as a failed chairman query, even after partial output
+        logger.warning(f"Streaming synthesis from {chairman['model']} failed: {e}")
+        yield 'complete', {**chairman, "response": _STAGE3_FAILED}
+        return
+
+    yield 'complete', {**chairman, "response": "".join(parts)}
+
+
+def _single_response_result(only: Dict[str, Any]) -> Dict[str, Any]:
+    """Present a lone stage 1 response as the final answer."""
+    return {
+        "agent_title": only["agent_title"],
+        "model": only["model"],
+        "emoji": only.get("emoji", "🤖"),
+        "response": only["response"],
+        "prompt": only.get("prompt", "")
+    }
+
+
+async def _chairman_request(
+    user_id: str,
+    user_query: str,
+    stage1_results: List[Dict[str, Any]],
+    stage2_results: List[Dict[str, Any]],
+    prompts: Optional[PromptTable]
+) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+    """
+    Pick the chairman and build its synthesis request.
+
+    Returns:
+        Tuple of (stage 3 result fields other than 'response', chat messages)
+    """
     # Get chairman agent or use default
-    chairman = agent_storage.get_chairman(user_id)
+    chairman = await asyncio.to_thread(agent_storage.get_chairman, user_id)
     if chairman:
         chairman_model = chairman["model"]
         # Priority: agent-specific prompt > model-specific prompt > default prompt
         if "stage3" in chairman.get("prompts", {}):
             stage3_template = chairman["prompts"]["stage3"]
         else:
-            stage3_prompt = get_prompt_for_model(user_id, chairman_model, 'stage3')
-            stage3_template = stage3_prompt['template']
+            stage3_template = await _model_template(prompts, user_id, chairman_model, 'stage3')
     else:
         chairman_model = CHAIRMAN_MODEL
-        stage3_prompt = get_prompt_for_model(user_id, chairman_model, 'stage3')
-        stage3_template = stage3_prompt['template']
+        stage3_template = await _model_template(prompts, user_id, chairman_model, 'stage3')
 
     # Build comprehensive context for chairman
-    stage1_text = "\n\n".join([
-        f"{result['agent_title']}: {result['response']}"
-        for result in stage1_results
-    ])
-
-    stage2_text = "\n\n".join([
-        f"{result['agent_title']}: {result['ranking']}"
-        for result in stage2_results
-    ])
+    stage1_text = _labelled_text(
+        ((result['agent_title'], result['response']) for result in stage1_results), ": "
+    )
+    stage2_text = _labelled_text(
+        ((result['agent_title'], result['ranking']) for result in stage2_results), ": "
+    )
 
     # Format the prompt template
-    chairman_prompt = stage3_template.format(
+    chairman_prompt = render_prompt(
+        stage3_template,
         user_query=user_query,
         stage1_text=stage1_text,
         stage2_text=stage2_text
     )
 
-    messages = [{"role": "user", "content": chairman_prompt}]
-
-    # Query the chairman model
-    response = await query_model(chairman_model, messages)
-
-    if response is None:
-        # Fallback if chairman fails
-        return {
-            "agent_title": chairman.get("title", "Chairman") if chairman else "Chairman",
-            "model": chairman_model,
-            "emoji": chairman.get("emoji", "👑") if chairman else "👑",
-            "response": "Error: Unable to generate final synthesis.",
-            "prompt": chairman_prompt
-        }
-
-    return {
+    result_fields = {
         "agent_title": chairman.get("title", "Chairman") if chairman else "Chairman",
         "model": chairman_model,
         "emoji": chairman.get("emoji", "👑") if chairman else "👑",
-        "response": response.get('content', ''),
         "prompt": chairman_prompt
     }
+    return result_fields, [{"role": "user", "content": chairman_prompt}]
+
+
+_FINAL_RANKING_HEADER = "FINAL RANKING:"
+# Number, period, optional space, "Response X" (captured)
+_NUMBERED_RESPONSE_RE = re.compile(r'\d+\.\s*(Response [A-Z])')
+_RESPONSE_LABEL_RE = re.compile(r'Response [A-Z]')
 
 
 def parse_ranking_from_text(ranking_text: str) -> List[str]:
@@ -264,26 +635,26 @@ def parse_ranking_from_text(ranking_text: str) -> List[str]:
         List of response labels in ranked order
     """
 
-    # Look for "FINAL RANKING:" section
-    if "FINAL RANKING:" in ranking_text:
-        # Extract everything after "FINAL RANKING:"
-        parts = ranking_text.split("FINAL RANKING:")
-        if len(parts) >= 2:
-            ranking_section = parts[1]
-            # Try to extract numbered list format (e.g., "1. Response A")
-            # This pattern looks for: number, period, optional space, "Response X"
-            numbered_matches = re.findall(r'\d+\.\s*Response [A-Z]', ranking_section)
-            if numbered_matches:
-                # Extract just the "Response X" part
-                return [re.search(r'Response [A-Z]', m).group() for m in numbered_matches]
+    # Look for "FINAL RANKING:" section (up to any repeated header)
+    start = ranking_text.find(_FINAL_RANKING_HEADER)
+    if start == -1:
+        # Fallback: try to find any "Response X" patterns in order
+        return _RESPONSE_LABEL_RE.findall(ranking_text)
+
+    start += len(_FINAL_RANKING_HEADER)
+    end = ranking_text.find(_FINAL_RANKING_HEADER, start)
+    if end == -1:
+        end = len(ranking_text)
 
-            # Fallback: Extract all "Response X" patterns in order
-            matches = re.findall(r'Response [A-Z]', ranking_section)
-            return matches
+    # Scan the section in place rather than copying it out of the text.
+    # Try to extract numbered list format (e.g., "1. Response A");
+    # the pattern captures just the "Response X" part
+    numbered_matches = _NUMBERED_RESPONSE_RE.findall(ranking_text, start, end)
+    if numbered_matches:
+        return numbered_matches
 
-    # Fallback: try to find any "Response X" patterns in order
-    matches = re.findall(r'Response [A-Z]', ranking_text)
-    return matches
+    # Fallback: Extract all "Response X" patterns in order
+    return _RESPONSE_LABEL_RE.findall(ranking_text, start, end)
 
 
 def calculate_aggregate_rankings(
@@ -301,39 +672,40 @@ def calculate_aggregate_rankings(
         List of dicts with agent info and average rank, sorted best to worst
     """
 
-    # Track positions for each agent (by agent_title)
-    agent_positions = defaultdict(list)
+    # Index agent info by title once (the first label with a title wins)
+    title_to_info: Dict[str, Dict[str, str]] = {}
+    for info in label_to_model.values():
+        title_to_info.setdefault(info["agent_title"], info)
 
-    for ranking in stage2_results:
-        ranking_text = ranking['ranking']
+    # Running position totals for each agent (by agent_title)
+    position_sums: Dict[str, int] = {}
+    position_counts: Dict[str, int] = {}
 
-        # Parse the ranking from the structured format
-        parsed_ranking = parse_ranking_from_text(ranking_text)
+    for ranking in stage2_results:
+        # Reuse the ranking parsed in stage 2 when available
+        parsed_ranking = ranking.get('parsed_ranking')
+        if parsed_ranking is None:
+            parsed_ranking = parse_ranking_from_text(ranking['ranking'])
 
         for position, label in enumerate(parsed_ranking, start=1):
-            if label in label_to_model:
-                agent_info = label_to_model[label]
+            agent_info = label_to_model.get(label)
+            if agent_info is not None:
                 agent_title = agent_info["agent_title"]
-                agent_positions[agent_title].append(position)
+                position_sums[agent_title] = position_sums.get(agent_title, 0) + position
+                position_counts[agent_title] = position_counts.get(agent_title, 0) + 1
 
     # Calculate average position for each agent
     aggregate = []
-    for agent_title, positions in agent_positions.items():
-        if positions:
-            avg_rank = sum(positions) / len(positions)
-            # Get model and emoji from label_to_model
-            agent_info = next(
-                (info for label, info in label_to_model.items()
-                 if info["agent_title"] == agent_title),
-                {}
-            )
-            aggregate.append({
-                "agent_title": agent_title,
-                "model": agent_info.get("model", ""),
-                "emoji": agent_info.get("emoji", "🤖"),
-                "average_rank": round(avg_rank, 2),
-                "rankings_count": len(positions)
-            })
+    for agent_title, total in position_sums.items():
+        count = position_counts[agent_title]
+        agent_info = title_to_info[agent_title]
+        aggregate.append({
+            "agent_title": agent_title,
+            "model": agent_info.get("model", ""),
+            "emoji": agent_info.get("emoji", "🤖"),
+            "average_rank": round(total / count, 2),
+            "rankings_count": count
+        })
 
     # Sort by average rank (lower is better)
     aggregate.sort(key=lambda x: x['average_rank'])
@@ -390,8 +762,12 @@ async def run_full_council(user_id: str, user_query: str) -> Tuple[List, List, D
     Returns:
         Tuple of (stage1_results, stage2_results, stage3_result, metadata)
     """
+    # The agent list and prompts can't change mid-run, so load them once for all stages
+    agents = await _load_active_agents(user_id)
+    prompts = await load_council_prompts(user_id, agents)
+
     # Stage 1: Collect individual responses
-    stage1_results = await stage1_collect_responses(user_id, user_query)
+    stage1_results = await stage1_collect_responses(user_id, user_query, agents=agents, prompts=prompts)
 
     # If no models responded successfully, return error
     if not stage1_results:
@@ -401,7 +777,9 @@ async def run_full_council(user_id: str, user_query: str) -> Tuple[List, List, D
         }, {}
 
     # Stage 2: Collect rankings
-    stage2_results, label_to_model = await stage2_collect_rankings(user_id, user_query, stage1_results)
+    stage2_results, label_to_model = await stage2_collect_rankings(
+        user_id, user_query, stage1_results, agents=agents, prompts=prompts
+    )
 
     # Calculate aggregate rankings
     aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
@@ -411,7 +789,8 @@ async def run_full_council(user_id: str, user_query: str) -> Tuple[List, List, D
         user_id,
         user_query,
         stage1_results,
-        stage2_results
+        stage2_results,
+        prompts=prompts
     )
 
     # Prepare metadata
@@ -0,0 +1,84 @@
+"""File helpers shared by the JSON stores: atomic writes, cache signatures and per-key locks."""
+
+import os
+import threading
+import weakref
+from pathlib import Path
+from typing import Callable, Hashable, Tuple, Union
+
+# (st_ino, st_mtime_ns, st_size): changes whenever a file is rewritten or replaced
+FileSignature = Tuple[int, int, int]
+
+
+def stat_signature(st: os.stat_result) -> FileSignature:
+    """Return the signature used to validate cached file contents from a stat result."""
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def file_signature(path: Union[str, Path]) -> FileSignature:
+    """
+    Return the signature used to validate cached file contents.
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    return stat_signature(os.stat(path))
+
+
+def write_file_atomic(path: Union[str, Path], data: bytes) -> None:
+    """
+    Replace a file's contents so readers never observe a partial write.
+
+    The data is written to a temporary sibling file, flushed to disk with
+    fsync() and moved over the target with os.replace(), so a crash leaves
+    either the old or the new contents. The parent directory is created on
+    the first write that needs it, rather than checked before every write.
+
+    Args:
+        path: File to replace
+        data: Complete new contents
+    """
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        try:
+            f = open(tmp_path, 'wb')
+        except FileNotFoundError:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            f = open(tmp_path, 'wb')
+        with f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class KeyedLocks:
+    """
+    Locks created on first use for each key, e.g. one per user.
+
+    A lock is only kept while something references it (a caller holding or
+    waiting for it), so keys that are no longer in use don't accumulate.
+    """
+
+    def __init__(self, factory: Callable[[], threading.RLock] = threading.RLock):
+        self._factory = factory
+        self._locks: "weakref.WeakValueDictionary[Hashable, threading.RLock]" = weakref.WeakValueDictionary()
+        self._guard = threading.Lock()
+
+    def __call__(self, key: Hashable) -> threading.RLock:
+        """Get the lock for a key."""
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = self._factory()
+            return lock
+
+    def __len__(self) -> int:
+        """Number of keys whose lock is currently referenced."""
+        return len(self._locks)
@@ -1,30 +1,107 @@
 """FastAPI backend for LLM Council."""
 
+import hashlib
 import os
 from pathlib import Path
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 import uuid
-import json
 import asyncio
+from contextlib import aclosing, asynccontextmanager
 
 from . import storage
 from . import prompt_storage
 from . import agent_storage
+from . import json_utils
+from . import response_cache
 from .auth import get_current_user_id
 from .council import (
     run_full_council, generate_conversation_title,
-    stage1_collect_responses, stage2_collect_rankings,
-    stage3_synthesize_final, calculate_aggregate_rankings
+    stage1_stream, stage2_collect_rankings,
+    stage3_stream, calculate_aggregate_rankings, load_council_prompts
 )
 from .config import COUNCIL_MODELS, CHAIRMAN_MODEL
-from .openrouter import OpenRouterCreditsExhaustedError
+from .openrouter import OpenRouterCreditsExhaustedError, close_client
 
-app = FastAPI(title="LLM Council API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the shared OpenRouter connection pool on shutdown."""
+    yield
+    await close_client()
+
+
+app = FastAPI(title="LLM Council API", lifespan=lifespan)
+
+
+def sse_event(event: Dict[str, Any]) -> bytes:
+    """
+    Encode an event as a Server-Sent Events frame.
+
+    Args:
+        event: The event payload
+
+    Returns:
+        The encoded ``data:`` frame
+    """
+    return b"data: " + json_utils.dumps(event) + b"\n\n"
+
+
+# Frames without a payload are the same for every stream, so encode them once
+_STAGE1_START = sse_event({'type': 'stage1_start'})
+_STAGE2_START = sse_event({'type': 'stage2_start'})
+_STAGE3_START = sse_event({'type': 'stage3_start'})
+_COMPLETE = sse_event({'type': 'complete'})
+
+
+def json_response(content: Any) -> Response:
+    """
+    Encode a large JSON payload directly with json_utils.
+
+    Skips FastAPI's jsonable_encoder pass, which walks every nested value of
+    the council results before encoding them.
+
+    Args:
+        content: The JSON-serializable payload
+
+    Returns:
+        An application/json response
+    """
+    return Response(json_utils.dumps(content), media_type="application/json")
+
+
+def revalidated_json_response(request: Request, content: Any) -> Response:
+    """
+    Encode a JSON payload with an ETag, answering 304 when the client's copy matches.
+
+    Used for endpoints the frontend re-fetches while their data rarely changes;
+    the browser revalidates with If-None-Match and skips the unchanged body.
+    The ETag is weak because GZipMiddleware may re-encode the body, and
+    If-None-Match is compared weakly (RFC 9110, section 13.1.2).
+
+    Args:
+        request: The incoming request
+        content: The JSON-serializable payload
+
+    Returns:
+        A 304 response when If-None-Match matches, otherwise the JSON response
+    """
+    body = json_utils.dumps(content)
+    opaque_tag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": f"W/{opaque_tag}", "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if opaque_tag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
 
 # CORS configuration - allow localhost for dev and production domain
 CORS_ORIGINS = [
@@ -43,9 +120,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization"],
+    # Let browsers reuse a preflight for a day (Chrome caps this at 2 hours)
+    max_age=86400,
 )
 
 
+class StreamSafeGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that never compresses the council's SSE streams.
+
+    Compressing a stream buffers its events. Recent Starlette releases skip
+    text/event-stream on their own, but older ones allowed by the FastAPI
+    requirement don't, so the stream routes are excluded here explicitly.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/message/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Council responses are several verbatim model answers and compress well.
+app.add_middleware(StreamSafeGZipMiddleware, minimum_size=1024)
+
+
 class CreateConversationRequest(BaseModel):
     """Request to create a new conversation."""
     pass
@@ -64,11 +163,16 @@ class UpdatePromptRequest(BaseModel):
     notes: str = Field(default="", max_length=5000)
 
 
+# OpenRouter model identifier, e.g. "openai/gpt-5.1". Pydantic compiles this once
+# per model class with the linear-time regex engine in pydantic-core.
+MODEL_ID_PATTERN = r'^[a-zA-Z0-9_-]+/[a-zA-Z0-9._-]+$'
+
+
 class CreateAgentRequest(BaseModel):
     """Request to create a new agent."""
     title: str = Field(..., min_length=1, max_length=255)
     role: str = Field(..., min_length=1, max_length=1000)
-    model: str = Field(..., min_length=3, max_length=100, pattern=r'^[a-zA-Z0-9_-]+/[a-zA-Z0-9._-]+$')
+    model: str = Field(..., min_length=3, max_length=100, pattern=MODEL_ID_PATTERN)
     prompts: Dict[str, str] = {}
     active: bool = True
     emoji: str = Field(default="🤖", max_length=10)
@@ -78,7 +182,7 @@ class UpdateAgentRequest(BaseModel):
     """Request to update an agent."""
     title: str = Field(default=None, min_length=1, max_length=255)
     role: str = Field(default=None, min_length=1, max_length=1000)
-    model: str = Field(default=None, min_length=3, max_length=100, pattern=r'^[a-zA-Z0-9_-]+/[a-zA-Z0-9._-]+$')
+    model: str = Field(default=None, min_length=3, max_length=100, pattern=MODEL_ID_PATTERN)
     prompts: Dict[str, str] = None
     active: bool = None
     emoji: str = Field(default=None, max_length=10)
@@ -111,7 +215,10 @@ async def health_check():
 @app.get("/api/conversations", response_model=List[ConversationMetadata])
 async def list_conversations(user_id: str = Depends(get_current_user_id)):
     """List all conversations for the current user (metadata only)."""
-    return storage.list_conversations(user_id)
+    conversations = await asyncio.to_thread(storage.list_conversations, user_id)
+    # Storage output is trusted: the response model documents it, but
+    # re-validating every entry on each request is skipped
+    return json_response(conversations)
 
 
 @app.post("/api/conversations", response_model=Conversation)
@@ -121,7 +228,7 @@ async def create_conversation(
 ):
     """Create a new conversation for the current user."""
     conversation_id = str(uuid.uuid4())
-    conversation = storage.create_conversation(user_id, conversation_id)
+    conversation = await asyncio.to_thread(storage.create_conversation, user_id, conversation_id)
     return conversation
 
 
@@ -131,10 +238,12 @@ async def get_conversation(
     user_id: str = Depends(get_current_user_id)
 ):
     """Get a specific conversation with all its messages."""
-    conversation = storage.get_conversation(user_id, conversation_id)
+    conversation = await asyncio.to_thread(storage.get_conversation, user_id, conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
+    # Sent without re-validating every stored message against the response
+    # model; only its fields are included (e.g. not the owner's user_id)
+    return json_response({field: conversation[field] for field in Conversation.model_fields})
 
 
 @app.delete("/api/conversations/{conversation_id}")
@@ -143,7 +252,7 @@ async def delete_conversation(
     user_id: str = Depends(get_current_user_id)
 ):
     """Delete a conversation."""
-    success = storage.delete_conversation(user_id, conversation_id)
+    success = await asyncio.to_thread(storage.delete_conversation, user_id, conversation_id)
     if not success:
         raise HTTPException(status_code=404, detail="Conversation not found")
     return {"success": True}
@@ -159,29 +268,46 @@ async def send_message(
     Send a message and run the 3-stage council process.
     Returns the complete response with all stages.
     """
-    # Check if conversation exists
-    conversation = storage.get_conversation(user_id, conversation_id)
+    # Check if conversation exists (its metadata is enough; the history isn't needed)
+    conversation = await asyncio.to_thread(storage.get_conversation_metadata, user_id, conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     # Check if this is the first message
-    is_first_message = len(conversation["messages"]) == 0
+    is_first_message = conversation["message_count"] == 0
 
-    # Add user message
-    storage.add_user_message(user_id, conversation_id, request.content)
-
-    # If this is the first message, generate a title
+    # If this is the first message, generate a title alongside the council
+    title_task = None
     if is_first_message:
-        title = await generate_conversation_title(request.content)
-        storage.update_conversation_title(user_id, conversation_id, title)
-
-    # Run the 3-stage council process
-    stage1_results, stage2_results, stage3_result, metadata = await run_full_council(
-        user_id, request.content
-    )
-
-    # Add assistant message with all stages
-    storage.add_assistant_message(
+        title_task = asyncio.create_task(generate_conversation_title(request.content))
+
+    try:
+        # Add user message
+        await asyncio.to_thread(storage.add_user_message, user_id, conversation_id, request.content)
+
+        # Run the 3-stage council process, unless this question was just answered
+        # or is being answered right now
+        council_key = await asyncio.to_thread(response_cache.council_key, user_id, request.content)
+        council_result = await response_cache.find_council(council_key)
+        if council_result is None:
+            with response_cache.council_run(council_key) as run:
+                council_result = await run_full_council(user_id, request.content)
+                run.set_result(council_result)
+            response_cache.cache_council(council_key, council_result)
+        stage1_results, stage2_results, stage3_result, metadata = council_result
+    except BaseException:
+        if title_task:
+            title_task.cancel()
+        raise
+
+    # Save the title before responding, so the client's next listing shows it
+    if title_task:
+        title = await title_task
+        await asyncio.to_thread(storage.update_conversation_title, user_id, conversation_id, title)
+
+    # Save the assistant message before responding, off the event loop
+    await asyncio.to_thread(
+        storage.add_assistant_message,
         user_id,
         conversation_id,
         stage1_results,
@@ -190,12 +316,12 @@ async def send_message(
     )
 
     # Return the complete response with metadata
-    return {
+    return json_response({
         "stage1": stage1_results,
         "stage2": stage2_results,
         "stage3": stage3_result,
         "metadata": metadata
-    }
+    })
 
 
 @app.post("/api/conversations/{conversation_id}/message/stream")
@@ -208,48 +334,90 @@ async def send_message_stream(
     Send a message and stream the 3-stage council process.
     Returns Server-Sent Events as each stage completes.
     """
-    # Check if conversation exists
-    conversation = storage.get_conversation(user_id, conversation_id)
+    # Check if conversation exists (its metadata is enough; the history isn't needed)
+    conversation = await asyncio.to_thread(storage.get_conversation_metadata, user_id, conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     # Check if this is the first message
-    is_first_message = len(conversation["messages"]) == 0
+    is_first_message = conversation["message_count"] == 0
 
     async def event_generator():
+        title_task = None
         try:
-            # Add user message
-            storage.add_user_message(user_id, conversation_id, request.content)
-
             # Start title generation in parallel (don't await yet)
-            title_task = None
             if is_first_message:
                 title_task = asyncio.create_task(generate_conversation_title(request.content))
 
-            # Stage 1: Collect responses
-            yield f"data: {json.dumps({'type': 'stage1_start'})}\n\n"
-            stage1_results = await stage1_collect_responses(user_id, request.content)
-            yield f"data: {json.dumps({'type': 'stage1_complete', 'data': stage1_results})}\n\n"
-
-            # Stage 2: Collect rankings
-            yield f"data: {json.dumps({'type': 'stage2_start'})}\n\n"
-            stage2_results, label_to_model = await stage2_collect_rankings(user_id, request.content, stage1_results)
-            aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
-            yield f"data: {json.dumps({'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings}})}\n\n"
-
-            # Stage 3: Synthesize final answer
-            yield f"data: {json.dumps({'type': 'stage3_start'})}\n\n"
-            stage3_result = await stage3_synthesize_final(user_id, request.content, stage1_results, stage2_results)
-            yield f"data: {json.dumps({'type': 'stage3_complete', 'data': stage3_result})}\n\n"
+            # Add user message
+            await asyncio.to_thread(storage.add_user_message, user_id, conversation_id, request.content)
+
+            council_key = await asyncio.to_thread(response_cache.council_key, user_id, request.content)
+            cached = await response_cache.find_council(council_key)
+            if cached is not None:
+                # This question was just answered, or an identical run just finished:
+                # replay the stored stages
+                stage1_results, stage2_results, stage3_result, metadata = cached
+                yield _STAGE1_START
+                yield sse_event({'type': 'stage1_complete', 'data': stage1_results})
+                yield _STAGE2_START
+                yield sse_event({'type': 'stage2_complete', 'data': stage2_results, 'metadata': metadata})
+                yield _STAGE3_START
+                yield sse_event({'type': 'stage3_complete', 'data': stage3_result})
+            else:
+                with response_cache.council_run(council_key) as run:
+                    # The agent list and prompts can't change mid-run, so load them once for all stages
+                    agents = await asyncio.to_thread(agent_storage.get_active_agents, user_id)
+                    prompts = await load_council_prompts(user_id, agents)
+
+                    # Stage 1: Stream each response as it arrives
+                    yield _STAGE1_START
+                    stage1_by_position = []
+                    async with aclosing(stage1_stream(user_id, request.content, agents=agents, prompts=prompts)) as stage1_items:
+                        async for position, result in stage1_items:
+                            stage1_by_position.append((position, result))
+                            yield sse_event({'type': 'stage1_item', 'data': result})
+                    # The complete event keeps council order, regardless of arrival order
+                    stage1_by_position.sort(key=lambda item: item[0])
+                    stage1_results = [result for _, result in stage1_by_position]
+                    yield sse_event({'type': 'stage1_complete', 'data': stage1_results})
+
+                    # Stage 2: Collect rankings
+                    yield _STAGE2_START
+                    stage2_results, label_to_model = await stage2_collect_rankings(
+                        user_id, request.content, stage1_results, agents=agents, prompts=prompts
+                    )
+                    aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
+                    metadata = {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings}
+                    yield sse_event({'type': 'stage2_complete', 'data': stage2_results, 'metadata': metadata})
+
+                    # Stage 3: Synthesize final answer
+                    yield _STAGE3_START
+                    async with aclosing(stage3_stream(
+                        user_id, request.content, stage1_results, stage2_results, prompts=prompts
+                    )) as stage3_items:
+                        async for kind, data in stage3_items:
+                            if kind == 'delta':
+                                # Show the final answer as the chairman writes it
+                                yield sse_event({'type': 'stage3_delta', 'data': {'delta': data}})
+                            else:
+                                stage3_result = data
+                    council_result = (stage1_results, stage2_results, stage3_result, metadata)
+                    run.set_result(council_result)
+                    yield sse_event({'type': 'stage3_complete', 'data': stage3_result})
+                response_cache.cache_council(council_key, council_result)
 
             # Wait for title generation if it was started
             if title_task:
                 title = await title_task
-                storage.update_conversation_title(user_id, conversation_id, title)
-                yield f"data: {json.dumps({'type': 'title_complete', 'data': {'title': title}})}\n\n"
-
-            # Save complete assistant message
-            storage.add_assistant_message(
+                # Saved before the event: the client reloads the sidebar when it arrives
+                await asyncio.to_thread(storage.update_conversation_title, user_id, conversation_id, title)
+                yield sse_event({'type': 'title_complete', 'data': {'title': title}})
+
+            # Save the assistant message before the complete event, which makes
+            # the client reload the conversation list
+            await asyncio.to_thread(
+                storage.add_assistant_message,
                 user_id,
                 conversation_id,
                 stage1_results,
@@ -258,21 +426,27 @@ async def send_message_stream(
             )
 
             # Send completion event
-            yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+            yield _COMPLETE
 
         except OpenRouterCreditsExhaustedError as e:
             # Send specific error for credits exhausted
-            yield f"data: {json.dumps({'type': 'error', 'error_code': 'credits_exhausted', 'message': str(e)})}\n\n"
+            yield sse_event({'type': 'error', 'error_code': 'credits_exhausted', 'message': str(e)})
 
         except Exception as e:
             # Send error event
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            yield sse_event({'type': 'error', 'message': str(e)})
+
+        finally:
+            # No title is needed once the council has failed or the client has gone
+            if title_task and not title_task.done():
+                title_task.cancel()
 
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
         headers={
-            "Cache-Control": "no-cache",
+            # no-transform keeps proxies from compressing (and buffering) events
+            "Cache-Control": "no-cache, no-transform",
             "Connection": "keep-alive",
         }
     )
@@ -281,6 +455,7 @@ async def send_message_stream(
 # Agent endpoints - all require auth
 @app.get("/api/agents")
 async def list_agents(
+    request: Request,
     active_only: bool = False,
     user_id: str = Depends(get_current_user_id)
 ):
@@ -291,8 +466,10 @@ async def list_agents(
         active_only: If True, only return active agents
     """
     if active_only:
-        return agent_storage.get_active_agents(user_id)
-    return agent_storage.get_all_agents(user_id)
+        agents = await asyncio.to_thread(agent_storage.get_active_agents, user_id)
+    else:
+        agents = await asyncio.to_thread(agent_storage.get_all_agents, user_id)
+    return revalidated_json_response(request, agents)
 
 
 @app.post("/api/agents")
@@ -301,7 +478,8 @@ async def create_agent(
     user_id: str = Depends(get_current_user_id)
 ):
     """Create a new agent configuration for the current user."""
-    agent = agent_storage.create_agent(
+    agent = await asyncio.to_thread(
+        agent_storage.create_agent,
         user_id,
         title=request.title,
         role=request.role,
@@ -316,14 +494,14 @@ async def create_agent(
 @app.post("/api/agents/initialize")
 async def initialize_default_agents(user_id: str = Depends(get_current_user_id)):
     """Initialize default agent templates for the current user."""
-    agents = agent_storage.initialize_default_agents(user_id)
+    agents = await asyncio.to_thread(agent_storage.initialize_default_agents, user_id)
     return {"agents": agents, "count": len(agents)}
 
 
 @app.get("/api/agents/chairman")
 async def get_chairman_agent(user_id: str = Depends(get_current_user_id)):
     """Get the current chairman agent configuration for the user."""
-    chairman = agent_storage.get_chairman(user_id)
+    chairman = await asyncio.to_thread(agent_storage.get_chairman, user_id)
     return {"chairman": chairman}
 
 
@@ -333,7 +511,9 @@ async def set_chairman_agent(
     user_id: str = Depends(get_current_user_id)
 ):
     """Set which agent is the chairman for the user."""
-    success = agent_storage.set_chairman(user_id, agent_id if agent_id != "default" else None)
+    success = await asyncio.to_thread(
+        agent_storage.set_chairman, user_id, agent_id if agent_id != "default" else None
+    )
     if not success:
         raise HTTPException(status_code=404, detail="Agent not found")
     return {"success": True, "chairman": agent_id}
@@ -345,7 +525,7 @@ async def get_agent(
     user_id: str = Depends(get_current_user_id)
 ):
     """Get a specific agent configuration."""
-    agent = agent_storage.get_agent_by_id(user_id, agent_id)
+    agent = await asyncio.to_thread(agent_storage.get_agent_by_id, user_id, agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     return agent
@@ -373,7 +553,7 @@ async def update_agent(
     if request.emoji is not None:
         updates["emoji"] = request.emoji
 
-    agent = agent_storage.update_agent(user_id, agent_id, updates)
+    agent = await asyncio.to_thread(agent_storage.update_agent, user_id, agent_id, updates)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     return agent
@@ -385,7 +565,7 @@ async def delete_agent(
     user_id: str = Depends(get_current_user_id)
 ):
     """Delete an agent configuration."""
-    success = agent_storage.delete_agent(user_id, agent_id)
+    success = await asyncio.to_thread(agent_storage.delete_agent, user_id, agent_id)
     if not success:
         raise HTTPException(status_code=404, detail="Agent not found")
     return {"success": True}
@@ -393,17 +573,19 @@ async def delete_agent(
 
 # Model and prompt endpoints - all require auth
 @app.get("/api/models")
-async def get_models(user_id: str = Depends(get_current_user_id)):
+async def get_models(request: Request, user_id: str = Depends(get_current_user_id)):
     """Get the list of council models and chairman."""
-    return {
+    return revalidated_json_response(request, {
         "council": COUNCIL_MODELS,
         "chairman": CHAIRMAN_MODEL,
-        "all": list(set(COUNCIL_MODELS + [CHAIRMAN_MODEL]))
-    }
+        # Deduplicated in a fixed order, so the ETag is stable across restarts
+        "all": list(dict.fromkeys(COUNCIL_MODELS + [CHAIRMAN_MODEL]))
+    })
 
 
 @app.get("/api/prompts")
 async def get_prompts(
+    request: Request,
     model: str = None,
     user_id: str = Depends(get_current_user_id)
 ):
@@ -415,14 +597,12 @@ async def get_prompts(
     """
     if model:
         # Return prompts for specific model (with fallback to defaults)
-        return {
-            "stage1": prompt_storage.get_prompt_for_model(user_id, model, "stage1"),
-            "stage2": prompt_storage.get_prompt_for_model(user_id, model, "stage2"),
-            "stage3": prompt_storage.get_prompt_for_model(user_id, model, "stage3"),
-        }
+        prompts = await asyncio.to_thread(prompt_storage.resolve_prompts, user_id, [model])
+        content = {stage: prompts[(model, stage)] for stage in ("stage1", "stage2", "stage3")}
     else:
         # Return all prompts (defaults and per-model overrides)
-        return prompt_storage.get_all_model_prompts(user_id)
+        content = await asyncio.to_thread(prompt_storage.get_all_model_prompts, user_id)
+    return revalidated_json_response(request, content)
 
 
 @app.put("/api/prompts/{stage}")
@@ -450,7 +630,7 @@ async def update_prompt(
         "notes": request.notes
     }
 
-    updated_prompts = prompt_storage.update_prompt(user_id, stage, prompt_data, model)
+    updated_prompts = await asyncio.to_thread(prompt_storage.update_prompt, user_id, stage, prompt_data, model)
     return updated_prompts
 
 
@@ -470,32 +650,52 @@ async def reset_prompt(
     if stage not in ['stage1', 'stage2', 'stage3']:
         raise HTTPException(status_code=400, detail="Invalid stage. Must be 'stage1', 'stage2', or 'stage3'")
 
-    updated_prompts = prompt_storage.reset_prompt(user_id, stage, model)
+    updated_prompts = await asyncio.to_thread(prompt_storage.reset_prompt, user_id, stage, model)
     return updated_prompts
 
 
 @app.delete("/api/prompts")
 async def reset_all_prompts(user_id: str = Depends(get_current_user_id)):
     """Reset all prompts to defaults for the current user."""
-    default_prompts = prompt_storage.reset_all_prompts(user_id)
+    default_prompts = await asyncio.to_thread(prompt_storage.reset_all_prompts, user_id)
     return default_prompts
 
 
 # Static file serving for production (must be after all API routes)
 FRONTEND_DIR = Path(__file__).parent.parent / "frontend" / "dist"
 
+
+def list_frontend_files(frontend_dir: Path) -> frozenset:
+    """
+    List the files of a built frontend.
+
+    Args:
+        frontend_dir: The build output directory
+
+    Returns:
+        Paths relative to frontend_dir, in URL (POSIX) form
+    """
+    return frozenset(
+        path.relative_to(frontend_dir).as_posix()
+        for path in frontend_dir.rglob("*")
+        if path.is_file()
+    )
+
+
 if FRONTEND_DIR.exists():
     # Serve static assets
     app.mount("/assets", StaticFiles(directory=FRONTEND_DIR / "assets"), name="assets")
 
+    # The build doesn't change while the server runs, so list it once
+    FRONTEND_FILES = list_frontend_files(FRONTEND_DIR)
+
     # Serve index.html for all non-API routes (SPA routing)
     @app.get("/{full_path:path}")
     async def serve_spa(full_path: str):
         """Serve the SPA for any non-API route."""
         # Check if it's a static file
-        file_path = FRONTEND_DIR / full_path
-        if file_path.is_file():
-            return FileResponse(file_path)
+        if full_path in FRONTEND_FILES:
+            return FileResponse(FRONTEND_DIR / full_path)
         # Otherwise serve index.html for SPA routing
         return FileResponse(FRONTEND_DIR / "index.html")
 
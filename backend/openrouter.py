@@ -1,8 +1,30 @@
 """OpenRouter API client for making LLM requests."""
 
+import asyncio
+import contextlib
+import hashlib
+import importlib.util
+import logging
 import httpx
-from typing import List, Dict, Any, Optional
-from .config import OPENROUTER_API_KEY, OPENROUTER_API_URL
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from . import json_utils
+from .config import OPENROUTER_API_KEY, OPENROUTER_API_URL, MAX_PARALLEL_QUERIES
+
+logger = logging.getLogger(__name__)
+
+# Process-wide client so council fan-out reuses kept-alive connections
+# (and HTTP/2 multiplexing when h2 is installed) instead of a TLS handshake
+# per query. Created on first use; closed by close_client() at shutdown.
+_client: Optional[httpx.AsyncClient] = None
+
+# Identical queries in flight on the shared client, across all conversations:
+# (model, messages digest, timeout) -> [request task, number of waiters]
+_in_flight: Dict[Tuple[str, str, float], list] = {}
+# Queries answered by joining an identical in-flight request
+coalesced_requests = 0
+
+# Request slots enforcing MAX_PARALLEL_QUERIES; created on first use
+_request_slots: Optional[asyncio.Semaphore] = None
 
 
 class OpenRouterCreditsExhaustedError(Exception):
@@ -10,18 +32,58 @@ class OpenRouterCreditsExhaustedError(Exception):
     pass
 
 
+def get_client() -> httpx.AsyncClient:
+    """Return the shared OpenRouter HTTP client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            # Keep every pooled connection, and keep it long enough to outlast
+            # the pause between council stages and between messages (httpx
+            # drops idle connections after 5s by default)
+            limits=httpx.Limits(
+                max_connections=64, max_keepalive_connections=64, keepalive_expiry=90.0
+            ),
+            http2=importlib.util.find_spec("h2") is not None,
+        )
+    return _client
+
+
+def _get_request_slots() -> Optional[asyncio.Semaphore]:
+    """Return the semaphore capping concurrent requests, or None when uncapped."""
+    global _request_slots
+    if MAX_PARALLEL_QUERIES <= 0:
+        return None
+    if _request_slots is None:
+        _request_slots = asyncio.Semaphore(MAX_PARALLEL_QUERIES)
+    return _request_slots
+
+
+async def close_client() -> None:
+    """Close the shared OpenRouter HTTP client, if one was created."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
 async def query_model(
     model: str,
     messages: List[Dict[str, str]],
-    timeout: float = 120.0
+    timeout: float = 120.0,
+    client: Optional[httpx.AsyncClient] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Query a single model via OpenRouter API.
 
+    Queries on the shared client join an identical request (same model,
+    messages and timeout) that is already in flight instead of sending
+    another one.
+
     Args:
         model: OpenRouter model identifier (e.g., "openai/gpt-4o")
         messages: List of message dicts with 'role' and 'content'
         timeout: Request timeout in seconds
+        client: HTTP client to use (defaults to the shared client)
 
     Returns:
         Response dict with 'content' and optional 'reasoning_details', or None if failed
@@ -29,39 +91,87 @@ async def query_model(
     Raises:
         OpenRouterCreditsExhaustedError: When API credits are exhausted (HTTP 402)
     """
-    headers = {
+    if client is not None:
+        return await _post_query(model, messages, timeout, client)
+
+    global coalesced_requests
+    key = (model, hashlib.sha256(json_utils.dumps(messages)).hexdigest(), timeout)
+    entry = _in_flight.get(key)
+    if entry is None:
+        task = asyncio.create_task(_post_query(model, messages, timeout, get_client()))
+        entry = _in_flight[key] = [task, 0]
+        task.add_done_callback(lambda _: _forget_in_flight(key, entry))
+    else:
+        coalesced_requests += 1
+        logger.info(f"Coalesced query to {model} with an identical in-flight request ({coalesced_requests} total)")
+
+    entry[1] += 1
+    try:
+        # Shielded so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(entry[0])
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not entry[0].done():
+            # Nobody is waiting any more; later callers must not join a cancelled request
+            _forget_in_flight(key, entry)
+            entry[0].cancel()
+
+
+def _forget_in_flight(key: Tuple[str, str, float], entry: list) -> None:
+    """Stop offering an in-flight request to new callers."""
+    if _in_flight.get(key) is entry:
+        del _in_flight[key]
+
+
+def _request_headers() -> Dict[str, str]:
+    """Headers for an OpenRouter chat completion request."""
+    return {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
     }
 
+
+def _raise_for_status(response: httpx.Response) -> None:
+    """Raise for an unsuccessful response, singling out exhausted credits."""
+    # Check for credits exhausted (HTTP 402 Payment Required)
+    if response.status_code == 402:
+        raise OpenRouterCreditsExhaustedError(
+            "OpenRouter API credits exhausted. Daily limit resets at midnight UTC."
+        )
+
+    response.raise_for_status()
+
+
+async def _post_query(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float,
+    client: httpx.AsyncClient
+) -> Optional[Dict[str, Any]]:
+    """Send one chat completion request and extract the reply."""
     payload = {
         "model": model,
         "messages": messages,
     }
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with _get_request_slots() or contextlib.nullcontext():
             response = await client.post(
                 OPENROUTER_API_URL,
-                headers=headers,
-                json=payload
+                headers=_request_headers(),
+                json=payload,
+                timeout=timeout
             )
 
-            # Check for credits exhausted (HTTP 402 Payment Required)
-            if response.status_code == 402:
-                raise OpenRouterCreditsExhaustedError(
-                    "OpenRouter API credits exhausted. Daily limit resets at midnight UTC."
-                )
+        _raise_for_status(response)
 
-            response.raise_for_status()
+        data = response.json()
+        message = data['choices'][0]['message']
 
-            data = response.json()
-            message = data['choices'][0]['message']
-
-            return {
-                'content': message.get('content'),
-                'reasoning_details': message.get('reasoning_details')
-            }
+        return {
+            'content': message.get('content'),
+            'reasoning_details': message.get('reasoning_details')
+        }
 
     except OpenRouterCreditsExhaustedError:
         # Re-raise credit errors so they propagate up
@@ -71,6 +181,64 @@ async def query_model(
         return None
 
 
+async def stream_model(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float = 120.0
+) -> AsyncIterator[str]:
+    """
+    Stream a single model's reply via OpenRouter as it is generated.
+
+    Unlike query_model(), failures are raised rather than reported as None,
+    since the caller may already have passed part of the reply on.
+
+    Args:
+        model: OpenRouter model identifier (e.g., "openai/gpt-4o")
+        messages: List of message dicts with 'role' and 'content'
+        timeout: Timeout in seconds for connecting and for each read
+
+    Yields:
+        Chunks of the reply content, in order
+
+    Raises:
+        OpenRouterCreditsExhaustedError: When API credits are exhausted (HTTP 402)
+        httpx.HTTPError: When the request fails
+        RuntimeError: When OpenRouter reports an error mid-stream
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": True,
+    }
+
+    async with _get_request_slots() or contextlib.nullcontext():
+        async with get_client().stream(
+            "POST",
+            OPENROUTER_API_URL,
+            headers=_request_headers(),
+            json=payload,
+            timeout=timeout
+        ) as response:
+            _raise_for_status(response)
+
+            # Server-sent events: "data: {chunk}" lines, ": comment" keep-alives
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json_utils.loads(data)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"].get("message", "stream error"))
+
+                choices = chunk.get("choices")
+                content = choices[0].get("delta", {}).get("content") if choices else None
+                if content:
+                    yield content
+
+
 async def query_models_parallel(
     models: List[str],
     messages: List[Dict[str, str]]
@@ -85,8 +253,6 @@ async def query_models_parallel(
     Returns:
         Dict mapping model identifier to response dict (or None if failed)
     """
-    import asyncio
-
     # Create tasks for all models
     tasks = [query_model(model, messages) for model in models]
 
@@ -1,20 +1,37 @@
 """Storage for custom prompts with user scoping."""
 
+import copy
 import json
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Mapping, Optional, Tuple
+
+from . import json_utils
 from .prompts import get_default_prompts
 from .config import get_user_prompts_file, get_user_data_dir
+from .file_utils import FileSignature, KeyedLocks, file_signature, write_file_atomic
+
+# Cached custom prompts per user: user_id -> (prompts file path, file signature, data).
+# Validated by (st_ino, st_mtime_ns, st_size) like the agents cache. Cached data is
+# shared between callers and must be treated as read-only.
+_PROMPTS_CACHE: Dict[str, Tuple[Path, FileSignature, Dict[str, Any]]] = {}
+
+# Resolved prompt configurations keyed by (model, stage)
+PromptTable = Dict[Tuple[str, str], Mapping[str, Any]]
+
+# Per-user locks serializing load-modify-save sequences
+_user_lock = KeyedLocks()
 
 
 def ensure_user_directory(user_id: str):
     """Ensure the user's data directory exists."""
-    Path(get_user_data_dir(user_id)).mkdir(parents=True, exist_ok=True)
+    get_user_data_dir(user_id).mkdir(parents=True, exist_ok=True)
 
 
-def load_custom_prompts(user_id: str) -> Dict[str, Any]:
+def _load_custom_prompts_cached(user_id: str) -> Dict[str, Any]:
     """
-    Load custom prompts from storage for a user.
+    Load a user's custom prompts, reusing the parsed file when unchanged.
+
+    The returned dict is shared with the cache and must not be mutated.
 
     Args:
         user_id: The user's identifier
@@ -22,56 +39,98 @@ def load_custom_prompts(user_id: str) -> Dict[str, Any]:
     Returns:
         Dict with 'defaults' and 'models' keys, or empty structure if none exist
     """
-    ensure_user_directory(user_id)
-    prompts_file = Path(get_user_prompts_file(user_id))
-
-    if not prompts_file.exists():
-        return {"defaults": {}, "models": {}}
+    # Reads never create the user directory; a missing file means no custom prompts
+    prompts_file = get_user_prompts_file(user_id)
 
     try:
-        with open(prompts_file, 'r') as f:
-            data = json.load(f)
+        signature = file_signature(prompts_file)
+    except FileNotFoundError:
+        _PROMPTS_CACHE.pop(user_id, None)
+        return {"defaults": {}, "models": {}}
 
-            # Handle legacy format (migrate to new structure)
-            if "defaults" not in data and "models" not in data:
-                # This is the old format where prompts were stored flat
-                return {"defaults": data, "models": {}}
+    cached = _PROMPTS_CACHE.get(user_id)
+    if cached is not None and cached[0] == prompts_file and cached[1] == signature:
+        return cached[2]
 
-            return data
+    try:
+        with open(prompts_file, 'rb') as f:
+            data = json_utils.loads(f.read())
     except json.JSONDecodeError:
         return {"defaults": {}, "models": {}}
 
+    # Handle legacy format (migrate to new structure)
+    if "defaults" not in data and "models" not in data:
+        # This is the old format where prompts were stored flat
+        data = {"defaults": data, "models": {}}
+
+    _PROMPTS_CACHE[user_id] = (prompts_file, signature, data)
+    return data
+
+
+def load_custom_prompts(user_id: str) -> Dict[str, Any]:
+    """
+    Load custom prompts from storage for a user.
+
+    Args:
+        user_id: The user's identifier
+
+    Returns:
+        Dict with 'defaults' and 'models' keys, or empty structure if none exist
+        (a private copy that is safe to modify)
+    """
+    return copy.deepcopy(_load_custom_prompts_cached(user_id))
+
 
 def save_custom_prompts(user_id: str, prompts: Dict[str, Any]) -> None:
     """
     Save custom prompts to storage for a user.
 
+    The file is replaced atomically and the cache keeps a copy of the saved
+    data, so the next read does not reparse it and the caller may keep
+    modifying its dict.
+
     Args:
         user_id: The user's identifier
         prompts: Dict of custom prompts to save
     """
-    ensure_user_directory(user_id)
-    prompts_file = Path(get_user_prompts_file(user_id))
+    _store_custom_prompts(user_id, copy.deepcopy(prompts))
 
-    with open(prompts_file, 'w') as f:
-        json.dump(prompts, f, indent=2)
 
+def _store_custom_prompts(user_id: str, prompts: Dict[str, Any]) -> None:
+    """Save custom prompts that the cache takes ownership of (the caller must not modify them afterwards)."""
+    with _user_lock(user_id):
+        prompts_file = get_user_prompts_file(user_id)
+        try:
+            write_file_atomic(prompts_file, json_utils.dumps(prompts, indent=True))
+        except BaseException:
+            _PROMPTS_CACHE.pop(user_id, None)
+            raise
 
-def get_active_prompts(user_id: str) -> Dict[str, Any]:
+        _PROMPTS_CACHE[user_id] = (prompts_file, file_signature(prompts_file), prompts)
+
+
+def get_active_prompts(user_id: str, custom: Optional[Dict[str, Any]] = None) -> Mapping[str, Any]:
     """
     Get the currently active default prompts for a user (custom or default).
 
+    The result shares the system defaults and must not be mutated.
+
     Args:
         user_id: The user's identifier
+        custom: The user's custom prompts, if already loaded
 
     Returns:
-        Dict with prompts for each stage
+        Mapping with prompts for each stage
     """
     defaults = get_default_prompts()
-    custom = load_custom_prompts(user_id)
+    if custom is None:
+        custom = _load_custom_prompts_cached(user_id)
+
+    if not custom["defaults"]:
+        return defaults
 
     # Merge custom default prompts over system defaults
-    active = defaults.copy()
+    active = dict(defaults)
     for stage, prompt_config in custom["defaults"].items():
         if stage in active:
             active[stage] = {**active[stage], **prompt_config}
@@ -79,21 +138,34 @@ def get_active_prompts(user_id: str) -> Dict[str, Any]:
     return active
 
 
-def get_prompt_for_model(user_id: str, model: str, stage: str) -> Dict[str, Any]:
+def get_prompt_for_model(
+    user_id: str,
+    model: str,
+    stage: str,
+    custom: Optional[Dict[str, Any]] = None,
+    defaults: Optional[Mapping[str, Any]] = None
+) -> Mapping[str, Any]:
     """
     Get the prompt for a specific model and stage for a user.
     Falls back to default if no model-specific override exists.
 
+    Callers resolving several prompts at once can load the custom prompts and
+    active defaults once and pass them in.
+
     Args:
         user_id: The user's identifier
         model: The model identifier (e.g., "openai/gpt-5.1")
         stage: The stage ('stage1', 'stage2', or 'stage3')
+        custom: The user's custom prompts, if already loaded
+        defaults: The user's active default prompts, if already resolved
 
     Returns:
-        Prompt configuration dict
+        Prompt configuration; may be the shared defaults, so must not be mutated
     """
-    custom = load_custom_prompts(user_id)
-    defaults = get_active_prompts(user_id)
+    if custom is None:
+        custom = _load_custom_prompts_cached(user_id)
+    if defaults is None:
+        defaults = get_active_prompts(user_id, custom)
 
     # Check for model-specific override
     if model in custom["models"] and stage in custom["models"][model]:
@@ -104,6 +176,29 @@ def get_prompt_for_model(user_id: str, model: str, stage: str) -> Dict[str, Any]
     return defaults[stage]
 
 
+def resolve_prompts(user_id: str, models: Iterable[str]) -> PromptTable:
+    """
+    Resolve every stage's prompt for several models from one read of the user's prompts.
+
+    The returned configurations may share data with the cache and must not be mutated.
+
+    Args:
+        user_id: The user's identifier
+        models: The model identifiers to resolve prompts for
+
+    Returns:
+        Dict mapping (model, stage) to the prompt configuration
+    """
+    custom = _load_custom_prompts_cached(user_id)
+    defaults = get_active_prompts(user_id, custom)
+
+    return {
+        (model, stage): get_prompt_for_model(user_id, model, stage, custom, defaults)
+        for model in dict.fromkeys(models)
+        for stage in defaults
+    }
+
+
 def get_all_model_prompts(user_id: str) -> Dict[str, Any]:
     """
     Get all prompts for a user including defaults and per-model overrides.
@@ -115,10 +210,9 @@ def get_all_model_prompts(user_id: str) -> Dict[str, Any]:
         Dict with 'defaults' and 'models' keys
     """
     custom = load_custom_prompts(user_id)
-    defaults = get_active_prompts(user_id)
 
     return {
-        "defaults": defaults,
+        "defaults": get_active_prompts(user_id, custom),
         "models": custom["models"]
     }
 
@@ -136,19 +230,27 @@ def update_prompt(user_id: str, stage: str, prompt_data: Dict[str, Any], model:
     Returns:
         Updated prompts configuration
     """
-    custom = load_custom_prompts(user_id)
-
-    if model:
-        # Update model-specific prompt
-        if model not in custom["models"]:
-            custom["models"][model] = {}
-        custom["models"][model][stage] = prompt_data
-    else:
-        # Update default prompt
-        custom["defaults"][stage] = prompt_data
-
-    save_custom_prompts(user_id, custom)
-    return get_all_model_prompts(user_id)
+    with _user_lock(user_id):
+        cached = _load_custom_prompts_cached(user_id)
+        overrides = cached["models"].get(model, {}) if model else cached["defaults"]
+        if overrides.get(stage) == prompt_data:
+            # No-op update: leave the file untouched
+            return get_all_model_prompts(user_id)
+
+        custom = copy.deepcopy(cached)
+        # Copied too, as the cache keeps what is saved
+        prompt_data = copy.deepcopy(prompt_data)
+        if model:
+            # Update model-specific prompt
+            if model not in custom["models"]:
+                custom["models"][model] = {}
+            custom["models"][model][stage] = prompt_data
+        else:
+            # Update default prompt
+            custom["defaults"][stage] = prompt_data
+
+        _store_custom_prompts(user_id, custom)
+        return get_all_model_prompts(user_id)
 
 
 def reset_prompt(user_id: str, stage: str, model: Optional[str] = None) -> Dict[str, Any]:
@@ -163,22 +265,26 @@ def reset_prompt(user_id: str, stage: str, model: Optional[str] = None) -> Dict[
     Returns:
         Updated prompts configuration
     """
-    custom = load_custom_prompts(user_id)
-
-    if model:
-        # Reset model-specific prompt
-        if model in custom["models"] and stage in custom["models"][model]:
+    with _user_lock(user_id):
+        cached = _load_custom_prompts_cached(user_id)
+        overrides = cached["models"].get(model, {}) if model else cached["defaults"]
+        if stage not in overrides:
+            # Nothing to reset: leave the file untouched
+            return get_all_model_prompts(user_id)
+
+        custom = copy.deepcopy(cached)
+        if model:
+            # Reset model-specific prompt
             del custom["models"][model][stage]
             # Clean up empty model entries
             if not custom["models"][model]:
                 del custom["models"][model]
-    else:
-        # Reset default prompt
-        if stage in custom["defaults"]:
+        else:
+            # Reset default prompt
             del custom["defaults"][stage]
 
-    save_custom_prompts(user_id, custom)
-    return get_all_model_prompts(user_id)
+        _store_custom_prompts(user_id, custom)
+        return get_all_model_prompts(user_id)
 
 
 def reset_all_prompts(user_id: str) -> Dict[str, Any]:
@@ -191,7 +297,9 @@ def reset_all_prompts(user_id: str) -> Dict[str, Any]:
     Returns:
         Default prompts configuration
     """
-    prompts_file = Path(get_user_prompts_file(user_id))
-    if prompts_file.exists():
-        prompts_file.unlink()
-    return get_all_model_prompts(user_id)
+    with _user_lock(user_id):
+        prompts_file = get_user_prompts_file(user_id)
+        if prompts_file.exists():
+            prompts_file.unlink()
+        _PROMPTS_CACHE.pop(user_id, None)
+        return get_all_model_prompts(user_id)
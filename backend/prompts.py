@@ -1,5 +1,10 @@
 """Default prompts for the LLM Council system."""
 
+import string
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+
 # Default prompts for each stage
 DEFAULT_PROMPTS = {
     "stage1": {
@@ -67,9 +72,15 @@ Provide a clear, well-reasoned final answer that represents the council's collec
 }
 
 
-def get_default_prompts():
-    """Get the default prompts configuration."""
-    return DEFAULT_PROMPTS.copy()
+# Read-only view of DEFAULT_PROMPTS, built once and shared by every caller
+_FROZEN_DEFAULTS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    stage: MappingProxyType(config) for stage, config in DEFAULT_PROMPTS.items()
+})
+
+
+def get_default_prompts() -> Mapping[str, Mapping[str, Any]]:
+    """Get the default prompts configuration (shared and read-only)."""
+    return _FROZEN_DEFAULTS
 
 
 def get_stage_prompt(stage: str, custom_prompts: dict = None):
@@ -86,3 +97,49 @@ def get_stage_prompt(stage: str, custom_prompts: dict = None):
     if custom_prompts and stage in custom_prompts:
         return custom_prompts[stage].get('template', DEFAULT_PROMPTS[stage]['template'])
     return DEFAULT_PROMPTS[stage]['template']
+
+
+@lru_cache(maxsize=512)
+def _compile_template(template: str) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+    """
+    Split a prompt template into (literal text, field name) segments.
+    Cached by template text, so edited prompts compile to a new entry.
+
+    Returns:
+        The segments, or None if the template uses features beyond simple
+        {name} fields (conversions, format specs, positional or compound fields)
+    """
+    segments = []
+    for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+        if field_name is not None and (
+            format_spec or conversion or not field_name.isidentifier()
+        ):
+            return None
+        segments.append((literal, field_name))
+    return tuple(segments)
+
+
+def render_prompt(template: str, **values) -> str:
+    """
+    Fill in a prompt template; equivalent to template.format(**values).
+
+    Args:
+        template: Template with {name} placeholders
+        **values: Values for the placeholders
+
+    Returns:
+        The rendered prompt
+
+    Raises:
+        KeyError: If the template references a value that was not provided
+    """
+    segments = _compile_template(template)
+    if segments is None:
+        return template.format(**values)
+
+    parts = []
+    for literal, field_name in segments:
+        parts.append(literal)
+        if field_name is not None:
+            parts.append(str(values[field_name]))
+    return "".join(parts)
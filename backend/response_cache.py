@@ -0,0 +1,158 @@
+"""In-process cache of recent council results for repeated questions."""
+
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import agent_storage
+from . import json_utils
+from . import prompt_storage
+from .config import RESPONSE_CACHE_SECONDS, RESPONSE_CACHE_MAX_ENTRIES
+
+# (stage1_results, stage2_results, stage3_result, metadata), as from run_full_council
+CouncilResult = Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any], Dict[str, Any]]
+
+# Cache key -> (expiry time, council result), least recently used first
+_CACHE: "OrderedDict[str, Tuple[float, CouncilResult]]" = OrderedDict()
+
+# Council runs in progress: key -> future result (None if the run failed),
+# shared with identical requests that arrive while it runs
+_RUNNING: Dict[str, "asyncio.Future[Optional[CouncilResult]]"] = {}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Agent fields that shape a council's answers (ids and timestamps do not)
+_AGENT_ANSWER_FIELDS = ("title", "role", "model", "prompts", "emoji")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a question so trivially different phrasings share a cache entry."""
+    return _WHITESPACE_RE.sub(" ", query).strip().casefold()
+
+
+def _answer_fields(agent: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Reduce an agent to the fields that affect council output."""
+    if agent is None:
+        return None
+    return {field: agent.get(field) for field in _AGENT_ANSWER_FIELDS}
+
+
+def council_key(user_id: str, query: str) -> str:
+    """
+    Build the key identifying a user's question under their current council setup.
+
+    The key covers the active agents, the chairman and the custom prompts, so
+    editing any of them stops earlier results from being reused. Keys are built
+    even when response caching is off, because identical questions asked while
+    a council is running always share that run.
+
+    Args:
+        user_id: The user's identifier
+        query: The user's question
+
+    Returns:
+        The key for get_cached_council(), find_council() and council_run()
+    """
+    council_setup = [
+        user_id,
+        normalize_query(query),
+        [_answer_fields(agent) for agent in agent_storage.get_active_agents(user_id)],
+        _answer_fields(agent_storage.get_chairman(user_id)),
+        prompt_storage.load_custom_prompts(user_id)
+    ]
+    return hashlib.sha256(json_utils.dumps(council_setup)).hexdigest()
+
+
+def get_cached_council(key: str) -> Optional[CouncilResult]:
+    """
+    Look up a cached council result.
+
+    Args:
+        key: Key from council_key()
+
+    Returns:
+        The cached result, or None on a miss or when caching is disabled
+    """
+    entry = _CACHE.get(key)
+    if entry is None:
+        return None
+
+    expires_at, result = entry
+    if expires_at <= time.monotonic():
+        del _CACHE[key]
+        return None
+
+    _CACHE.move_to_end(key)
+    return result
+
+
+def cache_council(key: str, result: CouncilResult) -> None:
+    """
+    Remember a successful council result.
+
+    Runs in which no agent responded, and all runs while caching is disabled,
+    are not cached.
+
+    Args:
+        key: Key from council_key()
+        result: The council result to cache
+    """
+    if RESPONSE_CACHE_SECONDS <= 0 or not result[0]:
+        return
+
+    _CACHE[key] = (time.monotonic() + RESPONSE_CACHE_SECONDS, result)
+    _CACHE.move_to_end(key)
+    while len(_CACHE) > RESPONSE_CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
+
+
+async def find_council(key: str) -> Optional[CouncilResult]:
+    """
+    Find the answer to a question without running the council.
+
+    Uses a cached result, or waits for an identical council run that is
+    already in progress (e.g. the same question sent from two tabs).
+
+    Args:
+        key: Key from council_key()
+
+    Returns:
+        The council result, or None when the caller has to run the council
+    """
+    result = get_cached_council(key)
+    if result is None:
+        running = _RUNNING.get(key)
+        if running is not None:
+            # Shielded so a waiter giving up doesn't affect the run it joined
+            result = await asyncio.shield(running)
+    return result
+
+
+@contextmanager
+def council_run(key: str) -> Iterator["asyncio.Future[Optional[CouncilResult]]"]:
+    """
+    Announce a council run so identical requests can wait for its result.
+
+    Set the result on the yielded future once the council has answered. If the
+    block exits without one, waiting requests get None and run their own council.
+
+    Args:
+        key: Key from council_key()
+
+    Yields:
+        The future to set the council result on
+    """
+    future = asyncio.get_running_loop().create_future()
+    _RUNNING[key] = future
+    try:
+        yield future
+    finally:
+        if _RUNNING.get(key) is future:
+            del _RUNNING[key]
+        if not future.done():
+            future.set_result(None)
+
@@ -1,15 +1,75 @@
-"""JSON-based storage for conversations with user scoping."""
+"""JSON-based storage for conversations with user scoping.
+
+Each conversation is stored as two files: ``{id}.json`` holds the small
+metadata record (id, title, created_at, message_count) and ``{id}.jsonl``
+holds the messages, one JSON document per line. Adding a message appends
+one line instead of rewriting the whole history. Older ``{id}.json`` files
+that still embed ``messages`` are read as-is and converted on their next
+write.
+
+Listing conversations keeps each metadata file's summary in memory, keyed by
+the file's (inode, mtime, size), so a listing only re-reads files that
+changed since the last one.
+"""
 
-import json
 import os
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
+from . import json_utils
 from .config import get_user_conversations_dir
+from .file_utils import FileSignature, KeyedLocks, file_signature, stat_signature, write_file_atomic
 
 # UUID format regex for validating IDs (prevents path traversal attacks)
-UUID_PATTERN = re.compile(r'^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$', re.IGNORECASE)
+# (use fullmatch: a "$" anchor would also accept a trailing newline)
+UUID_PATTERN = re.compile(r'[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}', re.IGNORECASE)
+
+# Serializes writes per conversation; different conversations write concurrently
+_CONVERSATION_LOCKS = KeyedLocks(threading.Lock)
+
+# Read buffer for message logs: assistant messages carry three stages of model
+# output and routinely exceed the default 8 KiB buffer
+_MESSAGE_LOG_BUFFER_SIZE = 128 * 1024
+
+# conversations directory -> {metadata filename: (file signature, listing entry or None if unreadable)},
+# least recently listed directory first
+_LISTING_CACHE: "OrderedDict[str, Dict[str, Tuple[FileSignature, Optional[Dict[str, Any]]]]]" = OrderedDict()
+# Users whose listings are kept in memory
+_LISTING_CACHE_MAX_DIRS = 1024
+_listing_cache_lock = threading.Lock()
+
+# Reads changed metadata files in parallel for listings; created on first use
+_listing_pool: Optional[ThreadPoolExecutor] = None
+_listing_pool_lock = threading.Lock()
+
+
+def _conversation_lock(user_id: str, conversation_id: str) -> threading.Lock:
+    """Get the lock guarding a conversation's files."""
+    return _CONVERSATION_LOCKS((user_id, conversation_id))
+
+
+def _cached_listing(data_dir: str) -> Dict[str, Tuple[FileSignature, Optional[Dict[str, Any]]]]:
+    """Get a conversations directory's cached listing entries (empty if none), marking it recently used."""
+    with _listing_cache_lock:
+        listing = _LISTING_CACHE.get(data_dir)
+        if listing is None:
+            return {}
+        _LISTING_CACHE.move_to_end(data_dir)
+        return listing
+
+
+def _store_listing(data_dir: str, listing: Dict[str, Tuple[FileSignature, Optional[Dict[str, Any]]]]):
+    """Cache a conversations directory's listing entries, evicting the least recently used directories."""
+    with _listing_cache_lock:
+        _LISTING_CACHE[data_dir] = listing
+        _LISTING_CACHE.move_to_end(data_dir)
+        while len(_LISTING_CACHE) > _LISTING_CACHE_MAX_DIRS:
+            _LISTING_CACHE.popitem(last=False)
 
 
 def validate_id(id_value: str, id_type: str = "ID") -> None:
@@ -24,19 +84,142 @@ def validate_id(id_value: str, id_type: str = "ID") -> None:
     Raises:
         ValueError: If the ID is not a valid UUID format
     """
-    if not id_value or not UUID_PATTERN.match(id_value):
+    if not id_value or not UUID_PATTERN.fullmatch(id_value):
         raise ValueError(f"Invalid {id_type} format. Expected UUID.")
 
 
 def ensure_user_dir(user_id: str):
     """Ensure the user's conversations directory exists."""
-    Path(get_user_conversations_dir(user_id)).mkdir(parents=True, exist_ok=True)
+    get_user_conversations_dir(user_id).mkdir(parents=True, exist_ok=True)
 
 
-def get_conversation_path(user_id: str, conversation_id: str) -> str:
-    """Get the file path for a conversation."""
+def get_conversation_path(user_id: str, conversation_id: str) -> Path:
+    """Get the metadata file path for a conversation."""
     validate_id(conversation_id, "conversation_id")
-    return os.path.join(get_user_conversations_dir(user_id), f"{conversation_id}.json")
+    return get_user_conversations_dir(user_id) / f"{conversation_id}.json"
+
+
+def get_messages_path(user_id: str, conversation_id: str) -> Path:
+    """Get the append-only message log path for a conversation."""
+    return get_conversation_path(user_id, conversation_id).with_suffix(".jsonl")
+
+
+def _write_metadata(path: Path, metadata: Dict[str, Any]):
+    """Write a conversation metadata record."""
+    write_file_atomic(path, json_utils.dumps(metadata))
+
+
+def _write_messages(user_id: str, conversation_id: str, messages: List[Dict[str, Any]]):
+    """Rewrite a conversation's whole message log."""
+    data = b"".join(json_utils.dumps(message) + b"\n" for message in messages)
+    write_file_atomic(get_messages_path(user_id, conversation_id), data)
+
+
+def _read_messages(user_id: str, conversation_id: str) -> List[Dict[str, Any]]:
+    """Read a conversation's message log, in insertion order."""
+    path = get_messages_path(user_id, conversation_id)
+
+    if not os.path.exists(path):
+        return []
+
+    messages = []
+    with open(path, 'rb', buffering=_MESSAGE_LOG_BUFFER_SIZE) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                messages.append(json_utils.loads(line))
+            except ValueError:
+                # Skip a line torn by an interrupted append
+                continue
+    return messages
+
+
+def _load_metadata_for_update(user_id: str, conversation_id: str) -> Dict[str, Any]:
+    """
+    Load a conversation's metadata, converting legacy single-file storage.
+
+    Args:
+        user_id: The user's identifier
+        conversation_id: Conversation identifier
+
+    Returns:
+        Metadata dict (without messages)
+
+    Raises:
+        ValueError: If the conversation does not exist
+    """
+    path = get_conversation_path(user_id, conversation_id)
+
+    if not os.path.exists(path):
+        raise ValueError(f"Conversation {conversation_id} not found")
+
+    with open(path, 'rb') as f:
+        metadata = json_utils.loads(f.read())
+
+    if "messages" in metadata:
+        # Legacy file: move the embedded messages into the message log
+        messages = metadata.pop("messages")
+        _write_messages(user_id, conversation_id, messages)
+        metadata["message_count"] = len(messages)
+        _write_metadata(path, metadata)
+
+    return metadata
+
+
+def _append_message(user_id: str, conversation_id: str, message: Dict[str, Any]):
+    """Append one message to a conversation and bump its message count."""
+    line = json_utils.dumps(message) + b"\n"
+    with _conversation_lock(user_id, conversation_id):
+        metadata = _load_metadata_for_update(user_id, conversation_id)
+
+        with open(get_messages_path(user_id, conversation_id), 'a+b') as f:
+            # Terminate a line torn by an interrupted append so this one stays intact
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+
+        metadata["message_count"] = metadata.get("message_count", 0) + 1
+        _write_metadata(get_conversation_path(user_id, conversation_id), metadata)
+
+
+def convert_legacy_conversations(user_id: str) -> int:
+    """
+    Convert all of a user's legacy single-file conversations to the message log format.
+
+    Legacy files are otherwise converted one by one on their next write.
+
+    Args:
+        user_id: The user's identifier
+
+    Returns:
+        Number of conversations converted
+    """
+    data_dir = get_user_conversations_dir(user_id)
+    if not data_dir.exists():
+        return 0
+
+    with os.scandir(data_dir) as entries:
+        names = [entry.name for entry in entries if entry.name.endswith('.json')]
+
+    converted = 0
+    for name in names:
+        conversation_id = name[:-len('.json')]
+        if not UUID_PATTERN.fullmatch(conversation_id):
+            continue
+        with _conversation_lock(user_id, conversation_id):
+            try:
+                with open(data_dir / name, 'rb') as f:
+                    if "messages" not in json_utils.loads(f.read()):
+                        continue
+                _load_metadata_for_update(user_id, conversation_id)
+            except (OSError, ValueError):
+                # Skip corrupted (or just deleted) files
+                continue
+        converted += 1
+    return converted
 
 
 def create_conversation(user_id: str, conversation_id: str) -> Dict[str, Any]:
@@ -50,21 +233,20 @@ def create_conversation(user_id: str, conversation_id: str) -> Dict[str, Any]:
     Returns:
         New conversation dict
     """
-    ensure_user_dir(user_id)
-
-    conversation = {
+    metadata = {
         "id": conversation_id,
         "user_id": user_id,
         "created_at": datetime.utcnow().isoformat(),
         "title": "New Conversation",
-        "messages": []
+        "message_count": 0
     }
 
     # Save to file
     path = get_conversation_path(user_id, conversation_id)
-    with open(path, 'w') as f:
-        json.dump(conversation, f, indent=2)
+    _write_metadata(path, metadata)
 
+    conversation = {key: value for key, value in metadata.items() if key != "message_count"}
+    conversation["messages"] = []
     return conversation
 
 
@@ -84,8 +266,49 @@ def get_conversation(user_id: str, conversation_id: str) -> Optional[Dict[str, A
     if not os.path.exists(path):
         return None
 
-    with open(path, 'r') as f:
-        return json.load(f)
+    with open(path, 'rb') as f:
+        metadata = json_utils.loads(f.read())
+
+    if "messages" in metadata:
+        # Legacy single-file conversation
+        return metadata
+
+    conversation = {key: value for key, value in metadata.items() if key != "message_count"}
+    conversation["messages"] = _read_messages(user_id, conversation_id)
+    return conversation
+
+
+def get_conversation_metadata(user_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a conversation's metadata without reading its messages.
+
+    Shares the listing cache, so an unchanged conversation is not re-read.
+
+    Args:
+        user_id: The user's identifier
+        conversation_id: Unique identifier for the conversation
+
+    Returns:
+        Dict with id, created_at, title and message_count, or None if not found
+    """
+    path = get_conversation_path(user_id, conversation_id)
+
+    try:
+        signature = file_signature(path)
+    except FileNotFoundError:
+        return None
+
+    data_dir = str(path.parent)
+    listing = _cached_listing(data_dir)
+    cached = listing.get(path.name)
+    if cached is None or cached[0] != signature:
+        cached = (signature, _read_listing_entry(str(path)))
+        if not listing:
+            _store_listing(data_dir, listing)
+        listing[path.name] = cached
+
+    # A copy, so callers can't alter the cached entry
+    return None if cached[1] is None else dict(cached[1])
 
 
 def delete_conversation(user_id: str, conversation_id: str) -> bool:
@@ -101,26 +324,68 @@ def delete_conversation(user_id: str, conversation_id: str) -> bool:
     """
     path = get_conversation_path(user_id, conversation_id)
 
-    if not os.path.exists(path):
-        return False
+    with _conversation_lock(user_id, conversation_id):
+        if not os.path.exists(path):
+            return False
 
-    os.remove(path)
+        os.remove(path)
+        messages_path = get_messages_path(user_id, conversation_id)
+        if os.path.exists(messages_path):
+            os.remove(messages_path)
+        _cached_listing(str(path.parent)).pop(path.name, None)
     return True
 
 
 def save_conversation(user_id: str, conversation: Dict[str, Any]):
     """
-    Save a conversation to storage.
+    Save a conversation to storage, rewriting its whole message log.
 
     Args:
         user_id: The user's identifier
         conversation: Conversation dict to save
     """
-    ensure_user_dir(user_id)
-
-    path = get_conversation_path(user_id, conversation['id'])
-    with open(path, 'w') as f:
-        json.dump(conversation, f, indent=2)
+    messages = conversation.get("messages", [])
+    metadata = {key: value for key, value in conversation.items() if key != "messages"}
+    metadata["message_count"] = len(messages)
+
+    with _conversation_lock(user_id, conversation['id']):
+        _write_messages(user_id, conversation['id'], messages)
+        _write_metadata(get_conversation_path(user_id, conversation['id']), metadata)
+
+
+def _get_listing_pool() -> ThreadPoolExecutor:
+    """Return the thread pool that reads changed metadata files, creating it on first use."""
+    global _listing_pool
+    if _listing_pool is None:
+        with _listing_pool_lock:
+            if _listing_pool is None:
+                _listing_pool = ThreadPoolExecutor(
+                    max_workers=min(32, (os.cpu_count() or 1) * 4),
+                    thread_name_prefix="conversation-listing"
+                )
+    return _listing_pool
+
+
+def _read_listing_entry(path: str) -> Optional[Dict[str, Any]]:
+    """Read the listing summary of a metadata file, or None if it is unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            data = json_utils.loads(f.read())
+        # Legacy files embed their messages; current ones keep a count
+        if "messages" in data:
+            message_count = len(data["messages"])
+        else:
+            message_count = data["message_count"]
+        # Return metadata only
+        return {
+            "id": data["id"],
+            "created_at": data["created_at"],
+            "title": data.get("title", "New Conversation"),
+            "message_count": message_count
+        }
+    except (OSError, ValueError, KeyError):
+        # Skip corrupted (or just deleted) files
+        return None
 
 
 def list_conversations(user_id: str) -> List[Dict[str, Any]]:
@@ -133,29 +398,48 @@ def list_conversations(user_id: str) -> List[Dict[str, Any]]:
     Returns:
         List of conversation metadata dicts
     """
-    ensure_user_dir(user_id)
     data_dir = get_user_conversations_dir(user_id)
-
-    conversations = []
-    for filename in os.listdir(data_dir):
-        if filename.endswith('.json'):
-            path = os.path.join(data_dir, filename)
+    try:
+        entries = os.scandir(data_dir)
+    except FileNotFoundError:
+        # Nothing has been saved for this user yet
+        return []
+
+    cached = _cached_listing(str(data_dir))
+    # Rebuilt on every listing so deleted conversations drop out
+    listing = {}
+    # Files that are new or changed since the last listing: (name, path, signature)
+    stale = []
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith('.json'):
+                continue
             try:
-                with open(path, 'r') as f:
-                    data = json.load(f)
-                    # Return metadata only
-                    conversations.append({
-                        "id": data["id"],
-                        "created_at": data["created_at"],
-                        "title": data.get("title", "New Conversation"),
-                        "message_count": len(data["messages"])
-                    })
-            except (json.JSONDecodeError, KeyError):
-                # Skip corrupted files
+                signature = stat_signature(entry.stat())
+            except FileNotFoundError:
+                # Deleted since the directory was read
                 continue
 
+            previous = cached.get(entry.name)
+            if previous is not None and previous[0] == signature:
+                listing[entry.name] = previous
+            else:
+                stale.append((entry.name, entry.path, signature))
+
+    if len(stale) > 1:
+        # Reads block on the filesystem (slow on network mounts), so overlap them
+        summaries = _get_listing_pool().map(_read_listing_entry, [path for _, path, _ in stale])
+    else:
+        summaries = (_read_listing_entry(path) for _, path, _ in stale)
+    for (name, _, signature), summary in zip(stale, summaries):
+        listing[name] = (signature, summary)
+    _store_listing(str(data_dir), listing)
+
+    # Copies, so callers can't alter the cached entries
+    conversations = [dict(summary) for _, summary in listing.values() if summary is not None]
+
     # Sort by creation time, newest first
-    conversations.sort(key=lambda x: x["created_at"], reverse=True)
+    conversations.sort(key=itemgetter("created_at"), reverse=True)
 
     return conversations
 
@@ -169,17 +453,11 @@ def add_user_message(user_id: str, conversation_id: str, content: str):
         conversation_id: Conversation identifier
         content: User message content
     """
-    conversation = get_conversation(user_id, conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
-
-    conversation["messages"].append({
+    _append_message(user_id, conversation_id, {
         "role": "user",
         "content": content
     })
 
-    save_conversation(user_id, conversation)
-
 
 def add_assistant_message(
     user_id: str,
@@ -198,19 +476,13 @@ def add_assistant_message(
         stage2: List of model rankings
         stage3: Final synthesized response
     """
-    conversation = get_conversation(user_id, conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
-
-    conversation["messages"].append({
+    _append_message(user_id, conversation_id, {
         "role": "assistant",
         "stage1": stage1,
         "stage2": stage2,
         "stage3": stage3
     })
 
-    save_conversation(user_id, conversation)
-
 
 def update_conversation_title(user_id: str, conversation_id: str, title: str):
     """
@@ -221,9 +493,7 @@ def update_conversation_title(user_id: str, conversation_id: str, title: str):
         conversation_id: Conversation identifier
         title: New title for the conversation
     """
-    conversation = get_conversation(user_id, conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
-
-    conversation["title"] = title
-    save_conversation(user_id, conversation)
+    with _conversation_lock(user_id, conversation_id):
+        metadata = _load_metadata_for_update(user_id, conversation_id)
+        metadata["title"] = title
+        _write_metadata(get_conversation_path(user_id, conversation_id), metadata)
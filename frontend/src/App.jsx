@@ -163,6 +163,18 @@ function AppContent() {
             });
             break;
 
+          case 'stage1_item':
+            // Show each response as soon as its agent answers (copying the
+            // message, as for stage3_delta, so a repeated updater can't append twice)
+            setCurrentConversation((prev) => {
+              const messages = [...prev.messages];
+              const lastMsg = { ...messages[messages.length - 1] };
+              lastMsg.stage1 = [...(lastMsg.stage1 || []), event.data];
+              messages[messages.length - 1] = lastMsg;
+              return { ...prev, messages };
+            });
+            break;
+
           case 'stage1_complete':
             setCurrentConversation((prev) => {
               const messages = [...prev.messages];
@@ -202,6 +214,21 @@ function AppContent() {
             });
             break;
 
+          case 'stage3_delta':
+            // Show the final answer as the chairman writes it. The message is
+            // copied rather than mutated so a repeated updater call can't append twice.
+            setCurrentConversation((prev) => {
+              const messages = [...prev.messages];
+              const lastMsg = { ...messages[messages.length - 1] };
+              lastMsg.stage3 = {
+                ...lastMsg.stage3,
+                response: (lastMsg.stage3?.response || '') + event.data.delta,
+              };
+              messages[messages.length - 1] = lastMsg;
+              return { ...prev, messages };
+            });
+            break;
+
           case 'stage3_complete':
             setCurrentConversation((prev) => {
               const messages = [...prev.messages];
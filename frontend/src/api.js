@@ -139,13 +139,16 @@ export function createAuthenticatedApi(getToken) {
 
         const reader = response.body.getReader();
         const decoder = new TextDecoder();
+        // Events can be split across network chunks; keep the incomplete last line
+        let buffered = '';
 
         while (true) {
           const { done, value } = await reader.read();
           if (done) break;
 
-          const chunk = decoder.decode(value);
-          const lines = chunk.split('\n');
+          buffered += decoder.decode(value, { stream: true });
+          const lines = buffered.split('\n');
+          buffered = lines.pop();
 
           for (const line of lines) {
             if (line.startsWith('data: ')) {
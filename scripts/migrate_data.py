@@ -12,11 +12,12 @@ This script will:
 - Move existing conversations from data/conversations/ to data/users/{user_id}/conversations/
 - Move existing agents.json to data/users/{user_id}/agents.json
 - Move existing prompts.json to data/users/{user_id}/prompts.json
+- Convert single-file conversations to the metadata + message log format
 """
 
-import json
 import os
 import shutil
+import sys
 from pathlib import Path
 
 # REPLACE THIS with your actual Clerk user ID after signing up
@@ -25,6 +26,9 @@ ADMIN_USER_ID = "user_36t0vjhrgqAhUOGorjHiT8ETePQ"
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+from backend import json_utils, storage  # noqa: E402
 OLD_CONVERSATIONS_DIR = DATA_DIR / "conversations"
 OLD_AGENTS_FILE = DATA_DIR / "agents.json"
 OLD_PROMPTS_FILE = DATA_DIR / "prompts.json"
@@ -56,26 +60,29 @@ def migrate():
 
     # Migrate conversations
     if OLD_CONVERSATIONS_DIR.exists():
-        for filename in os.listdir(OLD_CONVERSATIONS_DIR):
-            if filename.endswith('.json'):
-                old_path = OLD_CONVERSATIONS_DIR / filename
+        with os.scandir(OLD_CONVERSATIONS_DIR) as entries:
+            conversation_files = [entry for entry in entries if entry.name.endswith('.json')]
+        for entry in conversation_files:
+            if entry.is_file():
+                filename = entry.name
+                old_path = entry.path
                 new_path = user_conversations_dir / filename
 
                 try:
-                    # Read and update conversation with user_id
-                    with open(old_path, 'r') as f:
-                        data = json.load(f)
-
-                    # Add user_id if not present
-                    if "user_id" not in data:
+                    with open(old_path, 'rb') as f:
+                        data = json_utils.loads(f.read())
+
+                    if "user_id" in data:
+                        # Nothing to change: move the file as-is
+                        shutil.move(old_path, new_path)
+                    else:
+                        # Add user_id and write to new location
                         data["user_id"] = ADMIN_USER_ID
+                        with open(new_path, 'wb') as f:
+                            f.write(json_utils.dumps(data))
 
-                    # Write to new location
-                    with open(new_path, 'w') as f:
-                        json.dump(data, f, indent=2)
-
-                    # Remove old file
-                    os.remove(old_path)
+                        # Remove old file
+                        os.remove(old_path)
                     print(f"Migrated conversation: {filename}")
                     migrated_conversations += 1
 
@@ -89,6 +96,9 @@ def migrate():
         except OSError:
             print("Note: Old conversations directory not empty or already removed")
 
+    # Move legacy single-file conversations to the append-only message log
+    converted_conversations = storage.convert_legacy_conversations(ADMIN_USER_ID)
+
     # Migrate agents
     if OLD_AGENTS_FILE.exists():
         try:
@@ -113,6 +123,7 @@ def migrate():
     print("=" * 50)
     print("Migration Summary:")
     print(f"  Conversations migrated: {migrated_conversations}")
+    print(f"  Conversations converted to message logs: {converted_conversations}")
     print(f"  Agents migrated: {'Yes' if migrated_agents else 'No (not found)'}")
     print(f"  Prompts migrated: {'Yes' if migrated_prompts else 'No (not found)'}")
     print()
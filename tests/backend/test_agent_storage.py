@@ -2,8 +2,8 @@
 
 import pytest
 import json
-from pathlib import Path
-from freezegun import freeze_time
+from unittest.mock import patch
+from datetime import datetime
 from backend import agent_storage
 from backend.config import get_user_agents_file
 from tests.conftest import TEST_USER_ID, TEST_INVALID_ID
@@ -15,26 +15,25 @@ NONEXISTENT_AGENT_ID = "99999999-9999-9999-9999-999999999999"
 class TestAgentCRUD:
     """Test CRUD operations for agents."""
 
-    def test_create_agent(self, temp_data_dir, test_user_id):
+    def test_create_agent(self, temp_data_dir, test_user_id, fake_now):
         """Test creating a new agent."""
-        with freeze_time("2024-01-01 12:00:00"):
-            agent = agent_storage.create_agent(
-                test_user_id,
-                title="Test Agent",
-                role="Test role",
-                model="test/model",
-                prompts={"stage1": "Test prompt"},
-                active=True
-            )
-
-            assert agent["title"] == "Test Agent"
-            assert agent["role"] == "Test role"
-            assert agent["model"] == "test/model"
-            assert agent["prompts"]["stage1"] == "Test prompt"
-            assert agent["active"] is True
-            assert "id" in agent
-            assert agent["created_at"] == "2024-01-01T12:00:00"
-            assert agent["updated_at"] == "2024-01-01T12:00:00"
+        agent = agent_storage.create_agent(
+            test_user_id,
+            title="Test Agent",
+            role="Test role",
+            model="test/model",
+            prompts={"stage1": "Test prompt"},
+            active=True
+        )
+
+        assert agent["title"] == "Test Agent"
+        assert agent["role"] == "Test role"
+        assert agent["model"] == "test/model"
+        assert agent["prompts"]["stage1"] == "Test prompt"
+        assert agent["active"] is True
+        assert "id" in agent
+        assert agent["created_at"] == "2024-01-01T12:00:00"
+        assert agent["updated_at"] == "2024-01-01T12:00:00"
 
     def test_create_agent_default_prompts(self, temp_data_dir, test_user_id):
         """Test creating agent with default (empty) prompts."""
@@ -47,12 +46,14 @@ class TestAgentCRUD:
 
         assert agent["prompts"] == {}
 
-    def test_get_all_agents(self, temp_data_dir, test_user_id):
-        """Test retrieving all agents."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
+    def test_create_agent_timestamps_match(self, temp_data_dir, test_user_id):
+        """Test that a new agent's created_at and updated_at are identical."""
+        agent = agent_storage.create_agent(test_user_id, "Agent", "Role", "model")
 
+        assert agent["created_at"] == agent["updated_at"]
+
+    def test_get_all_agents(self, test_user_id, clean_agents):
+        """Test retrieving all agents."""
         # Create multiple agents
         agent_storage.create_agent(test_user_id, "Agent 1", "Role 1", "model-1")
         agent_storage.create_agent(test_user_id, "Agent 2", "Role 2", "model-2")
@@ -63,12 +64,8 @@ class TestAgentCRUD:
         assert agents[0]["title"] == "Agent 1"
         assert agents[1]["title"] == "Agent 2"
 
-    def test_get_active_agents(self, temp_data_dir, test_user_id):
+    def test_get_active_agents(self, test_user_id, clean_agents):
         """Test retrieving only active agents."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         agent_storage.create_agent(test_user_id, "Active 1", "Role 1", "model-1", active=True)
         agent_storage.create_agent(test_user_id, "Inactive", "Role 2", "model-2", active=False)
         agent_storage.create_agent(test_user_id, "Active 2", "Role 3", "model-3", active=True)
@@ -78,12 +75,8 @@ class TestAgentCRUD:
         assert len(active_agents) == 2
         assert all(agent["active"] for agent in active_agents)
 
-    def test_get_agent_by_id(self, temp_data_dir, test_user_id):
+    def test_get_agent_by_id(self, test_user_id, clean_agents):
         """Test retrieving specific agent by ID."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         created = agent_storage.create_agent(test_user_id, "Test Agent", "Role", "model")
         agent_id = created["id"]
 
@@ -104,46 +97,37 @@ class TestAgentCRUD:
         with pytest.raises(ValueError, match="Invalid agent_id format"):
             agent_storage.get_agent_by_id(test_user_id, TEST_INVALID_ID)
 
-    def test_update_agent(self, temp_data_dir, test_user_id):
+    def test_update_agent(self, test_user_id, clean_agents, fake_now):
         """Test updating an agent."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         created = agent_storage.create_agent(test_user_id, "Original Title", "Role", "model")
         agent_id = created["id"]
 
-        with freeze_time("2024-01-02 12:00:00"):
-            updated = agent_storage.update_agent(test_user_id, agent_id, {
-                "title": "Updated Title",
-                "role": "Updated Role"
-            })
+        fake_now.current = datetime(2024, 1, 2, 12, 0, 0)
+        updated = agent_storage.update_agent(test_user_id, agent_id, {
+            "title": "Updated Title",
+            "role": "Updated Role"
+        })
 
-            assert updated["title"] == "Updated Title"
-            assert updated["role"] == "Updated Role"
-            assert updated["model"] == "model"  # Unchanged
-            assert updated["updated_at"] == "2024-01-02T12:00:00"
+        assert updated["title"] == "Updated Title"
+        assert updated["role"] == "Updated Role"
+        assert updated["model"] == "model"  # Unchanged
+        assert updated["updated_at"] == "2024-01-02T12:00:00"
 
-    def test_update_agent_preserves_id_and_created_at(self, temp_data_dir, test_user_id):
+    def test_update_agent_preserves_id_and_created_at(self, test_user_id, clean_agents, fake_now):
         """Test that update doesn't change id or created_at."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
-        with freeze_time("2024-01-01 12:00:00"):
-            created = agent_storage.create_agent(test_user_id, "Test", "Role", "model")
-            original_id = created["id"]
-            original_created = created["created_at"]
+        created = agent_storage.create_agent(test_user_id, "Test", "Role", "model")
+        original_id = created["id"]
+        original_created = created["created_at"]
 
-        with freeze_time("2024-01-02 12:00:00"):
-            updated = agent_storage.update_agent(test_user_id, original_id, {
-                "id": "new-id",  # Should be ignored
-                "created_at": "2025-01-01T00:00:00",  # Should be ignored
-                "title": "New Title"
-            })
+        fake_now.current = datetime(2024, 1, 2, 12, 0, 0)
+        updated = agent_storage.update_agent(test_user_id, original_id, {
+            "id": "new-id",  # Should be ignored
+            "created_at": "2025-01-01T00:00:00",  # Should be ignored
+            "title": "New Title"
+        })
 
-            assert updated["id"] == original_id
-            assert updated["created_at"] == original_created
+        assert updated["id"] == original_id
+        assert updated["created_at"] == original_created
 
     def test_update_agent_not_found(self, temp_data_dir, test_user_id):
         """Test updating non-existent agent."""
@@ -151,12 +135,8 @@ class TestAgentCRUD:
 
         assert result is None
 
-    def test_delete_agent(self, temp_data_dir, test_user_id):
+    def test_delete_agent(self, test_user_id, clean_agents):
         """Test deleting an agent."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         created = agent_storage.create_agent(test_user_id, "Test Agent", "Role", "model")
         agent_id = created["id"]
 
@@ -175,12 +155,8 @@ class TestAgentCRUD:
 class TestChairmanManagement:
     """Test chairman designation."""
 
-    def test_set_chairman(self, temp_data_dir, test_user_id):
+    def test_set_chairman(self, test_user_id, clean_agents):
         """Test setting chairman."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         agent = agent_storage.create_agent(test_user_id, "Chairman", "Role", "model")
         agent_id = agent["id"]
 
@@ -192,12 +168,8 @@ class TestChairmanManagement:
         assert chairman is not None
         assert chairman["id"] == agent_id
 
-    def test_set_chairman_to_none(self, temp_data_dir, test_user_id):
+    def test_set_chairman_to_none(self, test_user_id, clean_agents):
         """Test clearing chairman (set to None)."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         agent = agent_storage.create_agent(test_user_id, "Chairman", "Role", "model")
         agent_storage.set_chairman(test_user_id, agent["id"])
 
@@ -213,12 +185,8 @@ class TestChairmanManagement:
 
         assert success is False
 
-    def test_get_chairman_when_none(self, temp_data_dir, test_user_id):
+    def test_get_chairman_when_none(self, test_user_id, clean_agents):
         """Test getting chairman when none is set."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         chairman = agent_storage.get_chairman(test_user_id)
 
         assert chairman is None
@@ -248,6 +216,17 @@ class TestDefaultAgents:
         # Titles should match
         assert sorted([a["title"] for a in agents1]) == sorted([a["title"] for a in agents2])
 
+    def test_initialize_default_agents_saved_once(self, temp_data_dir, test_user_id):
+        """Test that defaults are saved on first initialization and reused without a write after."""
+        agents1 = agent_storage.initialize_default_agents(test_user_id)
+
+        with patch("backend.agent_storage._write_agents_file") as mock_write:
+            agents2 = agent_storage.initialize_default_agents(test_user_id)
+
+        mock_write.assert_not_called()
+        assert [a["id"] for a in agents2] == [a["id"] for a in agents1]
+        assert [a["id"] for a in agent_storage.get_all_agents(test_user_id)] == [a["id"] for a in agents1]
+
     def test_default_agents_have_prompts(self, temp_data_dir, test_user_id):
         """Test that default agents have stage1 prompts."""
         agents = agent_storage.initialize_default_agents(test_user_id)
@@ -256,19 +235,29 @@ class TestDefaultAgents:
             assert "stage1" in agent["prompts"]
             assert len(agent["prompts"]["stage1"]) > 0
 
+    def test_default_agents_data_fresh_per_call(self, fake_now):
+        """Test that default agents get unique ids and unshared prompts."""
+        data1 = agent_storage.initialize_default_agents_data()
+        data2 = agent_storage.initialize_default_agents_data()
+
+        ids = [a["id"] for a in data1["agents"] + data2["agents"]]
+        assert len(set(ids)) == 8
+        for agent in data1["agents"]:
+            assert agent["created_at"] == "2024-01-01T12:00:00"
+            assert agent["updated_at"] == "2024-01-01T12:00:00"
+
+        data1["agents"][0]["prompts"]["stage1"] = "changed"
+        assert data2["agents"][0]["prompts"]["stage1"] != "changed"
+
 
 class TestDataPersistence:
     """Test data persistence to JSON files."""
 
-    def test_agents_persisted_to_file(self, temp_data_dir, test_user_id):
+    def test_agents_persisted_to_file(self, test_user_id, clean_agents):
         """Test that agents are saved to JSON file."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         agent = agent_storage.create_agent(test_user_id, "Test", "Role", "model")
 
-        agents_file = Path(get_user_agents_file(test_user_id))
+        agents_file = get_user_agents_file(test_user_id)
         assert agents_file.exists()
 
         with open(agents_file, 'r') as f:
@@ -278,16 +267,12 @@ class TestDataPersistence:
         assert len(data["agents"]) == 1
         assert data["agents"][0]["title"] == "Test"
 
-    def test_chairman_persisted(self, temp_data_dir, test_user_id):
+    def test_chairman_persisted(self, test_user_id, clean_agents):
         """Test that chairman designation is persisted."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         agent = agent_storage.create_agent(test_user_id, "Chairman", "Role", "model")
         agent_storage.set_chairman(test_user_id, agent["id"])
 
-        agents_file = Path(get_user_agents_file(test_user_id))
+        agents_file = get_user_agents_file(test_user_id)
         with open(agents_file, 'r') as f:
             data = json.load(f)
 
@@ -296,7 +281,7 @@ class TestDataPersistence:
     def test_load_from_corrupted_json(self, temp_data_dir, test_user_id):
         """Test handling of corrupted JSON file."""
         # Create corrupted JSON file
-        agents_file = Path(get_user_agents_file(test_user_id))
+        agents_file = get_user_agents_file(test_user_id)
         agents_file.parent.mkdir(parents=True, exist_ok=True)
         with open(agents_file, 'w') as f:
             f.write("{ invalid json }")
@@ -321,39 +306,43 @@ class TestDataPersistence:
 class TestEdgeCases:
     """Test edge cases and error conditions."""
 
-    def test_create_agent_with_empty_strings(self, temp_data_dir, test_user_id):
+    def test_create_agent_with_empty_strings(self, test_user_id, clean_agents):
         """Test creating agent with empty strings."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         agent = agent_storage.create_agent(test_user_id, "", "", "")
 
         assert agent["title"] == ""
         assert agent["role"] == ""
         assert agent["model"] == ""
 
-    def test_update_with_empty_dict(self, temp_data_dir, test_user_id):
+    def test_update_with_empty_dict(self, test_user_id, clean_agents, fake_now):
         """Test updating with empty updates dict."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
-
         created = agent_storage.create_agent(test_user_id, "Test", "Role", "model")
         original_updated_at = created["updated_at"]
 
-        with freeze_time("2024-01-02 12:00:00"):
-            updated = agent_storage.update_agent(test_user_id, created["id"], {})
+        fake_now.current = datetime(2024, 1, 2, 12, 0, 0)
+        updated = agent_storage.update_agent(test_user_id, created["id"], {})
 
-            # Should still update the updated_at timestamp
-            assert updated["updated_at"] != original_updated_at
+        # No-op updates leave the agent (and its timestamp) unchanged
+        assert updated == created
+        assert updated["updated_at"] == original_updated_at
 
-    def test_multiple_agents_same_model(self, temp_data_dir, test_user_id):
-        """Test multiple agents can use the same model."""
-        # Clear any defaults first
-        data = {"agents": [], "chairman": None}
-        agent_storage.save_agents(test_user_id, data)
+    def test_update_with_unchanged_values_skips_write(self, temp_data_dir, test_user_id, monkeypatch):
+        """Test that an update setting current values does not rewrite the file."""
+        created = agent_storage.create_agent(test_user_id, "Test", "Role", "model")
+
+        def fail(user_id, entry):
+            raise AssertionError("agents file should not be written")
+
+        monkeypatch.setattr(agent_storage, "_write_agents_file", fail)
+        updated = agent_storage.update_agent(test_user_id, created["id"], {
+            "title": "Test",
+            "id": "ignored",
+        })
 
+        assert updated == created
+
+    def test_multiple_agents_same_model(self, test_user_id, clean_agents):
+        """Test multiple agents can use the same model."""
         agent1 = agent_storage.create_agent(test_user_id, "Agent 1", "Role 1", "same/model")
         agent2 = agent_storage.create_agent(test_user_id, "Agent 2", "Role 2", "same/model")
 
@@ -370,3 +359,157 @@ class TestEdgeCases:
 
         # Should default to True
         assert len(active_agents) == 1
+
+
+class TestAgentsCache:
+    """Test the in-memory cache of parsed agents data."""
+
+    def test_repeated_reads_skip_parsing(self, test_user_id, clean_agents, monkeypatch):
+        """Test that unchanged files are parsed only once."""
+        agent_storage.create_agent(test_user_id, "Test", "Role", "model")
+
+        calls = []
+        original_loads = agent_storage.json_utils.loads
+        monkeypatch.setattr(agent_storage.json_utils, "loads", lambda d: calls.append(d) or original_loads(d))
+
+        agent_storage.get_all_agents(test_user_id)
+        agent_storage.get_active_agents(test_user_id)
+        agent_storage.get_chairman(test_user_id)
+
+        assert calls == []
+
+    def test_external_file_change_invalidates_cache(self, test_user_id, clean_agents):
+        """Test that edits made outside the module are picked up."""
+        assert agent_storage.get_all_agents(test_user_id) == []
+
+        agents_file = get_user_agents_file(test_user_id)
+        with open(agents_file, 'w') as f:
+            json.dump({"agents": [{"id": "1", "title": "External", "model": "m"}], "chairman": None}, f)
+
+        agents = agent_storage.get_all_agents(test_user_id)
+        assert len(agents) == 1
+        assert agents[0]["title"] == "External"
+
+    def test_load_agents_returns_private_copy(self, test_user_id, clean_agents):
+        """Test that mutating loaded data does not leak into the cache."""
+
+        data = agent_storage.load_agents(test_user_id)
+        data["agents"].append({"id": "1", "title": "Unsaved"})
+
+        assert agent_storage.get_all_agents(test_user_id) == []
+
+    def test_lookup_by_id_after_delete(self, test_user_id, clean_agents):
+        """Test that id lookups stay correct after the agent list shifts."""
+        first = agent_storage.create_agent(test_user_id, "Agent 1", "Role", "model-1")
+        second = agent_storage.create_agent(test_user_id, "Agent 2", "Role", "model-2")
+        third = agent_storage.create_agent(test_user_id, "Agent 3", "Role", "model-3")
+
+        agent_storage.delete_agent(test_user_id, second["id"])
+
+        assert agent_storage.get_agent_by_id(test_user_id, first["id"])["title"] == "Agent 1"
+        assert agent_storage.get_agent_by_id(test_user_id, second["id"]) is None
+        assert agent_storage.get_agent_by_id(test_user_id, third["id"])["title"] == "Agent 3"
+
+    def test_set_chairman_checks_index_and_skips_no_op(self, test_user_id, clean_agents):
+        """Test that setting the current chairman again doesn't rewrite the file."""
+        agent = agent_storage.create_agent(test_user_id, "Chair", "Role", "model")
+
+        assert agent_storage.set_chairman(test_user_id, agent["id"]) is True
+        with patch("backend.agent_storage._write_agents_file") as mock_write:
+            assert agent_storage.set_chairman(test_user_id, agent["id"]) is True
+            assert agent_storage.set_chairman(test_user_id, NONEXISTENT_AGENT_ID) is False
+
+        mock_write.assert_not_called()
+        assert agent_storage.get_chairman(test_user_id)["title"] == "Chair"
+
+    def test_active_agents_follow_updates(self, test_user_id, clean_agents):
+        """Test that the precomputed active list changes when an agent is toggled."""
+        first = agent_storage.create_agent(test_user_id, "Agent 1", "Role", "model-1")
+        agent_storage.create_agent(test_user_id, "Agent 2", "Role", "model-2")
+
+        agent_storage.update_agent(test_user_id, first["id"], {"active": False})
+        assert [a["title"] for a in agent_storage.get_active_agents(test_user_id)] == ["Agent 2"]
+
+        agent_storage.update_agent(test_user_id, first["id"], {"active": True})
+        active = agent_storage.get_active_agents(test_user_id)
+        assert [a["title"] for a in active] == ["Agent 1", "Agent 2"]
+
+        # The returned list is the caller's own
+        active.clear()
+        assert len(agent_storage.get_active_agents(test_user_id)) == 2
+
+    def test_returned_agents_do_not_alias_cache(self, test_user_id, clean_agents):
+        """Test that modifying returned or saved data leaves the cached agents unchanged."""
+        created = agent_storage.create_agent(test_user_id, "Agent", "Role", "model", prompts={"stage1": "P"})
+        agent_storage.set_chairman(test_user_id, created["id"])
+
+        created["title"] = "Changed"
+        agent_storage.get_agent_by_id(test_user_id, created["id"])["role"] = "Changed"
+        agent_storage.get_all_agents(test_user_id)[0]["prompts"]["stage1"] = "Changed"
+        agent_storage.get_active_agents(test_user_id)[0]["model"] = "changed"
+        agent_storage.get_chairman(test_user_id)["emoji"] = "X"
+        agent_storage.update_agent(test_user_id, created["id"], {"active": False})["title"] = "Changed"
+
+        data = agent_storage.load_agents(test_user_id)
+        agent_storage.save_agents(test_user_id, data)
+        data["agents"][0]["title"] = "Changed"
+
+        agent = agent_storage.get_agent_by_id(test_user_id, created["id"])
+        assert agent["title"] == "Agent"
+        assert agent["role"] == "Role"
+        assert agent["model"] == "model"
+        assert agent["prompts"] == {"stage1": "P"}
+        assert agent["emoji"] == "🤖"
+
+    def test_read_does_not_create_user_directory(self, temp_data_dir, test_user_id):
+        """Test that reading agents for a new user has no filesystem side effects."""
+        agents = agent_storage.get_all_agents(test_user_id)
+
+        assert len(agents) == 4
+        assert not get_user_agents_file(test_user_id).parent.exists()
+
+    def test_save_is_atomic_on_failure(self, test_user_id, clean_agents, monkeypatch):
+        """Test that a failed save leaves the previous file intact."""
+
+        def fail(obj, indent=False):
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(agent_storage.json_utils, "dumps", fail)
+        with pytest.raises(RuntimeError):
+            agent_storage.save_agents(test_user_id, {"agents": [{"id": "1"}], "chairman": None})
+
+        agents_file = get_user_agents_file(test_user_id)
+        with open(agents_file, 'r') as f:
+            assert json.load(f) == {"agents": [], "chairman": None}
+        assert list(agents_file.parent.glob("*.tmp.*")) == []
+
+
+class TestAgentView:
+    """Test the read-only Agent view used by council runs."""
+
+    def test_from_dict(self, sample_agent):
+        """Test that stored agent fields map onto the view."""
+        agent = agent_storage.Agent.from_dict(sample_agent)
+
+        assert agent.id == sample_agent["id"]
+        assert agent.title == "Test Agent"
+        assert agent.model == "test/model-1"
+        assert agent.stage1_template == "Test stage 1 prompt: {user_query}"
+        assert agent.stage2_template == "Test stage 2 prompt: {responses_text}"
+
+    def test_from_dict_defaults(self):
+        """Test defaults for agents without a title, emoji or custom prompts."""
+        agent = agent_storage.Agent.from_dict({"id": "legacy-0", "model": "test/model", "prompts": {"stage1": ""}})
+
+        assert agent.title == "test/model"
+        assert agent.emoji == "🤖"
+        # An empty custom prompt is still the agent's own prompt
+        assert agent.stage1_template == ""
+        assert agent.stage2_template is None
+
+    def test_frozen(self, sample_agent):
+        """Test that the view cannot be modified."""
+        agent = agent_storage.Agent.from_dict(sample_agent)
+
+        with pytest.raises(AttributeError):
+            agent.model = "other/model"
@@ -0,0 +1,108 @@
+"""Tests for auth.py - Clerk JWT verification."""
+
+import json
+import time
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from unittest.mock import MagicMock, patch
+from backend import auth
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    """RSA key pair used to sign test tokens."""
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(autouse=True)
+def fresh_jwks():
+    """Start and end each test without cached JWKS or signing keys."""
+    auth.get_clerk_jwks.cache_clear()
+    auth._get_signing_keys.cache_clear()
+    yield
+    auth.get_clerk_jwks.cache_clear()
+    auth._get_signing_keys.cache_clear()
+
+
+def _jwks(key, kid):
+    """Build a JWKS document publishing the key's public half under kid."""
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+    jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return {"keys": [jwk]}
+
+
+def _token(key, kid, expires_in=60):
+    """Sign a token for the test user."""
+    claims = {"sub": TEST_USER_ID, "exp": int(time.time()) + expires_in}
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+
+def _jwks_client(*documents):
+    """Mock JWKS HTTP client serving the given documents on successive fetches."""
+    responses = []
+    for document in documents:
+        response = MagicMock()
+        response.json.return_value = document
+        responses.append(response)
+    client = MagicMock()
+    client.get.side_effect = responses
+    return client
+
+
+def _verify(token):
+    """Run the dependency on a bearer token."""
+    return auth.verify_clerk_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+
+class TestVerifyClerkToken:
+    """Test token verification against Clerk's JWKS."""
+
+    def test_valid_token(self, signing_key):
+        """Test that a token signed with a published key is accepted."""
+        client = _jwks_client(_jwks(signing_key, "key-1"))
+
+        with patch("backend.auth._get_jwks_client", return_value=client):
+            claims = _verify(_token(signing_key, "key-1"))
+            _verify(_token(signing_key, "key-1"))
+
+        assert claims["sub"] == TEST_USER_ID
+        # Keys stay cached between requests
+        assert client.get.call_count == 1
+
+    def test_unknown_kid_refetches_jwks(self, signing_key):
+        """Test that a rotated key is picked up by refetching the JWKS once."""
+        client = _jwks_client(_jwks(signing_key, "old-key"), _jwks(signing_key, "new-key"))
+
+        with patch("backend.auth._get_jwks_client", return_value=client):
+            _verify(_token(signing_key, "old-key"))
+            claims = _verify(_token(signing_key, "new-key"))
+
+        assert claims["sub"] == TEST_USER_ID
+        assert client.get.call_count == 2
+
+    def test_kid_missing_after_refetch(self, signing_key):
+        """Test that a key absent from the refetched JWKS is rejected."""
+        client = _jwks_client(_jwks(signing_key, "key-1"), _jwks(signing_key, "key-1"))
+
+        with patch("backend.auth._get_jwks_client", return_value=client):
+            with pytest.raises(HTTPException) as exc_info:
+                _verify(_token(signing_key, "unknown-key"))
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Token key not found in JWKS"
+        assert client.get.call_count == 2
+
+    def test_expired_token(self, signing_key):
+        """Test that an expired token is rejected."""
+        client = _jwks_client(_jwks(signing_key, "key-1"))
+
+        with patch("backend.auth._get_jwks_client", return_value=client):
+            with pytest.raises(HTTPException) as exc_info:
+                _verify(_token(signing_key, "key-1", expires_in=-60))
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Token expired"
@@ -0,0 +1,28 @@
+"""Tests for config.py - per-user path builders."""
+
+from pathlib import Path
+from backend import config
+from tests.conftest import TEST_USER_ID
+
+
+class TestUserPaths:
+    """Test per-user path construction."""
+
+    def test_paths_under_user_dir(self, temp_data_dir):
+        """Test that user files live under the user's data directory."""
+        user_dir = config.get_user_data_dir(TEST_USER_ID)
+
+        assert user_dir == Path(temp_data_dir) / "users" / TEST_USER_ID
+        assert config.get_user_conversations_dir(TEST_USER_ID) == user_dir / "conversations"
+        assert config.get_user_agents_file(TEST_USER_ID) == user_dir / "agents.json"
+        assert config.get_user_prompts_file(TEST_USER_ID) == user_dir / "prompts.json"
+
+    def test_paths_follow_data_base_dir(self, monkeypatch):
+        """Test that cached paths are not reused after DATA_BASE_DIR changes."""
+        monkeypatch.setattr(config, "DATA_BASE_DIR", "/tmp/base-a")
+        path_a = config.get_user_agents_file(TEST_USER_ID)
+        monkeypatch.setattr(config, "DATA_BASE_DIR", "/tmp/base-b")
+        path_b = config.get_user_agents_file(TEST_USER_ID)
+
+        assert path_a == Path("/tmp/base-a/users") / TEST_USER_ID / "agents.json"
+        assert path_b == Path("/tmp/base-b/users") / TEST_USER_ID / "agents.json"
@@ -1,16 +1,22 @@
 """Tests for council.py - core orchestration logic."""
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
+from backend import council, prompt_storage
 from backend.council import (
     parse_ranking_from_text,
     calculate_aggregate_rankings,
     generate_conversation_title,
     stage1_collect_responses,
+    stage1_stream,
     stage2_collect_rankings,
     stage3_synthesize_final,
+    stage3_stream,
     run_full_council
 )
+from backend.openrouter import OpenRouterCreditsExhaustedError
+from backend.prompts import render_prompt
 from tests.conftest import TEST_USER_ID
 
 
@@ -45,6 +51,12 @@ class TestParseRankingFromText:
         result = parse_ranking_from_text(text)
         assert result == ["Response C", "Response B", "Response A"]
 
+    def test_parse_stops_at_repeated_header(self):
+        """Test that the ranking section ends at a repeated 'FINAL RANKING:' header."""
+        text = "FINAL RANKING:\n1. Response B\n2. Response A\n\nFINAL RANKING:\n1. Response C"
+        result = parse_ranking_from_text(text)
+        assert result == ["Response B", "Response A"]
+
     def test_parse_empty_string(self):
         """Test parsing empty string."""
         result = parse_ranking_from_text("")
@@ -194,6 +206,39 @@ class TestCalculateAggregateRankings:
         for agent_result in result:
             assert agent_result["rankings_count"] == 1
 
+    def test_uses_parsed_ranking(self, sample_label_to_model):
+        """Test that the stage 2 parsed ranking is used, with text parsing as fallback."""
+        stage2_results = [
+            {"ranking": "unparseable", "parsed_ranking": ["Response B", "Response A"]},
+            {"ranking": "FINAL RANKING:\n1. Response B\n2. Response A"}
+        ]
+
+        result = calculate_aggregate_rankings(stage2_results, sample_label_to_model)
+
+        assert [(r["agent_title"], r["average_rank"]) for r in result] == [
+            ("Agent Two", 1.0),
+            ("Agent One", 2.0)
+        ]
+        assert result[0]["model"] == "test/model-2"
+
+    def test_duplicate_titles_use_first_label_info(self):
+        """Test that agents sharing a title aggregate together under the first label's model."""
+        label_to_model = {
+            "Response A": {"agent_title": "Analyst", "model": "test/model-1"},
+            "Response B": {"agent_title": "Analyst", "model": "test/model-2"},
+            "Response C": {"agent_title": "Critic", "model": "test/model-3"}
+        }
+        stage2_results = [
+            {"ranking": "", "parsed_ranking": ["Response B", "Response C", "Response A"]}
+        ]
+
+        result = calculate_aggregate_rankings(stage2_results, label_to_model)
+
+        assert [(r["agent_title"], r["model"], r["average_rank"]) for r in result] == [
+            ("Analyst", "test/model-1", 2.0),
+            ("Critic", "test/model-3", 2.0)
+        ]
+
 
 class TestGenerateConversationTitle:
     """Test conversation title generation."""
@@ -306,6 +351,185 @@ class TestStage1CollectResponses:
                 messages = call_args[0][1]
                 assert "Custom prompt: Test?" in messages[0]["content"]
 
+    @pytest.mark.asyncio
+    async def test_model_prompts_loaded_once(self, sample_agents, temp_data_dir, test_user_id):
+        """Test that custom prompts are read once per stage, not once per agent."""
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "Model prompt: {user_query}"}, model="test/model-2")
+
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents[:3]):
+            with patch("backend.council.resolve_prompts", wraps=prompt_storage.resolve_prompts) as mock_load:
+                with patch("backend.council.query_model") as mock_query:
+                    mock_query.return_value = {"content": "Response"}
+
+                    await stage1_collect_responses(test_user_id, "Test?")
+
+        assert mock_load.call_count == 1
+        prompts = {call[0][0]: call[0][1][0]["content"] for call in mock_query.call_args_list}
+        assert prompts["test/model-2"] == "Model prompt: Test?"
+
+    @pytest.mark.asyncio
+    async def test_identical_queries_deduplicated(self, sample_agents, test_user_id):
+        """Test that agents with the same model and prompt share one query."""
+        twin = {**sample_agents[0], "id": "twin-agent", "title": "Twin"}
+
+        with patch("backend.council.agent_storage.get_active_agents", return_value=[sample_agents[0], twin]):
+            with patch("backend.council.query_model") as mock_query:
+                mock_query.return_value = {"content": "Shared response"}
+
+                result = await stage1_collect_responses(test_user_id, "Test?")
+
+        mock_query.assert_called_once()
+        assert [r["agent_title"] for r in result] == ["Agent One", "Twin"]
+        assert all(r["response"] == "Shared response" for r in result)
+
+    @pytest.mark.asyncio
+    async def test_quorum_cancels_stragglers(self, sample_agents, test_user_id):
+        """Test that stage 1 returns once the quorum responded, dropping slow agents."""
+        cancelled = []
+
+        async def fake_query(model, messages, **kwargs):
+            if model == "test/model-3":
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(model)
+                    raise
+            return {"content": f"From {model}"}
+
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents):
+            with patch("backend.council.query_model", side_effect=fake_query):
+                result = await asyncio.wait_for(
+                    stage1_collect_responses(test_user_id, "Test?", quorum=2),
+                    timeout=1
+                )
+
+        assert [r["model"] for r in result] == ["test/model-1", "test/model-2"]
+        assert cancelled == ["test/model-3"]
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_in_arrival_order(self, sample_agents, test_user_id):
+        """Test that stage 1 streams responses as they arrive, tagged with agent position."""
+        async def fake_query(model, messages, **kwargs):
+            if model == "test/model-1":
+                await asyncio.sleep(0.05)
+            return {"content": f"From {model}"}
+
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents[:2]):
+            with patch("backend.council.query_model", side_effect=fake_query):
+                items = [item async for item in stage1_stream(test_user_id, "Test?")]
+                collected = await stage1_collect_responses(test_user_id, "Test?")
+
+        assert [(pos, r["model"]) for pos, r in items] == [(1, "test/model-2"), (0, "test/model-1")]
+        assert [r["model"] for r in collected] == ["test/model-1", "test/model-2"]
+
+    @pytest.mark.asyncio
+    async def test_deadline_drops_slow_agents(self, sample_agents, test_user_id):
+        """Test that agents still running at the stage deadline are cancelled."""
+        async def fake_query(model, messages, **kwargs):
+            if model == "test/model-2":
+                await asyncio.sleep(10)
+            return {"content": f"From {model}"}
+
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents[:2]):
+            with patch("backend.council.query_model", side_effect=fake_query):
+                with patch("backend.council.STAGE_DEADLINE_SECONDS", 0.05):
+                    result = await asyncio.wait_for(
+                        stage1_collect_responses(test_user_id, "Test?"),
+                        timeout=1
+                    )
+
+        assert [r["model"] for r in result] == ["test/model-1"]
+
+    @pytest.mark.asyncio
+    async def test_quorum_stops_on_credits_exhausted(self, sample_agents, test_user_id):
+        """Test that credits exhaustion is raised without waiting for the quorum."""
+        async def fake_query(model, messages, **kwargs):
+            if model == "test/model-1":
+                raise OpenRouterCreditsExhaustedError("out of credits")
+            await asyncio.sleep(10)
+
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents):
+            with patch("backend.council.query_model", side_effect=fake_query):
+                with pytest.raises(OpenRouterCreditsExhaustedError):
+                    await asyncio.wait_for(
+                        stage1_collect_responses(test_user_id, "Test?", quorum=2),
+                        timeout=1
+                    )
+
+
+class TestStage1Hedging:
+    """Test hedging slow stage 1 queries with a backup model."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_latency(self, monkeypatch):
+        """Start each test without latency history."""
+        monkeypatch.setattr(council, "_MODEL_LATENCY", {})
+
+    @pytest.mark.asyncio
+    async def test_slow_model_hedged(self, sample_agents, test_user_id):
+        """Test that a model running past the hedge delay is raced against the hedge model."""
+        async def slow_primary(model, messages, **kwargs):
+            if model == "test/hedge":
+                return {"content": "Hedged answer"}
+            await asyncio.sleep(5)
+            return {"content": "Too late"}
+
+        with patch("backend.council.STAGE1_HEDGE_MODEL", "test/hedge"):
+            with patch("backend.council.STAGE1_HEDGE_AFTER_SECONDS", 0.01):
+                with patch("backend.council.query_model", side_effect=slow_primary):
+                    results = await asyncio.wait_for(
+                        stage1_collect_responses(test_user_id, "Test query?", agents=sample_agents[:1]),
+                        timeout=1
+                    )
+
+        assert results[0]["agent_title"] == "Agent One"
+        assert results[0]["model"] == "test/hedge"
+        assert results[0]["response"] == "Hedged answer"
+
+    @pytest.mark.asyncio
+    async def test_fast_model_not_hedged(self, sample_agents, test_user_id):
+        """Test that no hedge is sent when the model answers in time."""
+        with patch("backend.council.STAGE1_HEDGE_MODEL", "test/hedge"):
+            with patch("backend.council.query_model") as mock_query:
+                mock_query.return_value = {"content": "Quick answer"}
+
+                results = await stage1_collect_responses(test_user_id, "Test query?", agents=sample_agents[:1])
+
+        mock_query.assert_called_once()
+        assert results[0]["model"] == "test/model-1"
+        assert council._MODEL_LATENCY["test/model-1"][0] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_query_not_recorded(self):
+        """Test that a query cut off by quorum or deadline leaves the latency history alone."""
+        async def slow(model, messages, **kwargs):
+            await asyncio.sleep(5)
+            return {"content": "Too late"}
+
+        with patch("backend.council.STAGE1_HEDGE_MODEL", "test/hedge"):
+            with patch("backend.council.STAGE1_HEDGE_AFTER_SECONDS", 0.01):
+                with patch("backend.council.query_model", side_effect=slow):
+                    query = asyncio.create_task(council._hedged_query("test/model-1", []))
+                    await asyncio.sleep(0.05)
+                    query.cancel()
+                    with pytest.raises(asyncio.CancelledError):
+                        await query
+
+        assert council._MODEL_LATENCY == {}
+
+    def test_hedge_delay_follows_latency_history(self):
+        """Test that the hedge delay switches to the model's p95 estimate once it has history."""
+        with patch("backend.council.STAGE1_HEDGE_AFTER_SECONDS", 30.0):
+            for _ in range(4):
+                council._record_latency("test/model", 2.0)
+            assert council._hedge_delay("test/model") == 30.0
+
+            council._record_latency("test/model", 2.0)
+            assert council._hedge_delay("test/model") == pytest.approx(2.0)
+
+            council._record_latency("test/model", 6.0)
+            assert council._hedge_delay("test/model") > 6.0 * council._LATENCY_ALPHA + 2.0 * (1 - council._LATENCY_ALPHA)
+
 
 class TestStage2CollectRankings:
     """Test Stage 2: Collect rankings."""
@@ -329,6 +553,22 @@ class TestStage2CollectRankings:
                 assert "Response C" in label_to_model
                 assert label_to_model["Response A"]["agent_title"] == "Agent One"
 
+    @pytest.mark.asyncio
+    async def test_responses_text_labels(self, sample_stage1_results, sample_agents, test_user_id):
+        """Test that the ranking prompt lists each response under its label, in order."""
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents[:1]):
+            with patch("backend.council.query_model") as mock_query:
+                mock_query.return_value = {"content": "FINAL RANKING:\n1. Response A"}
+
+                await stage2_collect_rankings(test_user_id, "Test query?", sample_stage1_results)
+
+        prompt = mock_query.call_args.args[1][0]["content"]
+        assert (
+            "Response A:\nThis is response A with detailed analysis.\n\n"
+            "Response B:\nThis is response B with alternative perspective.\n\n"
+            "Response C:\nThis is response C with additional insights."
+        ) in prompt
+
     @pytest.mark.asyncio
     async def test_ranking_parsing(self, sample_stage1_results, sample_agents, test_user_id):
         """Test that rankings are parsed correctly."""
@@ -346,6 +586,26 @@ class TestStage2CollectRankings:
 
                 assert results[0]["parsed_ranking"] == ["Response B", "Response A", "Response C"]
 
+    @pytest.mark.asyncio
+    async def test_shared_template_rendered_once(self, sample_stage1_results, sample_agents, test_user_id):
+        """Test that agents sharing a stage 2 template share one rendered prompt."""
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents[:2]):
+            with patch("backend.council.query_model") as mock_query:
+                with patch("backend.council.render_prompt", wraps=render_prompt) as mock_render:
+                    mock_query.return_value = {"content": "FINAL RANKING:\n1. Response A"}
+
+                    results, _ = await stage2_collect_rankings(
+                        test_user_id,
+                        "Test query?",
+                        sample_stage1_results
+                    )
+
+        assert mock_render.call_count == 1
+        prompts = [call.args[1][0]["content"] for call in mock_query.call_args_list]
+        assert prompts[0] is prompts[1]
+        assert "Test query?" in prompts[0]
+        assert len(results) == 2
+
     @pytest.mark.asyncio
     async def test_legacy_fallback_stage2(self, sample_stage1_results, test_user_id):
         """Test fallback when no agents configured in stage 2."""
@@ -366,6 +626,29 @@ class TestStage2CollectRankings:
 class TestStage3SynthesizeFinal:
     """Test Stage 3: Final synthesis."""
 
+    @pytest.mark.asyncio
+    async def test_chairman_prompt_context(self, sample_stage1_results, test_user_id):
+        """Test that the chairman sees each response and ranking under its agent's title."""
+        stage2_results = [
+            {"agent_title": "Agent One", "model": "test/model-1", "ranking": "1. Response A"},
+            {"agent_title": "Agent Two", "model": "test/model-2", "ranking": "1. Response B"}
+        ]
+
+        with patch("backend.council.agent_storage.get_chairman", return_value=None):
+            with patch("backend.council.query_model") as mock_query:
+                mock_query.return_value = {"content": "Final synthesis"}
+
+                result = await stage3_synthesize_final(
+                    test_user_id, "Test query?", sample_stage1_results, stage2_results
+                )
+
+        assert (
+            "Agent One: This is response A with detailed analysis.\n\n"
+            "Agent Two: This is response B with alternative perspective.\n\n"
+            "Agent Three: This is response C with additional insights."
+        ) in result["prompt"]
+        assert "Agent One: 1. Response A\n\nAgent Two: 1. Response B" in result["prompt"]
+
     @pytest.mark.asyncio
     async def test_with_chairman_agent(self, sample_stage1_results, test_user_id):
         """Test synthesis with designated chairman."""
@@ -435,6 +718,83 @@ class TestStage3SynthesizeFinal:
                 assert "Error" in result["response"]
 
 
+class TestStage3Stream:
+    """Test Stage 3 synthesis streamed from the chairman."""
+
+    @staticmethod
+    async def _collect(stream):
+        return [item async for item in stream]
+
+    @pytest.mark.asyncio
+    async def test_deltas_then_complete(self, sample_stage1_results, test_user_id):
+        """Test that response chunks are yielded before the assembled result."""
+        async def chairman_reply(model, messages):
+            yield "Final "
+            yield "synthesis"
+
+        with patch("backend.council.agent_storage.get_chairman", return_value=None):
+            with patch("backend.council.CHAIRMAN_MODEL", "test/default-chairman"):
+                with patch("backend.council.stream_model", side_effect=chairman_reply):
+                    items = await self._collect(
+                        stage3_stream(test_user_id, "Test query?", sample_stage1_results, [])
+                    )
+
+        assert items[:2] == [("delta", "Final "), ("delta", "synthesis")]
+        kind, result = items[2]
+        assert kind == "complete"
+        assert result["response"] == "Final synthesis"
+        assert result["model"] == "test/default-chairman"
+        assert "Test query?" in result["prompt"]
+
+    @pytest.mark.asyncio
+    async def test_failure_mid_stream(self, sample_stage1_results, test_user_id):
+        """Test that a broken stream ends with the usual error result."""
+        async def broken_reply(model, messages):
+            yield "Partial"
+            raise RuntimeError("connection reset")
+
+        with patch("backend.council.agent_storage.get_chairman", return_value=None):
+            with patch("backend.council.stream_model", side_effect=broken_reply):
+                items = await self._collect(
+                    stage3_stream(test_user_id, "Test query?", sample_stage1_results, [])
+                )
+
+        assert items[0] == ("delta", "Partial")
+        assert items[-1][0] == "complete"
+        assert "Error" in items[-1][1]["response"]
+
+    @pytest.mark.asyncio
+    async def test_credits_exhausted_propagates(self, sample_stage1_results, test_user_id):
+        """Test that exhausted credits are raised rather than reported as a result."""
+        async def no_credits(model, messages):
+            raise OpenRouterCreditsExhaustedError("Credits exhausted")
+            yield
+
+        with patch("backend.council.agent_storage.get_chairman", return_value=None):
+            with patch("backend.council.stream_model", side_effect=no_credits):
+                with pytest.raises(OpenRouterCreditsExhaustedError):
+                    await self._collect(
+                        stage3_stream(test_user_id, "Test query?", sample_stage1_results, [])
+                    )
+
+    @pytest.mark.asyncio
+    async def test_single_response_skips_chairman(self, sample_stage1_results, test_user_id):
+        """Test that a lone stage 1 response completes without streaming."""
+        with patch("backend.council.stream_model") as mock_stream:
+            items = await self._collect(
+                stage3_stream(test_user_id, "Test query?", sample_stage1_results[:1], [])
+            )
+
+        mock_stream.assert_not_called()
+        assert items == [("complete", {
+            "agent_title": "Agent One",
+            "model": "test/model-1",
+            "emoji": "🤖",
+            "response": sample_stage1_results[0]["response"],
+            "prompt": ""
+        })]
+
+
 class TestRunFullCouncil:
     """Test the complete 3-stage pipeline."""
 
@@ -463,6 +823,46 @@ class TestRunFullCouncil:
                     assert "label_to_model" in metadata
                     assert "aggregate_rankings" in metadata
 
+    @pytest.mark.asyncio
+    async def test_agents_loaded_once(self, sample_agents, test_user_id):
+        """Test that a council run reads the active agents only once."""
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents[:2]) as mock_agents:
+            with patch("backend.council.agent_storage.get_chairman", return_value=None):
+                with patch("backend.council.query_model", return_value={"content": "FINAL RANKING:\n1. Response A"}):
+                    await run_full_council(test_user_id, "Test query?")
+
+        mock_agents.assert_called_once_with(test_user_id)
+
+    @pytest.mark.asyncio
+    async def test_prompts_resolved_once(self, sample_agents, temp_data_dir, test_user_id):
+        """Test that a council run resolves model prompts once for all three stages."""
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents[:2]):
+            with patch("backend.council.agent_storage.get_chairman", return_value=None):
+                with patch("backend.council.resolve_prompts", wraps=prompt_storage.resolve_prompts) as mock_resolve:
+                    with patch("backend.council.get_prompt_for_model") as mock_get_prompt:
+                        with patch("backend.council.query_model", return_value={"content": "FINAL RANKING:\n1. Response A"}):
+                            await run_full_council(test_user_id, "Test query?")
+
+        mock_resolve.assert_called_once()
+        mock_get_prompt.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_single_response_skips_ranking_and_synthesis(self, sample_agents, test_user_id):
+        """Test that a lone stage 1 response is returned without ranking or chairman calls."""
+        with patch("backend.council.agent_storage.get_active_agents", return_value=sample_agents[:1]):
+            with patch("backend.council.agent_storage.get_chairman", return_value=None):
+                with patch("backend.council.query_model") as mock_query:
+                    mock_query.return_value = {"content": "Only answer"}
+
+                    stage1, stage2, stage3, metadata = await run_full_council(test_user_id, "Test query?")
+
+        mock_query.assert_called_once()
+        assert len(stage1) == 1
+        assert stage2 == []
+        assert stage3["response"] == "Only answer"
+        assert stage3["agent_title"] == "Agent One"
+        assert metadata == {"label_to_model": {}, "aggregate_rankings": []}
+
     @pytest.mark.asyncio
     async def test_all_models_fail_stage1(self, sample_agents, test_user_id):
         """Test when all models fail in stage 1."""
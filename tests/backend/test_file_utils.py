@@ -0,0 +1,83 @@
+"""Tests for file_utils.py - shared file helpers."""
+
+import os
+import pytest
+from unittest.mock import patch
+from backend import file_utils
+
+
+class TestWriteFileAtomic:
+    """Test atomic file replacement."""
+
+    def test_replaces_contents_and_creates_parent(self, tmp_path):
+        """Test that a write creates missing directories and replaces existing contents."""
+        path = tmp_path / "users" / "u" / "data.json"
+
+        file_utils.write_file_atomic(path, b"first")
+        file_utils.write_file_atomic(path, b"second")
+
+        assert path.read_bytes() == b"second"
+        assert os.listdir(path.parent) == ["data.json"]
+
+    def test_synced_before_replace(self, tmp_path):
+        """Test that the new contents reach the disk before they replace the old file."""
+        calls = []
+        with patch("backend.file_utils.os.fsync", side_effect=lambda fd: calls.append("fsync")):
+            with patch("backend.file_utils.os.replace", side_effect=lambda *args: calls.append("replace")):
+                file_utils.write_file_atomic(tmp_path / "data.json", b"data")
+
+        assert calls == ["fsync", "replace"]
+
+    def test_failed_write_keeps_old_contents(self, tmp_path):
+        """Test that a failed write leaves the old file and no temporary file."""
+        path = tmp_path / "data.json"
+        path.write_bytes(b"old")
+
+        with patch("backend.file_utils.os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                file_utils.write_file_atomic(path, b"new")
+
+        assert path.read_bytes() == b"old"
+        assert os.listdir(tmp_path) == ["data.json"]
+
+
+class TestFileSignature:
+    """Test cache validation signatures."""
+
+    def test_changes_on_rewrite(self, tmp_path):
+        """Test that replacing a file changes its signature."""
+        path = tmp_path / "data.json"
+        file_utils.write_file_atomic(path, b"one")
+        signature = file_utils.file_signature(path)
+
+        assert file_utils.file_signature(path) == signature
+        file_utils.write_file_atomic(path, b"two")
+        assert file_utils.file_signature(path) != signature
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing file raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            file_utils.file_signature(tmp_path / "missing.json")
+
+
+class TestKeyedLocks:
+    """Test per-key locks."""
+
+    def test_one_lock_per_key(self):
+        """Test that a key always maps to the same lock while it is in use."""
+        locks = file_utils.KeyedLocks()
+
+        lock = locks("a")
+        with lock:
+            assert locks("a") is lock
+            assert locks("b") is not lock
+
+    def test_unused_locks_dropped(self):
+        """Test that locks for keys no longer in use are not kept."""
+        locks = file_utils.KeyedLocks()
+
+        for key in range(100):
+            with locks(key):
+                pass
+
+        assert len(locks) == 0
@@ -1,9 +1,13 @@
 """Tests for main.py - FastAPI endpoints."""
 
+import asyncio
+import httpx
+import json
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock
-from backend.main import app
+from backend import main, response_cache, storage
+from backend.main import app, list_frontend_files, sse_event
 from backend.auth import get_current_user_id
 from tests.conftest import TEST_USER_ID
 
@@ -26,6 +30,15 @@ def client():
     app.dependency_overrides.clear()
 
 
+def chairman_answers(*deltas):
+    """Build a stand-in for stage3_stream that streams the given response chunks."""
+    async def stream(*args, **kwargs):
+        for delta in deltas:
+            yield 'delta', delta
+        yield 'complete', {"agent_title": "C", "model": "m", "response": "".join(deltas)}
+    return stream
+
+
 class TestHealthCheck:
     """Test health check endpoint."""
 
@@ -78,6 +91,16 @@ class TestConversationEndpoints:
         data = response.json()
         assert data["id"] == conv_id
 
+    def test_get_conversation_response_fields(self, client, temp_data_dir):
+        """Test that a conversation is returned with exactly its response model's fields."""
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+        storage.add_user_message(TEST_USER_ID, conv_id, "Hello")
+
+        data = client.get(f"/api/conversations/{conv_id}").json()
+
+        assert set(data) == {"id", "created_at", "title", "messages"}
+        assert data["messages"] == [{"role": "user", "content": "Hello"}]
+
     def test_get_nonexistent_conversation(self, client, temp_data_dir):
         """Test getting conversation that doesn't exist."""
         response = client.get(f"/api/conversations/{NONEXISTENT_UUID}")
@@ -113,6 +136,125 @@ class TestConversationEndpoints:
                 assert "stage2" in data
                 assert "stage3" in data
                 assert "metadata" in data
+                assert response.headers["content-type"] == "application/json"
+                assert data["stage2"][0]["parsed_ranking"] == ["Response A"]
+                assert data["stage3"]["response"] == "Final"
+
+    def test_title_generated_alongside_council(self, client, temp_data_dir):
+        """Test that the first-message title is generated while the council runs."""
+        create_response = client.post("/api/conversations", json={})
+        conv_id = create_response.json()["id"]
+        council_started = asyncio.Event()
+
+        async def title_during_council(user_query):
+            # Only finishes if the council is already running
+            await asyncio.wait_for(council_started.wait(), timeout=1)
+            return "Test Title"
+
+        async def council(user_id, user_query):
+            council_started.set()
+            await asyncio.sleep(0)
+            return [], [], {"agent_title": "Chairman", "model": "test", "response": "Final"}, {}
+
+        with patch("backend.main.run_full_council", side_effect=council):
+            with patch("backend.main.generate_conversation_title", side_effect=title_during_council):
+                response = client.post(
+                    f"/api/conversations/{conv_id}/message",
+                    json={"content": "Test question?"}
+                )
+
+        assert response.status_code == 200
+        conversation = client.get(f"/api/conversations/{conv_id}").json()
+        assert conversation["title"] == "Test Title"
+        assert [m["role"] for m in conversation["messages"]] == ["user", "assistant"]
+
+    def test_repeated_question_served_from_cache(self, client, temp_data_dir, monkeypatch):
+        """Test that a repeated question reuses the cached council result when enabled."""
+        monkeypatch.setattr("backend.response_cache.RESPONSE_CACHE_SECONDS", 60.0)
+        monkeypatch.setattr("backend.response_cache._CACHE", type(response_cache._CACHE)())
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+
+        with patch("backend.main.run_full_council") as mock_council:
+            mock_council.return_value = (
+                [{"agent_id": "1", "agent_title": "Agent", "model": "test", "response": "R1"}],
+                [],
+                {"agent_title": "Chairman", "model": "test", "response": "Final"},
+                {"label_to_model": {}, "aggregate_rankings": []}
+            )
+            with patch("backend.main.generate_conversation_title") as mock_title:
+                mock_title.return_value = "Test Title"
+
+                first = client.post(f"/api/conversations/{conv_id}/message", json={"content": "Same?"})
+                second = client.post(f"/api/conversations/{conv_id}/message", json={"content": "same? "})
+
+        mock_council.assert_called_once()
+        assert second.json() == first.json()
+
+    def test_concurrent_identical_questions_share_council(self, temp_data_dir):
+        """Test that a question sent twice at once runs the council only once."""
+        council_started = asyncio.Event()
+        release_council = asyncio.Event()
+        calls = []
+
+        async def slow_council(user_id, user_query):
+            calls.append(user_query)
+            council_started.set()
+            await release_council.wait()
+            return (
+                [{"agent_title": "Agent", "model": "test", "response": "R1"}],
+                [],
+                {"agent_title": "Chairman", "model": "test", "response": "Final"},
+                {"label_to_model": {}, "aggregate_rankings": []}
+            )
+
+        async def ask_twice():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                conv_id = (await http.post("/api/conversations", json={})).json()["id"]
+                first = asyncio.create_task(
+                    http.post(f"/api/conversations/{conv_id}/message", json={"content": "Same?"})
+                )
+                await council_started.wait()
+                second = asyncio.create_task(
+                    http.post(f"/api/conversations/{conv_id}/message", json={"content": "Same?"})
+                )
+                # Give the second request time to join the run in progress
+                await asyncio.sleep(0.1)
+                release_council.set()
+                return await first, await second
+
+        app.dependency_overrides[get_current_user_id] = mock_get_current_user_id
+        try:
+            with patch("backend.main.run_full_council", new=slow_council):
+                with patch("backend.main.generate_conversation_title", new=AsyncMock(return_value="Title")):
+                    first, second = asyncio.run(ask_twice())
+        finally:
+            app.dependency_overrides.clear()
+
+        assert calls == ["Same?"]
+        assert first.json() == second.json()
+
+    def test_large_response_compressed(self, client, temp_data_dir):
+        """Test that a large council response is gzipped for clients that accept it."""
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+        answer = "The council agrees. " * 200
+
+        with patch("backend.main.run_full_council") as mock_council:
+            mock_council.return_value = (
+                [{"agent_title": "Agent", "model": "test", "response": answer}],
+                [],
+                {"agent_title": "Chairman", "model": "test", "response": answer},
+                {"label_to_model": {}, "aggregate_rankings": []}
+            )
+            with patch("backend.main.generate_conversation_title", return_value="Title"):
+                response = client.post(
+                    f"/api/conversations/{conv_id}/message",
+                    json={"content": "Test"},
+                    headers={"Accept-Encoding": "gzip"}
+                )
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["stage3"]["response"] == answer
 
     def test_send_message_to_nonexistent_conversation(self, client, temp_data_dir):
         """Test sending message to non-existent conversation."""
@@ -374,6 +516,24 @@ class TestPromptEndpoints:
         data = response.json()
         assert "test/model" in data["models"]
 
+    def test_prompt_storage_runs_off_event_loop(self, client, temp_data_dir):
+        """Test that prompt file I/O does not block the event loop."""
+        loop_threads = []
+
+        def record_update(*args):
+            try:
+                asyncio.get_running_loop()
+                loop_threads.append(True)
+            except RuntimeError:
+                loop_threads.append(False)
+            return {"defaults": {}, "models": {}}
+
+        with patch("backend.main.prompt_storage.update_prompt", side_effect=record_update):
+            response = client.put("/api/prompts/stage1", json={"name": "N", "description": "D", "template": "T"})
+
+        assert response.status_code == 200
+        assert loop_threads == [False]
+
     def test_update_invalid_stage(self, client, temp_data_dir):
         """Test updating invalid stage."""
         response = client.put("/api/prompts/invalid_stage", json={
@@ -418,6 +578,53 @@ class TestPromptEndpoints:
         assert response.status_code == 200
 
 
+class TestConditionalRequests:
+    """Test ETag revalidation of the polled read endpoints."""
+
+    @pytest.mark.parametrize("path", ["/api/models", "/api/prompts", "/api/prompts?model=test/model"])
+    def test_unchanged_data_not_modified(self, client, temp_data_dir, path):
+        """Test that a matching If-None-Match gets an empty 304."""
+        first = client.get(path)
+        etag = first.headers["etag"]
+
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == "private, no-cache"
+        # Weak, since the body may be gzipped on the way out
+        assert etag.startswith('W/"')
+
+        second = client.get(path, headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+
+        # Weak comparison and tag lists also match
+        assert client.get(path, headers={"If-None-Match": f'"other", {etag[2:]}'}).status_code == 304
+
+    def test_prompt_change_invalidates_etag(self, client, temp_data_dir):
+        """Test that editing prompts changes the ETag."""
+        etag = client.get("/api/prompts").headers["etag"]
+
+        client.put("/api/prompts/stage1", json={"name": "N", "description": "D", "template": "T"})
+        response = client.get("/api/prompts", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["defaults"]["stage1"]["template"] == "T"
+
+    def test_agents_revalidated(self, client, temp_data_dir):
+        """Test that the agent list is revalidated and refreshed after edits."""
+        agent = client.post("/api/agents", json={"title": "A", "role": "R", "model": "test/model"}).json()
+        etag = client.get("/api/agents").headers["etag"]
+
+        assert client.get("/api/agents", headers={"If-None-Match": etag}).status_code == 304
+
+        client.put(f"/api/agents/{agent['id']}", json={"title": "Renamed"})
+        response = client.get("/api/agents", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert "Renamed" in [a["title"] for a in response.json()]
+
+
 class TestCORSHeaders:
     """Test CORS configuration."""
 
@@ -430,6 +637,20 @@ class TestCORSHeaders:
         assert response.status_code == 200
         # Note: TestClient may not expose all CORS headers, but endpoint should work
 
+    def test_preflight_cached(self, client, temp_data_dir):
+        """Test that preflight responses let the browser cache them."""
+        response = client.options(
+            "/api/conversations",
+            headers={
+                "Origin": main.CORS_ORIGINS[0],
+                "Access-Control-Request-Method": "POST",
+                "Access-Control-Request-Headers": "Content-Type, Authorization",
+            }
+        )
+
+        assert response.status_code == 200
+        assert response.headers["access-control-max-age"] == "86400"
+
 
 class TestRequestValidation:
     """Test request validation using Pydantic models."""
@@ -457,6 +678,24 @@ class TestRequestValidation:
 
         assert response.status_code == 422
 
+    @pytest.mark.parametrize("model", ["openai/gpt-5.1", "meta-llama/llama-3.1-70b_instruct"])
+    def test_valid_agent_model_ids(self, client, temp_data_dir, model):
+        """Test that OpenRouter model identifiers are accepted."""
+        response = client.post("/api/agents", json={"title": "Test", "role": "Role", "model": model})
+
+        assert response.status_code == 200
+        agent_id = response.json()["id"]
+        assert client.put(f"/api/agents/{agent_id}", json={"model": model}).status_code == 200
+
+    @pytest.mark.parametrize("model", ["gpt-5", "openai/gpt 5", "openai/gpt/5", "/gpt-5", "openai/"])
+    def test_invalid_agent_model_ids(self, client, temp_data_dir, model):
+        """Test that malformed model identifiers are rejected on create and update."""
+        response = client.post("/api/agents", json={"title": "Test", "role": "Role", "model": model})
+        assert response.status_code == 422
+
+        agent_id = client.post("/api/agents", json={"title": "Test", "role": "Role", "model": "test/model"}).json()["id"]
+        assert client.put(f"/api/agents/{agent_id}", json={"model": model}).status_code == 422
+
     def test_invalid_update_prompt_request(self, client, temp_data_dir):
         """Test updating prompt with invalid request."""
         # Missing required fields
@@ -478,13 +717,15 @@ class TestStreamingEndpoint:
         conv_id = create_response.json()["id"]
 
         # Mock the async functions
-        with patch("backend.main.stage1_collect_responses") as mock_s1:
+        async def no_stage1_results(user_id, user_query, **kwargs):
+            return
+            yield
+
+        with patch("backend.main.stage1_stream", side_effect=no_stage1_results):
             with patch("backend.main.stage2_collect_rankings") as mock_s2:
-                with patch("backend.main.stage3_synthesize_final") as mock_s3:
+                with patch("backend.main.stage3_stream", side_effect=chairman_answers("R")):
                     with patch("backend.main.generate_conversation_title") as mock_title:
-                        mock_s1.return_value = []
                         mock_s2.return_value = ([], {})
-                        mock_s3.return_value = {"agent_title": "C", "model": "m", "response": "R"}
                         mock_title.return_value = "Title"
 
                         # Note: Testing SSE streams is complex, just verify endpoint exists
@@ -495,3 +736,304 @@ class TestStreamingEndpoint:
 
                         # Should start streaming
                         assert response.status_code == 200
+
+    def test_stage1_items_streamed_before_complete(self, client, temp_data_dir):
+        """Test that stage 1 results stream individually, then arrive in council order."""
+        create_response = client.post("/api/conversations", json={})
+        conv_id = create_response.json()["id"]
+
+        async def stage1_in_arrival_order(user_id, user_query, **kwargs):
+            yield 1, {"agent_title": "Second", "model": "m2", "response": "R2"}
+            yield 0, {"agent_title": "First", "model": "m1", "response": "R1"}
+
+        with patch("backend.main.stage1_stream", side_effect=stage1_in_arrival_order):
+            with patch("backend.main.stage2_collect_rankings") as mock_s2:
+                with patch("backend.main.stage3_stream", side_effect=chairman_answers("R")):
+                    with patch("backend.main.generate_conversation_title") as mock_title:
+                        mock_s2.return_value = ([], {})
+                        mock_title.return_value = "Title"
+
+                        response = client.post(
+                            f"/api/conversations/{conv_id}/message/stream",
+                            json={"content": "Test"}
+                        )
+
+        events = [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        types = [event["type"] for event in events]
+        assert types[:4] == ["stage1_start", "stage1_item", "stage1_item", "stage1_complete"]
+        assert [event["data"]["agent_title"] for event in events[1:3]] == ["Second", "First"]
+        assert [r["agent_title"] for r in events[3]["data"]] == ["First", "Second"]
+        assert types[-1] == "complete"
+
+    def test_sse_event_frame(self):
+        """Test that events are encoded as UTF-8 data frames."""
+        frame = sse_event({"type": "stage3_complete", "data": {"emoji": "🧠", "response": "naïve"}})
+
+        assert isinstance(frame, bytes)
+        assert frame.startswith(b"data: ")
+        assert frame.endswith(b"\n\n")
+        assert json.loads(frame[len(b"data: "):].decode("utf-8")) == {
+            "type": "stage3_complete",
+            "data": {"emoji": "🧠", "response": "naïve"}
+        }
+
+    def test_stream_not_compressed(self, client, temp_data_dir):
+        """Test that SSE events are sent uncompressed so they aren't buffered."""
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+
+        async def long_stage1_result(user_id, user_query, **kwargs):
+            yield 0, {"agent_title": "First", "model": "m1", "response": "R1 " * 1000}
+
+        with patch("backend.main.stage1_stream", side_effect=long_stage1_result):
+            with patch("backend.main.stage2_collect_rankings", return_value=([], {})):
+                with patch("backend.main.stage3_stream", side_effect=chairman_answers("R")):
+                    with patch("backend.main.generate_conversation_title", return_value="Title"):
+                        response = client.post(
+                            f"/api/conversations/{conv_id}/message/stream",
+                            json={"content": "Test"},
+                            headers={"Accept-Encoding": "gzip"}
+                        )
+
+        assert "content-encoding" not in response.headers
+        assert "no-transform" in response.headers["cache-control"]
+
+    @pytest.mark.asyncio
+    async def test_stream_route_bypasses_gzip(self):
+        """Test that stream routes skip gzip even where Starlette would compress event streams."""
+        async def event_stream(scope, receive, send):
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream")]
+            })
+            await send({"type": "http.response.body", "body": b"data: {}\n\n" * 500})
+
+        # No excluded content types, as in older Starlette releases
+        middleware = main.StreamSafeGZipMiddleware(event_stream, minimum_size=1024, exclude_content_types=())
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            headers = {"Accept-Encoding": "gzip"}
+            stream = await http.get("/api/conversations/x/message/stream", headers=headers)
+            other = await http.get("/api/other", headers=headers)
+
+        assert "content-encoding" not in stream.headers
+        assert other.headers["content-encoding"] == "gzip"
+
+    def test_fixed_frames_preencoded(self):
+        """Test that the pre-encoded control frames match their encoded events."""
+        assert main._STAGE1_START == sse_event({"type": "stage1_start"})
+        assert main._COMPLETE == sse_event({"type": "complete"})
+
+    def test_assistant_message_saved_before_complete(self, client, temp_data_dir):
+        """Test that the assistant message is persisted before the complete event is sent."""
+        create_response = client.post("/api/conversations", json={})
+        conv_id = create_response.json()["id"]
+        sent = []
+        saved_after = []
+        real_sse_event = main.sse_event
+        real_add_assistant_message = storage.add_assistant_message
+
+        def record_event(event):
+            sent.append(event["type"])
+            return real_sse_event(event)
+
+        def record_save(*args):
+            saved_after.append(sent[-1])
+            return real_add_assistant_message(*args)
+
+        async def one_stage1_result(user_id, user_query, **kwargs):
+            yield 0, {"agent_title": "First", "model": "m1", "response": "R1"}
+
+        with patch("backend.main.sse_event", side_effect=record_event), \
+                patch("backend.main.storage.add_assistant_message", side_effect=record_save):
+            with patch("backend.main.stage1_stream", side_effect=one_stage1_result):
+                with patch("backend.main.stage2_collect_rankings") as mock_s2:
+                    with patch("backend.main.stage3_stream", side_effect=chairman_answers("R")):
+                        with patch("backend.main.generate_conversation_title") as mock_title:
+                            mock_s2.return_value = ([], {})
+                            mock_title.return_value = "Title"
+
+                            response = client.post(
+                                f"/api/conversations/{conv_id}/message/stream",
+                                json={"content": "Test"}
+                            )
+
+        # Saved after the title event and before the (pre-encoded) complete frame
+        assert saved_after == ["title_complete"]
+        assert response.text.endswith(main._COMPLETE.decode())
+        messages = client.get(f"/api/conversations/{conv_id}").json()["messages"]
+        assert [m["role"] for m in messages] == ["user", "assistant"]
+        assert messages[1]["stage3"]["response"] == "R"
+
+    def test_title_saved_before_title_event(self, client, temp_data_dir):
+        """Test that the generated title is persisted before the client is told about it."""
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+        sent = []
+        saved_after = []
+        real_sse_event = main.sse_event
+        real_update_title = storage.update_conversation_title
+
+        def record_event(event):
+            sent.append(event["type"])
+            return real_sse_event(event)
+
+        def record_title(*args):
+            saved_after.append(sent[-1])
+            return real_update_title(*args)
+
+        async def one_stage1_result(user_id, user_query, **kwargs):
+            yield 0, {"agent_title": "First", "model": "m1", "response": "R1"}
+
+        with patch("backend.main.sse_event", side_effect=record_event):
+            with patch("backend.main.storage.update_conversation_title", side_effect=record_title):
+                with patch("backend.main.stage1_stream", side_effect=one_stage1_result):
+                    with patch("backend.main.stage2_collect_rankings", return_value=([], {})):
+                        with patch("backend.main.stage3_stream", side_effect=chairman_answers("R")):
+                            with patch("backend.main.generate_conversation_title", return_value="Title"):
+                                client.post(f"/api/conversations/{conv_id}/message/stream", json={"content": "Test"})
+
+        assert saved_after == ["stage3_complete"]
+        assert sent.count("title_complete") == 1
+        assert client.get(f"/api/conversations/{conv_id}").json()["title"] == "Title"
+
+    def test_stage3_streamed_before_complete(self, client, temp_data_dir):
+        """Test that the final answer streams in chunks before the complete result."""
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+
+        async def one_stage1_result(user_id, user_query, **kwargs):
+            yield 0, {"agent_title": "First", "model": "m1", "response": "R1"}
+
+        with patch("backend.main.stage1_stream", side_effect=one_stage1_result):
+            with patch("backend.main.stage2_collect_rankings", return_value=([], {})):
+                with patch("backend.main.stage3_stream", side_effect=chairman_answers("Hel", "lo")):
+                    with patch("backend.main.generate_conversation_title", return_value="Title"):
+                        response = client.post(
+                            f"/api/conversations/{conv_id}/message/stream",
+                            json={"content": "Test"}
+                        )
+
+        events = [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        stage3_events = [event for event in events if event["type"].startswith("stage3")]
+        assert [event["type"] for event in stage3_events] == [
+            "stage3_start", "stage3_delta", "stage3_delta", "stage3_complete"
+        ]
+        assert [event["data"]["delta"] for event in stage3_events[1:3]] == ["Hel", "lo"]
+        assert stage3_events[3]["data"]["response"] == "Hello"
+
+        messages = client.get(f"/api/conversations/{conv_id}").json()["messages"]
+        assert messages[1]["stage3"]["response"] == "Hello"
+
+    def test_title_started_before_user_message_saved(self, client, temp_data_dir):
+        """Test that title generation is not held up by saving the user message."""
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+        title_started = []
+        saved_after_title = []
+        real_add_user_message = storage.add_user_message
+
+        async def title_coroutine():
+            return "Title"
+
+        def title(user_query):
+            title_started.append(True)
+            return title_coroutine()
+
+        def record_add(*args):
+            saved_after_title.append(bool(title_started))
+            return real_add_user_message(*args)
+
+        async def no_stage1_results(user_id, user_query, **kwargs):
+            return
+            yield
+
+        with patch("backend.main.storage.add_user_message", side_effect=record_add):
+            with patch("backend.main.generate_conversation_title", new=title):
+                with patch("backend.main.stage1_stream", side_effect=no_stage1_results):
+                    with patch("backend.main.stage2_collect_rankings", return_value=([], {})):
+                        with patch("backend.main.stage3_stream", side_effect=chairman_answers("R")):
+                            client.post(f"/api/conversations/{conv_id}/message/stream", json={"content": "Test"})
+
+        assert saved_after_title == [True]
+
+    def test_title_cancelled_when_council_fails(self, client, temp_data_dir):
+        """Test that a failed council stops the pending title generation."""
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+        title_cancelled = []
+
+        async def slow_title(user_query):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                title_cancelled.append(True)
+                raise
+            return "Title"
+
+        async def failing_stage1(user_id, user_query, **kwargs):
+            await asyncio.sleep(0)
+            raise RuntimeError("council failed")
+            yield
+
+        with patch("backend.main.generate_conversation_title", side_effect=slow_title):
+            with patch("backend.main.stage1_stream", side_effect=failing_stage1):
+                response = client.post(f"/api/conversations/{conv_id}/message/stream", json={"content": "Test"})
+
+        assert '"type":"error"' in response.text
+        assert title_cancelled == [True]
+
+    def test_cached_council_replayed(self, client, temp_data_dir, monkeypatch):
+        """Test that a cached council result is streamed without querying any agent."""
+        monkeypatch.setattr("backend.response_cache.RESPONSE_CACHE_SECONDS", 60.0)
+        monkeypatch.setattr("backend.response_cache._CACHE", type(response_cache._CACHE)())
+        conv_id = client.post("/api/conversations", json={}).json()["id"]
+        cached = (
+            [{"agent_title": "First", "model": "m1", "response": "R1"}],
+            [],
+            {"agent_title": "C", "model": "m", "response": "R"},
+            {"label_to_model": {}, "aggregate_rankings": []}
+        )
+        response_cache.cache_council(response_cache.council_key(TEST_USER_ID, "Test"), cached)
+
+        with patch("backend.main.stage1_stream") as mock_s1:
+            with patch("backend.main.generate_conversation_title") as mock_title:
+                mock_title.return_value = "Title"
+
+                response = client.post(
+                    f"/api/conversations/{conv_id}/message/stream",
+                    json={"content": "Test"}
+                )
+
+        mock_s1.assert_not_called()
+        events = [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert [event["type"] for event in events] == [
+            "stage1_start", "stage1_complete", "stage2_start", "stage2_complete",
+            "stage3_start", "stage3_complete", "title_complete", "complete"
+        ]
+        assert events[5]["data"]["response"] == "R"
+
+
+class TestFrontendFiles:
+    """Test the startup listing of the built frontend."""
+
+    def test_lists_nested_files(self, tmp_path):
+        """Test that files are listed by URL path and directories are skipped."""
+        (tmp_path / "assets").mkdir()
+        (tmp_path / "assets" / "index-abc.js").write_text("")
+        (tmp_path / "index.html").write_text("")
+        (tmp_path / "favicon.svg").write_text("")
+
+        files = list_frontend_files(tmp_path)
+
+        assert files == {"index.html", "favicon.svg", "assets/index-abc.js"}
+        assert "assets" not in files
+        assert "../index.html" not in files
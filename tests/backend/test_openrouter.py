@@ -1,9 +1,14 @@
 """Tests for openrouter.py - API client."""
 
+import asyncio
+import json
 import pytest
 import httpx
 from unittest.mock import AsyncMock, MagicMock, patch
-from backend.openrouter import query_model, query_models_parallel, OpenRouterCreditsExhaustedError
+from backend import openrouter
+from backend.openrouter import (
+    query_model, query_models_parallel, stream_model, close_client, OpenRouterCreditsExhaustedError
+)
 
 
 class TestQueryModel:
@@ -156,8 +161,6 @@ class TestQueryModel:
         """Test custom timeout parameter."""
         mock_client = MagicMock()
         mock_client.post = AsyncMock(return_value=MagicMock())
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
 
         with patch("httpx.AsyncClient") as mock_async_client:
             mock_async_client.return_value = mock_client
@@ -168,8 +171,186 @@ class TestQueryModel:
                 timeout=60.0
             )
 
-            # Verify AsyncClient was created with correct timeout
-            mock_async_client.assert_called_once_with(timeout=60.0)
+            # Verify the timeout was applied to the request
+            assert mock_client.post.call_args.kwargs["timeout"] == 60.0
+
+    @pytest.mark.asyncio
+    async def test_client_shared_across_queries(self, mock_openrouter_client):
+        """Test that queries reuse one pooled client until it is closed."""
+        with patch("httpx.AsyncClient", return_value=mock_openrouter_client) as mock_async_client:
+            await query_model("test/model-1", [{"role": "user", "content": "Test"}])
+            await query_model("test/model-2", [{"role": "user", "content": "Test"}])
+
+            mock_async_client.assert_called_once()
+            assert mock_openrouter_client.post.await_count == 2
+
+            mock_openrouter_client.aclose = AsyncMock()
+            await close_client()
+            mock_openrouter_client.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_explicit_client(self, mock_openrouter_client):
+        """Test that an explicitly passed client is used instead of the shared one."""
+        with patch("httpx.AsyncClient") as mock_async_client:
+            result = await query_model(
+                "test/model",
+                [{"role": "user", "content": "Test"}],
+                client=mock_openrouter_client
+            )
+
+            mock_async_client.assert_not_called()
+            assert result["content"] == "This is a test response from the model."
+
+
+class TestQueryCoalescing:
+    """Test sharing identical in-flight queries."""
+
+    @pytest.fixture
+    def gated_client(self, mock_openrouter_client):
+        """A client whose requests block until the test releases them."""
+        release = asyncio.Event()
+        response = mock_openrouter_client.post.return_value
+
+        async def gated_post(*args, **kwargs):
+            await release.wait()
+            return response
+
+        mock_openrouter_client.post = AsyncMock(side_effect=gated_post)
+        with patch("httpx.AsyncClient", return_value=mock_openrouter_client):
+            yield mock_openrouter_client, release
+
+    @pytest.mark.asyncio
+    async def test_identical_queries_share_one_request(self, gated_client):
+        """Test that concurrent identical queries send one request and share its result."""
+        client, release = gated_client
+        messages = [{"role": "user", "content": "Same question"}]
+
+        first = asyncio.create_task(query_model("test/model", messages))
+        second = asyncio.create_task(query_model("test/model", [dict(messages[0])]))
+        other = asyncio.create_task(query_model("test/other-model", messages))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(first, second, other)
+
+        assert client.post.await_count == 2
+        assert results[0] == results[1] == results[2]
+        assert openrouter._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_request(self, gated_client):
+        """Test that the request survives one caller giving up, but not all of them."""
+        client, release = gated_client
+        messages = [{"role": "user", "content": "Same question"}]
+
+        first = asyncio.create_task(query_model("test/model", messages))
+        second = asyncio.create_task(query_model("test/model", messages))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert (await second)["content"] == "This is a test response from the model."
+        assert client.post.await_count == 1
+
+        release.clear()
+        third = asyncio.create_task(query_model("test/model", messages))
+        await asyncio.sleep(0)
+        (request, _), = openrouter._in_flight.values()
+        third.cancel()
+        await asyncio.gather(third, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert request.cancelled()
+        assert openrouter._in_flight == {}
+
+
+class TestRequestCap:
+    """Test the process-wide cap on concurrent requests."""
+
+    @pytest.mark.asyncio
+    async def test_requests_wait_for_free_slot(self, mock_openrouter_client):
+        """Test that requests beyond the cap wait until a running one finishes."""
+        running = 0
+        peak = 0
+        response = mock_openrouter_client.post.return_value
+
+        async def tracked_post(*args, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return response
+
+        mock_openrouter_client.post = AsyncMock(side_effect=tracked_post)
+        with patch("backend.openrouter.MAX_PARALLEL_QUERIES", 2):
+            with patch("httpx.AsyncClient", return_value=mock_openrouter_client):
+                results = await asyncio.gather(*[
+                    query_model(f"test/model-{i}", [{"role": "user", "content": "Test"}])
+                    for i in range(5)
+                ])
+
+        assert peak == 2
+        assert mock_openrouter_client.post.await_count == 5
+        assert all(result is not None for result in results)
+
+
+class TestStreamModel:
+    """Test streaming a model's reply."""
+
+    @staticmethod
+    def _client(status_code=200, body=b""):
+        """Build a real client whose transport answers every request with the given body."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(status_code, content=body)
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler)), requests
+
+    @pytest.mark.asyncio
+    async def test_yields_content_deltas(self):
+        """Test that content chunks are yielded in order, skipping keep-alives."""
+        client, requests = self._client(body=(
+            b": OPENROUTER PROCESSING\n\n"
+            b'data: {"choices":[{"delta":{"role":"assistant","content":""}}]}\n\n'
+            b'data: {"choices":[{"delta":{"content":"Hello"}}]}\n\n'
+            b'data: {"choices":[{"delta":{"content":", na\xc3\xafve world"}}]}\n\n'
+            b'data: {"choices":[{"delta":{},"finish_reason":"stop"}]}\n\n'
+            b"data: [DONE]\n\n"
+        ))
+
+        with patch("httpx.AsyncClient", return_value=client):
+            deltas = [d async for d in stream_model("test/model", [{"role": "user", "content": "Hi"}])]
+
+        assert deltas == ["Hello", ", naïve world"]
+        assert json.loads(requests[0].content)["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_credits_exhausted(self):
+        """Test that HTTP 402 raises OpenRouterCreditsExhaustedError."""
+        client, _ = self._client(status_code=402)
+
+        with patch("httpx.AsyncClient", return_value=client):
+            with pytest.raises(OpenRouterCreditsExhaustedError):
+                async for _ in stream_model("test/model", [{"role": "user", "content": "Hi"}]):
+                    pass
+
+    @pytest.mark.asyncio
+    async def test_mid_stream_error(self):
+        """Test that an error chunk from OpenRouter is raised."""
+        client, _ = self._client(body=(
+            b'data: {"choices":[{"delta":{"content":"Hel"}}]}\n\n'
+            b'data: {"error":{"code":502,"message":"Provider disconnected"}}\n\n'
+        ))
+
+        deltas = []
+        with patch("httpx.AsyncClient", return_value=client):
+            with pytest.raises(RuntimeError, match="Provider disconnected"):
+                async for delta in stream_model("test/model", [{"role": "user", "content": "Hi"}]):
+                    deltas.append(delta)
+
+        assert deltas == ["Hel"]
 
 
 class TestQueryModelsParallel:
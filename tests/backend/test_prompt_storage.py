@@ -2,9 +2,10 @@
 
 import pytest
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from backend import prompt_storage
-from backend.prompts import DEFAULT_PROMPTS
+from backend import file_utils, json_utils, prompt_storage
+from backend.prompts import DEFAULT_PROMPTS, render_prompt
 from backend.config import get_user_prompts_file
 from tests.conftest import TEST_USER_ID
 
@@ -104,6 +105,30 @@ class TestPromptFallbackChain:
 
         assert prompt["template"] == "Default: {user_query}"
 
+    def test_preloaded_prompts_match_storage(self, temp_data_dir, test_user_id):
+        """Test that passing already-loaded prompts gives the same result."""
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "Custom default"})
+        prompt_storage.update_prompt(test_user_id, "stage2", {"template": "Custom model"}, model="test/model")
+
+        custom = prompt_storage.load_custom_prompts(test_user_id)
+        defaults = prompt_storage.get_active_prompts(test_user_id, custom)
+
+        for stage in ("stage1", "stage2", "stage3"):
+            for model in ("test/model", "other/model"):
+                assert prompt_storage.get_prompt_for_model(test_user_id, model, stage, custom, defaults) == \
+                    prompt_storage.get_prompt_for_model(test_user_id, model, stage)
+
+
+    def test_resolve_prompts(self, temp_data_dir, test_user_id):
+        """Test that the resolved table matches per-model lookups."""
+        prompt_storage.update_prompt(test_user_id, "stage3", {"template": "Chairman"}, model="test/chairman")
+
+        table = prompt_storage.resolve_prompts(test_user_id, ["test/model", "test/chairman", "test/model"])
+
+        assert len(table) == 6
+        for (model, stage), prompt in table.items():
+            assert prompt == prompt_storage.get_prompt_for_model(test_user_id, model, stage)
+        assert table[("test/chairman", "stage3")]["template"] == "Chairman"
 
 class TestPromptCRUD:
     """Test CRUD operations for prompts."""
@@ -363,6 +388,18 @@ class TestEdgeCases:
         assert "stage2" in prompts
         assert "stage3" in prompts
 
+    def test_default_prompts_shared_and_read_only(self, temp_data_dir, test_user_id):
+        """Test that users without overrides share one read-only copy of the defaults."""
+        prompts = prompt_storage.get_active_prompts(test_user_id)
+
+        assert prompt_storage.get_active_prompts("other_user") is prompts
+        assert prompts["stage1"] == DEFAULT_PROMPTS["stage1"]
+        with pytest.raises(TypeError):
+            prompts["stage1"]["template"] = "Changed"
+        assert json.loads(json_utils.dumps(prompt_storage.get_all_model_prompts(test_user_id)))[
+            "defaults"
+        ]["stage1"]["template"] == DEFAULT_PROMPTS["stage1"]["template"]
+
     def test_unicode_in_prompts(self, temp_data_dir, test_user_id):
         """Test handling of Unicode in prompt templates."""
         prompt_storage.update_prompt(test_user_id, "stage1", {
@@ -383,3 +420,150 @@ class TestEdgeCases:
         prompt = prompt_storage.get_prompt_for_model(test_user_id, "any/model", "stage1")
 
         assert len(prompt["template"]) > 10000
+
+
+class TestPromptsCache:
+    """Test the in-memory cache of parsed custom prompts."""
+
+    def test_repeated_reads_skip_parsing(self, temp_data_dir, test_user_id, monkeypatch):
+        """Test that an unchanged prompts file is parsed only once."""
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "Custom"})
+        prompt_storage.get_prompt_for_model(test_user_id, "any/model", "stage1")
+
+        calls = []
+        original_loads = prompt_storage.json_utils.loads
+        monkeypatch.setattr(prompt_storage.json_utils, "loads", lambda d: calls.append(d) or original_loads(d))
+
+        prompt = prompt_storage.get_prompt_for_model(test_user_id, "any/model", "stage1")
+        prompt_storage.get_active_prompts(test_user_id)
+
+        assert prompt["template"] == "Custom"
+        assert calls == []
+
+    def test_save_invalidates_cache(self, temp_data_dir, test_user_id):
+        """Test that saved prompts are visible to the next read."""
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "First"})
+        assert prompt_storage.get_prompt_for_model(test_user_id, "m", "stage1")["template"] == "First"
+
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "Second"})
+        assert prompt_storage.get_prompt_for_model(test_user_id, "m", "stage1")["template"] == "Second"
+
+        prompt_storage.reset_all_prompts(test_user_id)
+        assert prompt_storage.load_custom_prompts(test_user_id) == {"defaults": {}, "models": {}}
+
+    def test_saved_data_not_aliased(self, temp_data_dir, test_user_id):
+        """Test that modifying saved dicts afterwards doesn't change the cached prompts."""
+        prompts = {"defaults": {"stage1": {"template": "Saved"}}, "models": {}}
+        prompt_storage.save_custom_prompts(test_user_id, prompts)
+        prompts["defaults"]["stage1"]["template"] = "Changed"
+
+        prompt_data = {"template": "Model"}
+        prompt_storage.update_prompt(test_user_id, "stage2", prompt_data, model="test/model")
+        prompt_data["template"] = "Changed"
+
+        custom = prompt_storage.load_custom_prompts(test_user_id)
+        assert custom["defaults"]["stage1"]["template"] == "Saved"
+        assert custom["models"]["test/model"]["stage2"]["template"] == "Model"
+
+    def test_external_file_change_invalidates_cache(self, temp_data_dir, test_user_id):
+        """Test that edits made outside the module are picked up."""
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "Cached"})
+        prompt_storage.load_custom_prompts(test_user_id)
+
+        with open(get_user_prompts_file(test_user_id), 'w') as f:
+            json.dump({"defaults": {"stage1": {"template": "External edit"}}, "models": {}}, f)
+
+        prompt = prompt_storage.get_prompt_for_model(test_user_id, "m", "stage1")
+        assert prompt["template"] == "External edit"
+
+    def test_load_returns_private_copy(self, temp_data_dir, test_user_id):
+        """Test that mutating loaded prompts does not leak into the cache."""
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "Saved"})
+
+        custom = prompt_storage.load_custom_prompts(test_user_id)
+        custom["defaults"]["stage1"]["template"] = "Unsaved"
+
+        assert prompt_storage.get_prompt_for_model(test_user_id, "m", "stage1")["template"] == "Saved"
+
+    def test_read_after_update_skips_parsing(self, temp_data_dir, test_user_id, monkeypatch):
+        """Test that saving keeps the written prompts cached."""
+        calls = []
+        original_loads = prompt_storage.json_utils.loads
+        monkeypatch.setattr(prompt_storage.json_utils, "loads", lambda d: calls.append(d) or original_loads(d))
+
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "A"})
+        prompt_storage.update_prompt(test_user_id, "stage2", {"template": "B"}, model="test/model")
+        prompt = prompt_storage.get_prompt_for_model(test_user_id, "test/model", "stage2")
+
+        assert prompt["template"] == "B"
+        assert calls == []
+
+    def test_noop_changes_skip_write(self, temp_data_dir, test_user_id):
+        """Test that unchanged updates and resets of missing overrides leave the file alone."""
+        prompts_file = Path(get_user_prompts_file(test_user_id))
+
+        prompt_storage.reset_prompt(test_user_id, "stage1")
+        prompt_storage.reset_prompt(test_user_id, "stage1", model="test/model")
+        assert not prompts_file.exists()
+
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "A"}, model="test/model")
+        signature = file_utils.file_signature(prompts_file)
+
+        prompt_storage.update_prompt(test_user_id, "stage1", {"template": "A"}, model="test/model")
+        prompt_storage.reset_prompt(test_user_id, "stage2", model="test/model")
+
+        assert file_utils.file_signature(prompts_file) == signature
+
+    def test_concurrent_updates_all_persist(self, temp_data_dir, test_user_id):
+        """Test that updates from several threads are not lost."""
+        models = [f"test/model-{i}" for i in range(8)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(
+                lambda model: prompt_storage.update_prompt(test_user_id, "stage1", {"template": model}, model=model),
+                models
+            ))
+
+        prompt_storage._PROMPTS_CACHE.clear()
+        assert sorted(prompt_storage.load_custom_prompts(test_user_id)["models"]) == models
+
+    def test_read_does_not_create_user_directory(self, temp_data_dir, test_user_id):
+        """Test that reading prompts for a new user leaves the disk untouched."""
+        prompt_storage.get_prompt_for_model(test_user_id, "m", "stage1")
+
+        assert not Path(get_user_prompts_file(test_user_id)).parent.exists()
+
+
+class TestRenderPrompt:
+    """Test prompt template rendering."""
+
+    @pytest.mark.parametrize("template", [
+        "Question: {user_query}",
+        "{user_query}{responses_text}",
+        "No placeholders",
+        "Literal {{braces}} around {user_query}",
+        "{user_query!r} and {responses_text:>5}",
+        "",
+    ])
+    def test_matches_str_format(self, template):
+        """Test that rendering matches str.format for supported and fallback templates."""
+        values = {"user_query": "Q?", "responses_text": "abc"}
+
+        assert render_prompt(template, **values) == template.format(**values)
+
+    def test_default_templates(self):
+        """Test rendering each default template."""
+        values = {
+            "user_query": "Q",
+            "responses_text": "R",
+            "stage1_text": "S1",
+            "stage2_text": "S2",
+        }
+        for stage in ("stage1", "stage2", "stage3"):
+            template = DEFAULT_PROMPTS[stage]["template"]
+            assert render_prompt(template, **values) == template.format(**values)
+
+    def test_missing_value_raises(self):
+        """Test that an unknown placeholder raises KeyError like str.format."""
+        with pytest.raises(KeyError):
+            render_prompt("{unknown}", user_query="Q")
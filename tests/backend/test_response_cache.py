@@ -0,0 +1,129 @@
+"""Tests for response_cache.py - cached council results."""
+
+import asyncio
+import pytest
+from collections import OrderedDict
+from unittest.mock import patch
+from backend import agent_storage
+from backend import response_cache
+from tests.conftest import TEST_USER_ID
+
+RESULT = (
+    [{"agent_title": "Agent", "model": "test", "response": "R1"}],
+    [],
+    {"agent_title": "Chairman", "model": "test", "response": "Final"},
+    {"label_to_model": {}, "aggregate_rankings": []}
+)
+
+
+@pytest.fixture(autouse=True)
+def enabled_cache(monkeypatch):
+    """Enable caching with an empty cache for each test."""
+    monkeypatch.setattr(response_cache, "_CACHE", OrderedDict())
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_SECONDS", 60.0)
+    monkeypatch.setattr(response_cache, "_RUNNING", {})
+
+
+class TestCouncilCacheKey:
+    """Test cache key construction."""
+
+    def test_ignores_case_and_whitespace(self, temp_data_dir):
+        """Test that trivially different phrasings share a key."""
+        key = response_cache.council_key(TEST_USER_ID, "What is  the answer?")
+
+        assert response_cache.council_key(TEST_USER_ID, " what is the\nANSWER? ") == key
+        assert response_cache.council_key(TEST_USER_ID, "What is the question?") != key
+        assert response_cache.council_key("other_user", "What is the answer?") != key
+
+    def test_built_when_disabled(self, temp_data_dir):
+        """Test that in-flight runs are keyed even with caching off."""
+        key = response_cache.council_key(TEST_USER_ID, "Question?")
+        with patch("backend.response_cache.RESPONSE_CACHE_SECONDS", 0):
+            assert response_cache.council_key(TEST_USER_ID, "question?") == key
+
+    def test_changes_with_council_setup(self, temp_data_dir):
+        """Test that editing the council invalidates earlier keys."""
+        agent = agent_storage.create_agent(TEST_USER_ID, "Agent", "Role", "test/model")
+        key = response_cache.council_key(TEST_USER_ID, "Question?")
+        assert response_cache.council_key(TEST_USER_ID, "Question?") == key
+
+        agent_storage.update_agent(TEST_USER_ID, agent["id"], {"model": "test/new-model"})
+
+        assert response_cache.council_key(TEST_USER_ID, "Question?") != key
+
+
+class TestCachedCouncil:
+    """Test storing and retrieving council results."""
+
+    def test_round_trip(self):
+        """Test that a cached result is returned for its key."""
+        response_cache.cache_council("key", RESULT)
+
+        assert response_cache.get_cached_council("key") is RESULT
+        assert response_cache.get_cached_council("other") is None
+
+    def test_expiry(self):
+        """Test that results expire after the configured time."""
+        with patch("backend.response_cache.time.monotonic", return_value=1000.0):
+            response_cache.cache_council("key", RESULT)
+        with patch("backend.response_cache.time.monotonic", return_value=1059.0):
+            assert response_cache.get_cached_council("key") is RESULT
+        with patch("backend.response_cache.time.monotonic", return_value=1061.0):
+            assert response_cache.get_cached_council("key") is None
+
+    def test_least_recently_used_evicted(self):
+        """Test that the cache stays within its size limit."""
+        with patch("backend.response_cache.RESPONSE_CACHE_MAX_ENTRIES", 2):
+            response_cache.cache_council("a", RESULT)
+            response_cache.cache_council("b", RESULT)
+            response_cache.get_cached_council("a")
+            response_cache.cache_council("c", RESULT)
+
+        assert response_cache.get_cached_council("a") is RESULT
+        assert response_cache.get_cached_council("b") is None
+        assert response_cache.get_cached_council("c") is RESULT
+
+    def test_failed_council_not_cached(self):
+        """Test that runs without any stage 1 response are not cached."""
+        response_cache.cache_council("key", ([], [], {"model": "error", "response": "Failed"}, {}))
+
+        assert response_cache.get_cached_council("key") is None
+
+    def test_not_cached_when_disabled(self):
+        """Test that nothing is stored when caching is off."""
+        with patch("backend.response_cache.RESPONSE_CACHE_SECONDS", 0):
+            response_cache.cache_council("key", RESULT)
+
+        assert response_cache.get_cached_council("key") is None
+
+
+class TestInFlightCouncil:
+    """Test sharing council runs between identical concurrent requests."""
+
+    @pytest.mark.asyncio
+    async def test_waiter_gets_running_result(self):
+        """Test that an identical request waits for the run in progress."""
+        with response_cache.council_run("key") as run:
+            waiter = asyncio.create_task(response_cache.find_council("key"))
+            await asyncio.sleep(0)
+            assert not waiter.done()
+            run.set_result(RESULT)
+
+        assert await waiter is RESULT
+
+    @pytest.mark.asyncio
+    async def test_failed_run_releases_waiters(self):
+        """Test that waiters get None, to run their own council, when the run fails."""
+        with pytest.raises(RuntimeError):
+            with response_cache.council_run("key"):
+                waiter = asyncio.create_task(response_cache.find_council("key"))
+                await asyncio.sleep(0)
+                raise RuntimeError("council failed")
+
+        assert await waiter is None
+        assert response_cache._RUNNING == {}
+
+    @pytest.mark.asyncio
+    async def test_nothing_running(self):
+        """Test that a new question is left to the caller."""
+        assert await response_cache.find_council("key") is None
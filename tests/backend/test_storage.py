@@ -3,7 +3,10 @@
 import pytest
 import json
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from unittest.mock import patch
 from freezegun import freeze_time
 from backend import storage
 from tests.conftest import (
@@ -98,6 +101,18 @@ class TestConversationCRUD:
 
         assert conversations == []
 
+    def test_user_dir_created_on_first_write(self, temp_data_dir, test_user_id):
+        """Test that listing doesn't create the user's directory but the first save does."""
+        conversations_dir = storage.get_user_conversations_dir(test_user_id)
+
+        assert storage.list_conversations(test_user_id) == []
+        assert not conversations_dir.exists()
+
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+
+        assert conversations_dir.is_dir()
+        assert [c["id"] for c in storage.list_conversations(test_user_id)] == [TEST_CONV_ID_1]
+
     def test_delete_conversation(self, temp_data_dir, test_user_id):
         """Test deleting an existing conversation."""
         # Create a conversation
@@ -124,6 +139,9 @@ class TestConversationCRUD:
         with pytest.raises(ValueError, match="Invalid conversation_id format"):
             storage.get_conversation(test_user_id, "../../../etc/passwd")
 
+        with pytest.raises(ValueError, match="Invalid conversation_id format"):
+            storage.get_conversation(test_user_id, TEST_CONV_ID_1 + "\n")
+
 
 class TestMessageOperations:
     """Test message-related operations."""
@@ -270,3 +288,190 @@ class TestEdgeCases:
         # User 1 shouldn't see user 2's data
         assert storage.get_conversation(user1, TEST_CONV_ID_1) is not None
         assert storage.get_conversation(user2, TEST_CONV_ID_1) is not None
+
+
+class TestMessageLog:
+    """Test the append-only message log layout."""
+
+    def test_messages_appended_to_log(self, temp_data_dir, test_user_id):
+        """Test that each message is one appended line and metadata stays small."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+        storage.add_user_message(test_user_id, TEST_CONV_ID_1, "Message 1")
+        storage.add_assistant_message(test_user_id, TEST_CONV_ID_1, [], [], {})
+
+        lines = storage.get_messages_path(test_user_id, TEST_CONV_ID_1).read_bytes().splitlines()
+        assert [json.loads(line)["role"] for line in lines] == ["user", "assistant"]
+
+        metadata = json.loads(storage.get_conversation_path(test_user_id, TEST_CONV_ID_1).read_text())
+        assert "messages" not in metadata
+        assert metadata["message_count"] == 2
+
+    def test_legacy_conversation_file(self, temp_data_dir, test_user_id):
+        """Test that single-file conversations are read and converted on write."""
+        storage.ensure_user_dir(test_user_id)
+        path = storage.get_conversation_path(test_user_id, TEST_CONV_ID_1)
+        path.write_text(json.dumps({
+            "id": TEST_CONV_ID_1,
+            "created_at": "2024-01-01T12:00:00",
+            "title": "Old",
+            "messages": [{"role": "user", "content": "Earlier"}]
+        }))
+
+        assert storage.get_conversation(test_user_id, TEST_CONV_ID_1)["messages"][0]["content"] == "Earlier"
+        assert storage.list_conversations(test_user_id)[0]["message_count"] == 1
+
+        storage.add_user_message(test_user_id, TEST_CONV_ID_1, "Later")
+
+        conv = storage.get_conversation(test_user_id, TEST_CONV_ID_1)
+        assert [m["content"] for m in conv["messages"]] == ["Earlier", "Later"]
+        assert conv["title"] == "Old"
+        assert "messages" not in json.loads(path.read_text())
+        assert storage.list_conversations(test_user_id)[0]["message_count"] == 2
+
+    def test_convert_legacy_conversations(self, temp_data_dir, test_user_id):
+        """Test that all legacy files are converted in one pass, leaving current ones alone."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+        path = storage.get_conversation_path(test_user_id, TEST_CONV_ID_2)
+        path.write_text(json.dumps({
+            "id": TEST_CONV_ID_2,
+            "created_at": "2024-01-01T12:00:00",
+            "title": "Old",
+            "messages": [{"role": "user", "content": "Earlier"}]
+        }))
+
+        assert storage.convert_legacy_conversations(test_user_id) == 1
+
+        assert "messages" not in json.loads(path.read_text())
+        conv = storage.get_conversation(test_user_id, TEST_CONV_ID_2)
+        assert [m["content"] for m in conv["messages"]] == ["Earlier"]
+        assert storage.convert_legacy_conversations(test_user_id) == 0
+
+    def test_torn_line_skipped(self, temp_data_dir, test_user_id):
+        """Test that a partially written line does not break loading or later appends."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+        storage.add_user_message(test_user_id, TEST_CONV_ID_1, "Kept")
+        with open(storage.get_messages_path(test_user_id, TEST_CONV_ID_1), 'ab') as f:
+            f.write(b'{"role": "us')
+
+        conv = storage.get_conversation(test_user_id, TEST_CONV_ID_1)
+        assert [m["content"] for m in conv["messages"]] == ["Kept"]
+
+        storage.add_user_message(test_user_id, TEST_CONV_ID_1, "After")
+
+        conv = storage.get_conversation(test_user_id, TEST_CONV_ID_1)
+        assert [m["content"] for m in conv["messages"]] == ["Kept", "After"]
+
+    def test_delete_removes_message_log(self, temp_data_dir, test_user_id):
+        """Test that deleting a conversation removes its message log."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+        storage.add_user_message(test_user_id, TEST_CONV_ID_1, "Test")
+
+        storage.delete_conversation(test_user_id, TEST_CONV_ID_1)
+
+        assert not storage.get_messages_path(test_user_id, TEST_CONV_ID_1).exists()
+
+    def test_concurrent_appends(self, temp_data_dir, test_user_id):
+        """Test that appends from several threads keep the log and count consistent."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+
+        def append_many(worker):
+            for i in range(25):
+                storage.add_user_message(test_user_id, TEST_CONV_ID_1, f"{worker}-{i}")
+
+        threads = [threading.Thread(target=append_many, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        conv = storage.get_conversation(test_user_id, TEST_CONV_ID_1)
+        assert len(conv["messages"]) == 200
+        assert storage.list_conversations(test_user_id)[0]["message_count"] == 200
+
+
+class TestListingCache:
+    """Test that listings only re-read changed metadata files."""
+
+    def test_unchanged_files_not_reread(self, temp_data_dir, test_user_id):
+        """Test that a second listing reads no metadata files."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+        storage.create_conversation(test_user_id, TEST_CONV_ID_2)
+        first = storage.list_conversations(test_user_id)
+
+        with patch("backend.storage._read_listing_entry") as mock_read:
+            second = storage.list_conversations(test_user_id)
+
+        mock_read.assert_not_called()
+        assert second == first
+
+    def test_changes_picked_up(self, temp_data_dir, test_user_id):
+        """Test that new messages, titles and deletions show in the next listing."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+        storage.create_conversation(test_user_id, TEST_CONV_ID_2)
+        storage.list_conversations(test_user_id)
+
+        storage.add_user_message(test_user_id, TEST_CONV_ID_1, "Hello")
+        storage.update_conversation_title(test_user_id, TEST_CONV_ID_1, "Renamed")
+        storage.delete_conversation(test_user_id, TEST_CONV_ID_2)
+
+        conversations = storage.list_conversations(test_user_id)
+        assert [(c["id"], c["title"], c["message_count"]) for c in conversations] == [
+            (TEST_CONV_ID_1, "Renamed", 1)
+        ]
+
+    def test_changed_files_read_in_parallel(self, temp_data_dir, test_user_id, monkeypatch):
+        """Test that several unread files are read on the listing pool, in listing order."""
+        for conv_id in (TEST_CONV_ID_1, TEST_CONV_ID_2, TEST_CONV_ID_3):
+            storage.create_conversation(test_user_id, conv_id)
+        monkeypatch.setattr(storage, "_LISTING_CACHE", OrderedDict())
+        real_read = storage._read_listing_entry
+        threads = []
+
+        def record_read(path):
+            threads.append(threading.current_thread().name)
+            return real_read(path)
+
+        with patch("backend.storage._read_listing_entry", side_effect=record_read):
+            conversations = storage.list_conversations(test_user_id)
+
+        assert len(threads) == 3
+        assert all(name.startswith("conversation-listing") for name in threads)
+        assert {c["id"] for c in conversations} == {TEST_CONV_ID_1, TEST_CONV_ID_2, TEST_CONV_ID_3}
+
+    def test_conversation_metadata(self, temp_data_dir, test_user_id):
+        """Test that metadata is loaded without the message log and follows later writes."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+        assert storage.get_conversation_metadata(test_user_id, TEST_CONV_ID_1)["message_count"] == 0
+
+        storage.add_user_message(test_user_id, TEST_CONV_ID_1, "Hello")
+        with patch("backend.storage._read_messages") as mock_read_messages:
+            metadata = storage.get_conversation_metadata(test_user_id, TEST_CONV_ID_1)
+
+        mock_read_messages.assert_not_called()
+        assert metadata["id"] == TEST_CONV_ID_1
+        assert metadata["message_count"] == 1
+        assert storage.get_conversation_metadata(test_user_id, NONEXISTENT_CONV_ID) is None
+
+    def test_cache_bounded(self, temp_data_dir, monkeypatch):
+        """Test that listings are kept for a bounded number of users, and none for deleted conversations."""
+        monkeypatch.setattr(storage, "_LISTING_CACHE", OrderedDict())
+        monkeypatch.setattr(storage, "_LISTING_CACHE_MAX_DIRS", 2)
+        for user_id in ("user_a", "user_b", "user_c"):
+            storage.create_conversation(user_id, TEST_CONV_ID_1)
+            storage.list_conversations(user_id)
+
+        assert list(storage._LISTING_CACHE) == [
+            str(storage.get_user_conversations_dir("user_b")),
+            str(storage.get_user_conversations_dir("user_c"))
+        ]
+
+        storage.delete_conversation("user_c", TEST_CONV_ID_1)
+        assert storage._LISTING_CACHE[str(storage.get_user_conversations_dir("user_c"))] == {}
+        assert len(storage._CONVERSATION_LOCKS) == 0
+
+    def test_returned_entries_are_copies(self, temp_data_dir, test_user_id):
+        """Test that editing a listing doesn't alter later listings."""
+        storage.create_conversation(test_user_id, TEST_CONV_ID_1)
+        storage.list_conversations(test_user_id)[0]["title"] = "Changed"
+
+        assert storage.list_conversations(test_user_id)[0]["title"] == "New Conversation"
@@ -8,6 +8,8 @@ from pathlib import Path
 from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock
 
+from backend import agent_storage
+
 
 # Test user ID for all tests
 TEST_USER_ID = "user_test123"
@@ -42,6 +44,32 @@ def temp_data_dir(monkeypatch):
     shutil.rmtree(temp_dir, ignore_errors=True)
 
 
+@pytest.fixture
+def clean_agents(temp_data_dir, test_user_id):
+    """Start the test user with no agents (instead of the four defaults) and no chairman."""
+    agent_storage.save_agents(test_user_id, {"agents": [], "chairman": None})
+    return test_user_id
+
+
+@pytest.fixture
+def fake_now(monkeypatch):
+    """
+    Fix the clock agent timestamps are read from at 2024-01-01 12:00:00.
+
+    Cheaper than freezegun, which patches every imported module. Assign
+    fake_now.current to move the clock.
+    """
+    class FakeDateTime(datetime):
+        current = datetime(2024, 1, 1, 12, 0, 0)
+
+        @classmethod
+        def utcnow(cls):
+            return cls.current
+
+    monkeypatch.setattr(agent_storage, "datetime", FakeDateTime)
+    return FakeDateTime
+
+
 @pytest.fixture
 def sample_agent():
     """Sample agent configuration."""
@@ -135,6 +163,14 @@ def sample_conversation():
     }
 
 
+@pytest.fixture(autouse=True)
+def reset_openrouter_client(monkeypatch):
+    """Give each test a fresh shared OpenRouter client (so httpx.AsyncClient patches apply) and no in-flight queries."""
+    monkeypatch.setattr("backend.openrouter._client", None)
+    monkeypatch.setattr("backend.openrouter._in_flight", {})
+    monkeypatch.setattr("backend.openrouter._request_slots", None)
+
+
 @pytest.fixture
 def mock_openrouter_response():
     """Mock OpenRouter API response."""